@@ -131,6 +131,9 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Üretilen görev raporu PDF'leri (personel verisi içerir, MEDIA altında değil)
+REPORT_CACHE_DIR = os.path.join(BASE_DIR, 'report_cache')
+
 # 1. Giriş yapılmamışsa, kullanıcıyı buraya yönlendir:
 LOGIN_URL = 'login'
 
@@ -0,0 +1,235 @@
+# core/analytics.py
+"""
+Hasar matrisi analitiği (NumPy).
+
+structural_damage / non_structural_damage matrisleri tek sorguda okunur ve
+(tespit x eleman x hasar seviyesi) boyutunda bir diziye yerleştirilir. Hesaplar
+(eleman bazında hasar sıklığı, sektör / tehlike ısı haritası, yüzdelikler)
+satırlar üzerinde Python döngüsü olmadan dizi işlemleriyle yapılır.
+
+Matris hücresi şu biçimlerden biri olabilir (eleman adı -> hücre):
+- Derece adı: {'walls': 'SEVERE'}
+- Şiddet sırası (damage.SEVERITY_RANK): {'walls': 3}
+- Seviye -> işaret / oran: {'walls': {'LIGHT': 30, 'SEVERE': 70}} veya {'walls': {'MODERATE': True}}
+Tanınmayan hücreler atlanır.
+
+Sonuç harita verisiyle aynı veri versiyonuyla önbelleğe alınır (map_data.cached_payload);
+hasar tespiti, bina, saha tespiti, worksite veya sektör değişince yeniden hesaplanır.
+Sektör, tespitin binasının site_assessment'ı üzerinden bulunur (özetler ve öncelik indeksiyle aynı).
+numpy isteğe bağlıdır; kurulu değilse get_matrix_analytics() None döner.
+"""
+import math
+import warnings
+
+from .damage import SEVERITY_RANK, DAMAGE_DISPLAY
+from .map_data import cached_payload
+from .models import DamageAssessment
+
+# Hafiften ağıra hasar seviyeleri (dizinin son ekseni)
+LEVELS = sorted(SEVERITY_RANK, key=SEVERITY_RANK.get)
+CRITICAL_RANK = SEVERITY_RANK['SEVERE']
+MATRIX_FIELDS = (
+    ('structural_damage', 'Structural'),
+    ('non_structural_damage', 'Non-Structural'),
+)
+PERCENTILES = (50, 75, 90)
+# Isı haritasında gösterilen eleman sayısı (en çok değerlendirilenler)
+HEATMAP_ELEMENTS = 8
+UNASSIGNED_SECTOR = 'Unassigned'
+
+
+class AnalyticsUnavailable(Exception):
+    """numpy kurulu değil."""
+
+
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise AnalyticsUnavailable("Damage matrix analytics require numpy. Install it with: pip install numpy")
+    return numpy
+
+
+def is_number(value):
+    """Sonlu int / float (bool, NaN, inf değil)."""
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and math.isfinite(value))
+
+
+def cell_levels(cell):
+    """
+    Matris hücresini [(seviye indeksi, ağırlık), ...] listesine çevirir.
+    Matrisler serbest JSON: tanınmayan / bozuk hücreler (liste, NaN, inf, metin ağırlık...) hata vermez, atlanır.
+    """
+    if isinstance(cell, str):
+        grade = cell.strip().upper()
+        return [(SEVERITY_RANK[grade], 1.0)] if grade in SEVERITY_RANK else []
+    if is_number(cell):
+        return [(int(cell), 1.0)] if 0 <= cell < len(LEVELS) and float(cell).is_integer() else []
+    if isinstance(cell, dict):
+        levels = []
+        for level, weight in cell.items():
+            grade = str(level).strip().upper()
+            if grade not in SEVERITY_RANK:
+                continue
+            if weight is True:  # işaret
+                levels.append((SEVERITY_RANK[grade], 1.0))
+            elif is_number(weight) and weight > 0:
+                levels.append((SEVERITY_RANK[grade], float(weight)))
+        return levels
+    return []
+
+
+class DamageMatrix:
+    """
+    Yüklenmiş matrisler:
+    - values: (tespit, eleman, seviye) float dizisi; hücrede işaretli seviyenin ağırlığı
+    - building, sector, hazard: tespit başına indeks dizileri
+    - elements: [(grup, eleman adı)], sectors, hazards: indekslerin etiketleri
+    """
+
+    def __init__(self, queryset=None):
+        np = load_numpy()
+        queryset = DamageAssessment.objects.all() if queryset is None else queryset
+        rows = queryset.order_by().values_list(
+            'building_id', 'building__site_assessment__worksite__sector__name', 'hazard_type', *(field for field, _ in MATRIX_FIELDS)
+        )
+
+        element_index, sector_index, building_index = {}, {}, {}
+        hazard_index = {code: i for i, (code, _) in enumerate(DamageAssessment.HAZARD_TYPES)}
+        buildings, sectors, hazards = [], [], []
+        cell_rows, cell_elements, cell_levels_, cell_weights = [], [], [], []
+
+        # JSON ayrıştırma satır başına yapılmak zorunda; hesaplar aşağıda dizi üzerinde
+        for row, (building_id, sector, hazard, *matrices) in enumerate(rows):
+            buildings.append(building_index.setdefault(building_id, len(building_index)))
+            sectors.append(sector_index.setdefault(sector or UNASSIGNED_SECTOR, len(sector_index)))
+            hazards.append(hazard_index.setdefault(hazard, len(hazard_index)))
+            for (field, group), matrix in zip(MATRIX_FIELDS, matrices):
+                if not isinstance(matrix, dict):
+                    continue
+                for element, cell in matrix.items():
+                    levels = cell_levels(cell)
+                    if not levels:
+                        continue
+                    column = element_index.setdefault((group, str(element)), len(element_index))
+                    for level, weight in levels:
+                        cell_rows.append(row)
+                        cell_elements.append(column)
+                        cell_levels_.append(level)
+                        cell_weights.append(weight)
+
+        self.values = np.zeros((len(buildings), len(element_index), len(LEVELS)))
+        cells = tuple(np.array(index, dtype=int) for index in (cell_rows, cell_elements, cell_levels_))
+        np.maximum.at(self.values, cells, np.array(cell_weights))
+        self.building = np.array(buildings, dtype=int)
+        self.sector = np.array(sectors, dtype=int)
+        self.hazard = np.array(hazards, dtype=int)
+        self.elements = list(element_index)
+        self.sectors = list(sector_index)
+        hazard_labels = dict(DamageAssessment.HAZARD_TYPES)
+        self.hazards = [hazard_labels.get(code, code) for code in hazard_index]
+        self.building_count = len(building_index)
+
+    def severity(self):
+        """(tespit, eleman) en kötü işaretli seviye; değerlendirilmemiş hücre -1."""
+        np = load_numpy()
+        ranks = np.arange(len(LEVELS))
+        return np.where(self.values > 0, ranks, -1).max(axis=2, initial=-1)
+
+    def building_values(self):
+        """(bina, eleman, seviye): binanın tüm tespitlerindeki en yüksek işaret."""
+        np = load_numpy()
+        merged = np.zeros((self.building_count,) + self.values.shape[1:])
+        np.maximum.at(merged, self.building, self.values)
+        return merged
+
+
+def level_color(mean_severity):
+    return DAMAGE_DISPLAY[LEVELS[int(round(mean_severity))]][0]
+
+
+def build_matrix_analytics(queryset=None):
+    """Dashboard'da gösterilen özet (sade Python verisi; önbelleğe yazılabilir)."""
+    np = load_numpy()
+    matrix = DamageMatrix(queryset)
+    severity = matrix.severity()
+    assessed = severity >= 0
+
+    # 1. Eleman bazında seviye sıklığı, kritik oranı ve yüzdelikler
+    counts = (matrix.values > 0).sum(axis=0)
+    assessed_count = assessed.sum(axis=0)
+    critical_count = (severity >= CRITICAL_RANK).sum(axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        percentiles = np.nanpercentile(np.where(assessed, severity, np.nan), PERCENTILES, axis=0)
+    elements = [
+        {
+            'group': group,
+            'name': name,
+            'assessed': int(assessed_count[i]),
+            'counts': [int(n) for n in counts[i]],
+            'critical_share': int(round(100 * critical_count[i] / assessed_count[i])) if assessed_count[i] else 0,
+            'percentiles': [LEVELS[int(p)] if not np.isnan(p) else None for p in np.floor(percentiles[:, i])],
+        }
+        for i, (group, name) in enumerate(matrix.elements)
+    ]
+    elements.sort(key=lambda e: (-e['critical_share'], -e['assessed'], e['name']))
+
+    # 2. Sektör x tehlike x eleman ortalama şiddet (np.add.at ile gruplama)
+    shape = (len(matrix.sectors), len(matrix.hazards), len(matrix.elements))
+    sums, totals = np.zeros(shape), np.zeros(shape)
+    np.add.at(sums, (matrix.sector, matrix.hazard), np.where(assessed, severity, 0))
+    np.add.at(totals, (matrix.sector, matrix.hazard), assessed)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / totals
+
+    top = np.argsort(-assessed_count, kind='stable')[:HEATMAP_ELEMENTS]
+    heatmaps = []
+    for h, hazard in enumerate(matrix.hazards):
+        present = totals[:, h, :].sum(axis=1) > 0
+        if not present.any():
+            continue
+        heatmaps.append({
+            'hazard': hazard,
+            'elements': [matrix.elements[i][1] for i in top],
+            'rows': [
+                {
+                    'sector': matrix.sectors[s],
+                    'cells': [
+                        None if np.isnan(means[s, h, i]) else
+                        {'value': round(float(means[s, h, i]), 1), 'color': level_color(means[s, h, i])}
+                        for i in top
+                    ],
+                }
+                for s in np.flatnonzero(present)
+            ],
+        })
+
+    # 3. Bina bazında en kötü eleman şiddetinin dağılımı
+    building_severity = np.where(matrix.building_values() > 0, np.arange(len(LEVELS)), -1).max(axis=(1, 2), initial=-1)
+    building_severity = building_severity[building_severity >= 0]
+    building_percentiles = (
+        [LEVELS[int(p)] for p in np.floor(np.percentile(building_severity, PERCENTILES))]
+        if building_severity.size else []
+    )
+
+    return {
+        'assessments': int(assessed.any(axis=1).sum()),
+        'buildings': int(building_severity.size),
+        'levels': LEVELS,
+        'percentile_labels': [f"P{p}" for p in PERCENTILES],
+        'elements': elements,
+        'heatmaps': heatmaps,
+        'building_percentiles': list(zip([f"P{p}" for p in PERCENTILES], building_percentiles)),
+    }
+
+
+def get_matrix_analytics():
+    """Önbellekten matris analitiği; numpy yoksa None."""
+    try:
+        load_numpy()
+    except AnalyticsUnavailable:
+        return None
+    return cached_payload('damage_matrix', build_matrix_analytics)
@@ -0,0 +1,252 @@
+# core/benchmarks.py
+"""
+Görünüm (view) ölçümleri ve ölçek eğrileri ('benchmark_views' komutu).
+
+Her ölçekte veritabanı boşaltılır, seed_operation ile aynı üreteçle (core/seeding.py)
+doldurulur ve BENCHMARK_VIEWS'teki her görünüm Django test istemcisiyle çağrılır:
+- cold: önbellek temizlendikten sonraki ilk istek
+- wall / queries / sql_time: sonraki `repeat` isteğin medyanı (sıcak önbellek)
+- peak_memory_kb: tek bir sıcak istekte tracemalloc tepe değeri (süreye dahil değil)
+
+Ölçek eğrisi: log(süre) ~ log(satır) doğrusunun eğimi. 1 civarı lineer; SUPERLINEAR_EXPONENT
+üstü süper-lineer sayılır. Ölçekle artan sorgu sayısı (N+1) ayrıca işaretlenir.
+compare() sonuçları kayıtlı bir temel ölçümle (baseline) karşılaştırır.
+
+download_mission_report görünümünün kendi işi ölçülür (veri özeti, iş kuyruğu, hazır PDF'e
+kapak damgası basılıp verilmesi); PDF'i report_worker üretir ve ölçüme dahil değildir.
+"""
+import math
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from reportlab.pdfgen import canvas
+
+from .models import Assignment
+from .reports import report_data_hash, write_cached_report
+from .seeding import DEFAULT_SEED, OperationSeeder
+
+DEFAULT_SCALES = (100, 300, 1000)
+DEFAULT_REPEAT = 3
+# Eğim bu değeri aşarsa süre veri boyutundan hızlı büyüyor demektir
+SUPERLINEAR_EXPONENT = 1.2
+# Temel ölçüme göre bu orandan fazla yavaşlama regresyondur
+REGRESSION_TOLERANCE = 0.25
+# Bundan kısa ölçümlerde gürültü baskın: süre karşılaştırması yapılmaz
+MIN_COMPARABLE_SECONDS = 0.005
+
+
+def field_dashboard_url():
+    # Ölçekler arasında karşılaştırılabilir olsun diye en çok binası olan görev
+    assignment = Assignment.objects.annotate(
+        buildings=Count('buildinginventory_reports')
+    ).order_by('-buildings', 'pk').first()
+    return reverse('field_dashboard', args=[assignment.pk])
+
+
+def cached_report_url():
+    # Güncel veri için PDF hazırmış gibi (tek sayfa): görünüm özet + kapak damgası + dosya yanıtını ölçer
+    content = BytesIO()
+    page = canvas.Canvas(content)
+    page.drawString(100, 700, "Benchmark placeholder")
+    page.save()
+    write_cached_report(report_data_hash(), content.getvalue())
+    return reverse('download_mission_report')
+
+
+# (ad, url üreten fonksiyon). url veri yüklendikten sonra, ölçümden önce üretilir.
+BENCHMARK_VIEWS = (
+    ('home', lambda: reverse('home')),
+    ('reporting_dashboard', lambda: reverse('reporting_dashboard')),
+    ('field_dashboard', field_dashboard_url),
+    ('worksite_list', lambda: reverse('worksite_list')),
+    ('download_mission_report', lambda: reverse('download_mission_report')),
+    ('download_mission_report_cached', cached_report_url),
+)
+
+
+def _consume(response):
+    content = b''.join(response.streaming_content) if response.streaming else response.content
+    response.close()
+    return content
+
+
+class QueryTimer:
+    """connection.execute_wrapper: sorgu sayısı ve toplam SQL süresi (ms altı çözünürlükle)."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def timed_request(client, url):
+    """Döner: (durum kodu, süre, sorgu sayısı, SQL süresi)"""
+    timer = QueryTimer()
+    with connection.execute_wrapper(timer):
+        started = time.perf_counter()
+        response = client.get(url)
+        _consume(response)
+        wall = time.perf_counter() - started
+    return response.status_code, wall, timer.count, timer.seconds
+
+
+def peak_memory(client, url):
+    """Tek istekte Python bellek tepe değeri (KB)."""
+    tracemalloc.start()
+    try:
+        _consume(client.get(url))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak // 1024
+
+
+def benchmark_view(client, url, repeat=DEFAULT_REPEAT):
+    cache.clear()
+    status, wall, queries, sql_time = timed_request(client, url)
+    runs = [timed_request(client, url) for _ in range(repeat)]
+    return {
+        'status': status,
+        'cold': {'wall': wall, 'queries': queries, 'sql_time': sql_time},
+        'wall': statistics.median(run[1] for run in runs),
+        'queries': statistics.median_low(run[2] for run in runs),
+        'sql_time': statistics.median(run[3] for run in runs),
+        'peak_memory_kb': peak_memory(client, url),
+    }
+
+
+def reset_database():
+    call_command('flush', interactive=False, verbosity=0)
+    cache.clear()
+
+
+def run_scale(worksites, seed=DEFAULT_SEED, repeat=DEFAULT_REPEAT, views=BENCHMARK_VIEWS):
+    """Veritabanını bu ölçekte yeniden üretir ve görünümleri ölçer."""
+    reset_database()
+    started = time.perf_counter()
+    counts = OperationSeeder(worksites, seed=seed).run()
+    result = {
+        'worksites': worksites,
+        'rows': sum(counts.values()),
+        'seed_seconds': round(time.perf_counter() - started, 2),
+        'views': {},
+    }
+    client = Client()
+    for name, url in views:
+        result['views'][name] = benchmark_view(client, url(), repeat)
+    return result
+
+
+def scaling_exponent(points):
+    """[(satır, değer), ...] için log-log eğimi; iki noktadan az veya sıfır değer varsa None."""
+    points = [(x, y) for x, y in points if x > 0 and y > 0]
+    if len(points) < 2:
+        return None
+    xs = [math.log(x) for x, _ in points]
+    ys = [math.log(y) for _, y in points]
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if not spread:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread, 3)
+
+
+def scale_curves(scales):
+    """Görünüm başına ölçek eğrisi: süre eğimi, sorgu sayıları ve işaretler."""
+    curves = {}
+    names = scales[0]['views'] if scales else {}
+    for name in names:
+        points = [(scale['rows'], scale['views'][name]) for scale in scales]
+        exponent = scaling_exponent([(rows, view['wall']) for rows, view in points])
+        queries = [view['queries'] for _, view in points]
+        curves[name] = {
+            'exponent': exponent,
+            'memory_exponent': scaling_exponent([(rows, view['peak_memory_kb']) for rows, view in points]),
+            'queries': queries,
+            'superlinear': exponent is not None and exponent > SUPERLINEAR_EXPONENT,
+            'queries_grow': queries[-1] > queries[0],
+        }
+    return curves
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, seed=DEFAULT_SEED, repeat=DEFAULT_REPEAT, views=BENCHMARK_VIEWS, progress=None):
+    """
+    Tüm ölçekleri sırayla ölçer (mevcut veritabanı boşaltılır!).
+    progress(ölçek sonucu) her ölçekten sonra çağrılır. Döner: JSON'a yazılabilir sonuç.
+    """
+    results = []
+    # Ölçümlerin ürettiği PDF önbelleği geçici dizinde kalır
+    with tempfile.TemporaryDirectory() as report_dir, override_settings(REPORT_CACHE_DIR=report_dir):
+        for worksites in sorted(scales):
+            results.append(run_scale(worksites, seed, repeat, views))
+            if progress:
+                progress(results[-1])
+    return {
+        'created_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'machine': platform.machine(),
+        },
+        'seed': seed,
+        'repeat': repeat,
+        'scales': results,
+        'curves': scale_curves(results),
+    }
+
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """
+    Sonuçları temel ölçümle karşılaştırır (aynı worksite sayısındaki ölçekler).
+    Döner: {'views': {ad: {worksite: oranlar}}, 'regressions': [açıklama, ...]}
+    """
+    previous = {scale['worksites']: scale['views'] for scale in baseline.get('scales', [])}
+    views, regressions = {}, []
+    for scale in results['scales']:
+        old_views = previous.get(scale['worksites'])
+        if old_views is None:
+            continue
+        for name, view in scale['views'].items():
+            old = old_views.get(name)
+            if old is None:
+                continue
+            row = {
+                'wall_ratio': round(view['wall'] / old['wall'], 2) if old['wall'] else None,
+                'queries_delta': view['queries'] - old['queries'],
+                'memory_ratio': round(view['peak_memory_kb'] / old['peak_memory_kb'], 2) if old['peak_memory_kb'] else None,
+            }
+            views.setdefault(name, {})[scale['worksites']] = row
+            if (row['wall_ratio'] and row['wall_ratio'] > 1 + tolerance
+                    and max(view['wall'], old['wall']) >= MIN_COMPARABLE_SECONDS):
+                regressions.append(f"{name} @ {scale['worksites']} worksites: {row['wall_ratio']}x slower")
+            if row['queries_delta'] > 0:
+                regressions.append(f"{name} @ {scale['worksites']} worksites: +{row['queries_delta']} queries")
+
+    old_curves = baseline.get('curves', {})
+    for name, curve in results['curves'].items():
+        old = old_curves.get(name, {})
+        if curve['superlinear'] and not old.get('superlinear'):
+            regressions.append(f"{name}: scaling became super-linear (exponent {curve['exponent']})")
+        if curve['queries_grow'] and not old.get('queries_grow'):
+            regressions.append(f"{name}: query count now grows with data ({curve['queries']})")
+    return {'views': views, 'regressions': regressions}
@@ -0,0 +1,216 @@
+# core/clustering.py
+"""
+Worksite noktaları için sunucu tarafı kümeleme (clustering).
+
+Web Mercator piksel ızgarası kullanılır: her worksite en yüksek zoom'da
+CLUSTER_CELL_PIXELS'lik bir hücreye düşer, alt zoom'lardaki hücresi ise
+bu indeksin bit kaydırmasıyla bulunur (Hiyerarşik ızgara). Her hücre
+damage rengi ve görev durumuna göre sayaçları tutar.
+
+İndeks süreç içinde saklanır ve veri versiyonuna (map_data) bağlıdır:
+- Bu süreçteki bir yazma sonrası sadece ilgili worksite'lar güncellenir (delta).
+- Versiyon başka yerden değiştiyse (başka süreç, toplu işlem) bir sonraki
+  okumada indeks baştan kurulur.
+"""
+import math
+import threading
+from collections import Counter
+
+from django.db.models import Exists, OuterRef
+
+from .damage import annotate_worst_damage, damage_display
+from .map_data import get_data_version
+from .models import Worksite, Assignment
+
+CLUSTER_CELL_PIXELS = 64
+# Bu zoom'un üstünde kümeleme yapılmaz, noktalar tek tek gönderilir
+CLUSTER_MAX_ZOOM = 15
+TILE_SIZE = 256
+
+
+def pixel_xy(lng, lat, zoom):
+    """Boylam/enlemi verilen zoom'daki Web Mercator piksel koordinatına çevirir."""
+    scale = TILE_SIZE * 2 ** zoom
+    siny = min(max(math.sin(math.radians(lat)), -0.9999), 0.9999)
+    x = (lng + 180.0) / 360.0 * scale
+    y = (0.5 - math.log((1 + siny) / (1 - siny)) / (4 * math.pi)) * scale
+    return x, y
+
+
+def assignment_state(status, has_active_team):
+    """Operasyon haritasıyla aynı durum mantığı."""
+    if status == 'COMPLETED':
+        return 'COMPLETED'
+    return 'ONGOING' if has_active_team else 'NOT_ASSIGNED'
+
+
+class Cluster:
+    __slots__ = ('members', 'sum_lng', 'sum_lat', 'damage', 'status')
+
+    def __init__(self):
+        self.members = set()
+        self.sum_lng = 0.0
+        self.sum_lat = 0.0
+        self.damage = Counter()
+        self.status = Counter()
+
+    def add(self, worksite_id, point):
+        self.members.add(worksite_id)
+        self.sum_lng += point['lng']
+        self.sum_lat += point['lat']
+        self.damage[point['damage_color']] += 1
+        self.status[point['status']] += 1
+
+    def remove(self, worksite_id, point):
+        self.members.discard(worksite_id)
+        self.sum_lng -= point['lng']
+        self.sum_lat -= point['lat']
+        self.damage[point['damage_color']] -= 1
+        self.status[point['status']] -= 1
+
+    def as_feature(self, zoom, cell):
+        count = len(self.members)
+        damage = {color: n for color, n in self.damage.items() if n}
+        return {
+            'type': 'Feature',
+            'id': f"cluster-{zoom}-{cell[0]}-{cell[1]}",
+            'geometry': {'type': 'Point', 'coordinates': [self.sum_lng / count, self.sum_lat / count]},
+            'properties': {
+                'layer': 'cluster',
+                'count': count,
+                'damage': damage,
+                'status': {s: n for s, n in self.status.items() if n},
+                # Kümeyi çizerken kullanılacak renk: en çok tekrar eden hasar rengi
+                'map_color': max(damage, key=damage.get),
+            },
+        }
+
+
+class WorksiteClusterIndex:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = None
+        self.points = {}   # worksite_id -> {'lng', 'lat', 'damage_color', 'status', 'cell'}
+        self.cells = {}    # zoom -> {(cx, cy): Cluster}
+        self.stats = Counter()
+
+    # --- KURULUM ---
+
+    def _queryset(self):
+        return annotate_worst_damage(
+            Worksite.objects.filter(geometry__isnull=False)
+        ).annotate(
+            has_active_team=Exists(Assignment.objects.filter(worksite=OuterRef('pk'), status='ACTIVE'))
+        ).values_list('pk', 'centroid_lng', 'centroid_lat', 'status', 'has_active_team', 'worst_damage')
+
+    def _point(self, lng, lat, status, has_active_team, worst_damage):
+        x, y = pixel_xy(lng, lat, CLUSTER_MAX_ZOOM)
+        return {
+            'lng': lng,
+            'lat': lat,
+            'damage_color': damage_display(worst_damage)[0],
+            'status': assignment_state(status, has_active_team),
+            'cell': (int(x // CLUSTER_CELL_PIXELS), int(y // CLUSTER_CELL_PIXELS)),
+        }
+
+    def _add(self, worksite_id, point):
+        self.points[worksite_id] = point
+        cx, cy = point['cell']
+        for zoom in range(CLUSTER_MAX_ZOOM + 1):
+            shift = CLUSTER_MAX_ZOOM - zoom
+            cell = (cx >> shift, cy >> shift)
+            self.cells[zoom].setdefault(cell, Cluster()).add(worksite_id, point)
+
+    def _remove(self, worksite_id):
+        point = self.points.pop(worksite_id, None)
+        if point is None:
+            return
+        cx, cy = point['cell']
+        for zoom in range(CLUSTER_MAX_ZOOM + 1):
+            shift = CLUSTER_MAX_ZOOM - zoom
+            cell = (cx >> shift, cy >> shift)
+            cluster = self.cells[zoom][cell]
+            cluster.remove(worksite_id, point)
+            if not cluster.members:
+                del self.cells[zoom][cell]
+
+    def rebuild(self):
+        """Tüm indeksi tek sorguyla baştan kurar."""
+        with self._lock:
+            version = get_data_version()
+            self.points = {}
+            self.cells = {zoom: {} for zoom in range(CLUSTER_MAX_ZOOM + 1)}
+            for pk, lng, lat, status, has_active_team, worst_damage in self._queryset():
+                self._add(pk, self._point(lng, lat, status, has_active_team, worst_damage))
+            self.version = version
+            self.stats['rebuilds'] += 1
+
+    def refresh_worksite(self, worksite_id):
+        """Tek bir worksite'ın kümelerdeki katkısını yeniden hesaplar."""
+        with self._lock:
+            self._remove(worksite_id)
+            row = self._queryset().filter(pk=worksite_id).first()
+            if row:
+                pk, lng, lat, status, has_active_team, worst_damage = row
+                self._add(pk, self._point(lng, lat, status, has_active_team, worst_damage))
+            self.stats['incremental_updates'] += 1
+
+    def apply_change(self, version, worksite_ids=()):
+        """
+        Veri versiyonu artırıldıktan sonra çağrılır (core/signals.py).
+        İndeks bir önceki versiyondaysa sadece ilgili worksite'lar güncellenir
+        (kayıt başka worksite'a taşındıysa eskisi ve yenisi);
+        arada kaçırılmış bir değişiklik varsa indeks eskimiş sayılır.
+        """
+        with self._lock:
+            if self.version is None:
+                return
+            if version != self.version + 1:
+                self.version = None
+                return
+            for worksite_id in worksite_ids:
+                self.refresh_worksite(worksite_id)
+            self.version = version
+
+    def ensure_current(self):
+        with self._lock:
+            if self.version is None or self.version != get_data_version():
+                self.rebuild()
+
+    # --- SORGULAR ---
+
+    def clusters(self, bbox, zoom):
+        """
+        bbox (west, south, east, north) içindeki kümeler.
+        Döner: (küme Feature listesi, tek başına kalan worksite id'leri)
+        """
+        zoom = max(0, min(int(zoom), CLUSTER_MAX_ZOOM))
+        self.ensure_current()
+        west, south, east, north = bbox
+        x0, y0 = pixel_xy(west, north, zoom)
+        x1, y1 = pixel_xy(east, south, zoom)
+        cx0, cy0 = int(x0 // CLUSTER_CELL_PIXELS), int(y0 // CLUSTER_CELL_PIXELS)
+        cx1, cy1 = int(x1 // CLUSTER_CELL_PIXELS), int(y1 // CLUSTER_CELL_PIXELS)
+
+        features, singles = [], []
+        with self._lock:
+            cells = self.cells[zoom]
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) < len(cells):
+                candidates = ((c, cells.get(c)) for c in
+                              ((x, y) for x in range(cx0, cx1 + 1) for y in range(cy0, cy1 + 1)))
+            else:
+                candidates = cells.items()
+
+            for cell, cluster in candidates:
+                if cluster is None or not (cx0 <= cell[0] <= cx1 and cy0 <= cell[1] <= cy1):
+                    continue
+                if len(cluster.members) == 1:
+                    singles.extend(cluster.members)
+                else:
+                    features.append(cluster.as_feature(zoom, cell))
+        self.stats['queries'] += 1
+        return features, singles
+
+
+worksite_clusters = WorksiteClusterIndex()
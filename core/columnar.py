@@ -0,0 +1,186 @@
+# core/columnar.py
+"""
+Hasar matrislerinin sütunsal (Parquet / Arrow IPC) dışa aktarımı.
+
+Her hasar tespiti bir satırdır. Bina / worksite / sektör / tehlike anahtarlarının yanında
+structural_damage, non_structural_damage, intervention_needs ve binanın
+structural_elements matrisinin her hücresi ayrı bir sütun olur
+('structural_damage.walls.cracks' gibi, bkz. exports.flatten).
+
+Sütun tipleri tüm veri taranarak belirlenir: sadece tam sayı görülen hücre int64,
+tam sayı + ondalık float64, sadece true/false bool, karışık ya da metin olanlar string.
+Veri RecordBatch parçaları halinde yazılır; bellek satır sayısıyla büyümez.
+Tarama ve yazma iki ayrı sorgudur; ikisi de tarama öncesi sabitlenen en büyük pk ile
+sınırlanır (CSV dışa aktarımındaki gibi, core/exports.py).
+
+pyarrow isteğe bağlıdır (pip install pyarrow); sadece bu dışa aktarım kullanılınca yüklenir.
+"""
+from django.db.models import Max
+
+from .exports import flatten
+from .models import DamageAssessment
+
+FORMATS = ('parquet', 'arrow')
+BATCH_ROWS = 5000
+CHUNK_SIZE = 2000
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# Worksite binanın site_assessment'ından alınır (güncel hasar durumu, özetler ve öncelik indeksiyle aynı)
+SITE_WORKSITE = 'building__site_assessment__worksite'
+
+# Sabit anahtar sütunları: (çıktı adı, ORM yolu, arrow tipi adı)
+KEY_COLUMNS = (
+    ('damage_id', 'pk', 'int64'),
+    ('building_id', 'building_id', 'int64'),
+    ('building_code', 'building__building_code', 'string'),
+    ('building_name', 'building__building_name', 'string'),
+    ('worksite_id', f'{SITE_WORKSITE}_id', 'int64'),
+    ('worksite_name', f'{SITE_WORKSITE}__name', 'string'),
+    ('sector_id', f'{SITE_WORKSITE}__sector_id', 'int64'),
+    ('sector_name', f'{SITE_WORKSITE}__sector__name', 'string'),
+    ('hazard_type', 'hazard_type', 'string'),
+    ('overall_damage', 'overall_damage', 'string'),
+    ('assessed_at', 'created_at', 'timestamp'),
+)
+
+# Düzleştirilen matrisler: (sütun öneki, ORM yolu)
+MATRIX_COLUMNS = (
+    ('structural_damage', 'structural_damage'),
+    ('non_structural_damage', 'non_structural_damage'),
+    ('intervention_needs', 'intervention_needs'),
+    ('building_structural_elements', 'building__structural_elements'),
+)
+
+
+class ColumnarExportUnavailable(Exception):
+    """pyarrow kurulu değil."""
+
+
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ColumnarExportUnavailable(
+            "Columnar export requires pyarrow. Install it with: pip install pyarrow"
+        )
+    return pyarrow
+
+
+def matrix_queryset():
+    return DamageAssessment.objects.order_by('pk')
+
+
+def _kind(value):
+    # bool, int'in alt sınıfı olduğu için tip birebir karşılaştırılır
+    kind = type(value)
+    if kind in (bool, int, float):
+        return kind
+    return str
+
+
+def infer_matrix_columns(queryset):
+    """Matris hücrelerini tarar: {sütun adı: görülen değer tipleri}, sütunlar matris sırasıyla."""
+    found = {prefix: {} for prefix, _ in MATRIX_COLUMNS}
+    paths = [path for _, path in MATRIX_COLUMNS]
+    for values in queryset.values_list(*paths).iterator(chunk_size=CHUNK_SIZE):
+        for (prefix, _), value in zip(MATRIX_COLUMNS, values):
+            for column, cell in flatten(value, prefix).items():
+                kinds = found[prefix].setdefault(column, set())
+                if cell is not None:
+                    kinds.add(_kind(cell))
+    return {column: kinds for prefix, _ in MATRIX_COLUMNS for column, kinds in sorted(found[prefix].items())}
+
+
+def arrow_type(pa, kinds):
+    if kinds == {bool}:
+        return pa.bool_()
+    if kinds == {int}:
+        return pa.int64()
+    if kinds and kinds <= {int, float}:
+        return pa.float64()
+    return pa.string()
+
+
+def build_schema(pa, matrix_columns):
+    key_types = {'int64': pa.int64(), 'string': pa.string(), 'timestamp': pa.timestamp('us', tz='UTC')}
+    fields = [pa.field(name, key_types[kind]) for name, _, kind in KEY_COLUMNS]
+    fields += [pa.field(column, arrow_type(pa, kinds)) for column, kinds in matrix_columns.items()]
+    return pa.schema(fields)
+
+
+def _convert(value, kind):
+    """
+    Hücreyi sütun tipine uydurur. Tipler çıkarıldıktan sonra düzenlenen bir kayıt şemaya
+    uymayan değer taşıyabilir: string sütununda metne çevrilir, sayı / bool sütununda
+    uymayan değer boş (null) yazılır. Anahtar sütunlarında (kind boş) değer olduğu gibi kalır.
+    """
+    if value is None or not kind:
+        return value
+    if kind == 'string':
+        return value if isinstance(value, str) else str(value)
+    if kind == 'bool':
+        return value if type(value) is bool else None
+    if type(value) not in (int, float):
+        return None
+    if kind == 'int64':
+        return value if type(value) is int and INT64_MIN <= value <= INT64_MAX else None
+    try:
+        return float(value)
+    except OverflowError:
+        return None
+
+
+def write_damage_matrices(output, file_format='parquet', queryset=None):
+    """
+    Hasar matrislerini output'a (yol veya ikili dosya nesnesi) yazar.
+    Döner: {'rows', 'columns', 'matrix_columns'}
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format: {file_format}")
+    pa = load_pyarrow()
+    queryset = matrix_queryset() if queryset is None else queryset
+    # Tip taraması ve yazma aynı kayıt kümesini görsün: aralık tarama öncesi sabitlenir
+    last_pk = queryset.aggregate(last=Max('pk'))['last']
+    queryset = queryset.filter(pk__lte=last_pk or 0)
+
+    matrix_columns = infer_matrix_columns(queryset)
+    schema = build_schema(pa, matrix_columns)
+    key_count = len(KEY_COLUMNS)
+    # Matris sütunlarının tip adı: 'string', 'bool', 'int64', 'double'
+    kinds = [''] * key_count + [str(field.type) for field in schema][key_count:]
+    names = list(matrix_columns)
+
+    if file_format == 'parquet':
+        writer = pa.parquet.ParquetWriter(output, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(output, schema)
+
+    rows = 0
+    columns = [[] for _ in schema]
+    paths = [path for _, path, _ in KEY_COLUMNS] + [path for _, path in MATRIX_COLUMNS]
+
+    def flush():
+        arrays = [pa.array([_convert(v, kind) for v in values], type=field.type)
+                  for values, kind, field in zip(columns, kinds, schema)]
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+        for values in columns:
+            values.clear()
+
+    with writer:
+        for record in queryset.values_list(*paths).iterator(chunk_size=CHUNK_SIZE):
+            cells = {}
+            for (prefix, _), value in zip(MATRIX_COLUMNS, record[key_count:]):
+                cells.update(flatten(value, prefix))
+            for i, value in enumerate(record[:key_count]):
+                columns[i].append(value)
+            for i, name in enumerate(names, start=key_count):
+                columns[i].append(cells.get(name))
+            rows += 1
+            if rows % BATCH_ROWS == 0:
+                flush()
+        if columns[0]:
+            flush()
+
+    return {'rows': rows, 'columns': len(schema), 'matrix_columns': len(names)}
@@ -0,0 +1,69 @@
+# core/damage.py
+"""
+Hasar derecesi (overall_damage) için ortak sıralama ve "en kötü durum" motoru.
+Harita, raporlar ve dashboard'lar aynı şiddet sıralamasını buradan kullanır.
+"""
+from django.db.models import Case, When, Value, IntegerField, OuterRef, Subquery
+
+from .models import CurrentDamageState
+
+# Şiddet sıralaması (Büyük sayı = daha kötü hasar)
+SEVERITY_RANK = {
+    'NONE': 0,
+    'LIGHT': 1,
+    'MODERATE': 2,
+    'SEVERE': 3,
+    'COLLAPSED': 4,
+}
+
+CRITICAL_GRADES = ['SEVERE', 'COLLAPSED']
+
+# Harita rengi ve durum metni (Rapor yoksa NOT_ASSESSED kullanılır)
+DAMAGE_DISPLAY = {
+    'COLLAPSED': ('#e74a3b', "Critical (Collapsed)"),
+    'SEVERE': ('#e74a3b', "Critical (Severe)"),
+    'MODERATE': ('#fd7e14', "Moderate Damage"),
+    'LIGHT': ('#f6c23e', "Light Damage"),
+    'NONE': ('#1cc88a', "No Damage"),
+}
+NOT_ASSESSED = ('#858796', "Not Assessed")
+
+
+def severity_rank(field='overall_damage'):
+    """
+    overall_damage alanını SQL tarafında sayısal şiddete çevirir (CASE WHEN).
+    Bilinmeyen değerler -1 olur, böylece her zaman en alta düşer.
+    """
+    return Case(
+        *[When(**{field: grade}, then=Value(rank)) for grade, rank in SEVERITY_RANK.items()],
+        default=Value(-1),
+        output_field=IntegerField(),
+    )
+
+
+def annotate_worst_damage(worksites):
+    """
+    Worksite queryset'ine en kötü güncel hasar derecesini ve bu dereceyi raporlayan
+    en son takımı ekler (Tek SQL, worksite başına ek sorgu yok).
+    Sadece her bina / tehlike için en son tespit sayılır (CurrentDamageState);
+    yeniden değerlendirilmiş binaların eski dereceleri haritayı etkilemez.
+
+    Eklenen alanlar:
+    - worst_damage: 'COLLAPSED', 'SEVERE' ... veya rapor yoksa None
+    - worst_damage_team: En kötü dereceyi raporlayan son raporun takım adı
+    """
+    worst_states = CurrentDamageState.objects.filter(
+        worksite=OuterRef('pk')
+    ).order_by('-severity', '-assessed_at', '-pk')
+
+    return worksites.annotate(
+        worst_damage=Subquery(worst_states.values('overall_damage')[:1]),
+        worst_damage_team=Subquery(worst_states.values('assessment__assignment__team__name')[:1]),
+    )
+
+
+def damage_display(grade):
+    """Hasar derecesi için (renk, durum metni) döndürür."""
+    if grade is None:
+        return NOT_ASSESSED
+    return DAMAGE_DISPLAY.get(grade, DAMAGE_DISPLAY['NONE'])
@@ -0,0 +1,83 @@
+# core/damage_state.py
+"""
+Güncel hasar durumu: her (bina, tehlike türü) için en son DamageAssessment
+CurrentDamageState tablosunda tutulur.
+
+Bir bina zamanla birçok tespit alır (ana şok, artçılar, sonra yangın / sel).
+"En son" = en yeni created_at (eşitlikte büyük pk). Tespit kaydedilince,
+düzenlenince veya silinince (core/signals.py) ilgili anahtar yeniden okunur
+ve satır aynı transaction içinde güncellenir, eklenir veya silinir.
+
+Toplu işlemlerden (bulk_create, queryset.update) sonra rebuild_damage_states()
+çağrılmalı ('rebuild_damage_state' komutu).
+"""
+from django.db import transaction
+from django.db.models import Count
+
+from .damage import SEVERITY_RANK, CRITICAL_GRADES
+from .models import CurrentDamageState, DamageAssessment
+
+LATEST_ORDER = ('-created_at', '-pk')
+REBUILD_BATCH_SIZE = 1000
+
+# Tespitten kopyalanan alanlar. Worksite binanın site_assessment'ından alınır
+# (worksite / sektör özetleri aynı bina -> saha -> worksite zincirini izler, core/rollups.py)
+STATE_FIELDS = ('id', 'building_id', 'hazard_type', 'building__site_assessment__worksite_id', 'overall_damage', 'created_at')
+
+
+def state_values(assessment_id, worksite_id, overall_damage, created_at):
+    return {
+        'assessment_id': assessment_id,
+        'worksite_id': worksite_id,
+        'overall_damage': overall_damage,
+        'severity': SEVERITY_RANK.get(overall_damage, 0),
+        'critical': overall_damage in CRITICAL_GRADES,
+        'assessed_at': created_at,
+    }
+
+
+def refresh_damage_state(building_id, hazard_type):
+    """(bina, tehlike) için güncel durumu yeniden belirler. Döner: CurrentDamageState veya None."""
+    with transaction.atomic():
+        latest = DamageAssessment.objects.filter(
+            building_id=building_id, hazard_type=hazard_type
+        ).order_by(*LATEST_ORDER).values_list(*STATE_FIELDS).first()
+        if latest is None:
+            CurrentDamageState.objects.filter(building_id=building_id, hazard_type=hazard_type).delete()
+            return None
+        assessment_id, _, _, worksite_id, grade, created_at = latest
+        state, _ = CurrentDamageState.objects.update_or_create(
+            building_id=building_id, hazard_type=hazard_type,
+            defaults=state_values(assessment_id, worksite_id, grade, created_at),
+        )
+        return state
+
+
+def rebuild_damage_states(batch_size=REBUILD_BATCH_SIZE):
+    """Tabloyu tespit geçmişinden sıfırdan kurar (tek okuma sorgusu). Döner: durum sayısı."""
+    latest = {}
+    rows = DamageAssessment.objects.order_by('created_at', 'pk').values_list(*STATE_FIELDS)
+    for assessment_id, building_id, hazard, worksite_id, grade, created_at in rows.iterator(chunk_size=batch_size):
+        # Sıralı okunduğu için son görülen kayıt en yenisidir
+        latest[building_id, hazard] = (assessment_id, worksite_id, grade, created_at)
+
+    with transaction.atomic():
+        CurrentDamageState.objects.all().delete()
+        CurrentDamageState.objects.bulk_create(
+            [
+                CurrentDamageState(building_id=building_id, hazard_type=hazard, **state_values(*values))
+                for (building_id, hazard), values in latest.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(latest)
+
+
+def current_critical_states():
+    """Güncel durumu SEVERE / COLLAPSED olan (bina, tehlike) kayıtları, en yeni önce (indeksli)."""
+    return CurrentDamageState.objects.filter(critical=True).order_by('-assessed_at', '-pk')
+
+
+def critical_building_count():
+    """Güncel durumu SEVERE / COLLAPSED olan bina sayısı (kısmi kritik indeks; eski tespitler sayılmaz)."""
+    return CurrentDamageState.objects.filter(critical=True).aggregate(n=Count('building', distinct=True))['n']
@@ -0,0 +1,108 @@
+# core/exports.py
+"""
+Ham veri dışa aktarımı (CSV). Değerlendirme tabloları satır satır akıtılır:
+- Kayıtlar values_list(...).iterator(chunk_size) ile parça parça okunur, model nesnesi kurulmaz.
+- Çıktı StreamingHttpResponse ile gönderilir; sunucu belleği satır sayısından bağımsızdır.
+- JSON alanları düzleştirilir: {'walls': {'cracks': 'SEVERE'}} -> 'structural_damage.walls.cracks' sütunu.
+
+JSON alanlarının anahtarları kayıttan kayda değiştiği için başlık satırından önce
+sadece JSON sütunları bir kez taranır (anahtar yolları toplanır). Bu sırada BOM
+hemen gönderilir, böylece indirme beklemeden başlar. İki geçiş aynı anlık görüntüde
+çalışmadığından tarama başlamadan en büyük pk sabitlenir ve iki geçiş de bu aralıkla
+sınırlanır: arada eklenen kayıtlar başlıkta olmayan sütunlarla yarım yazılmaz,
+bir sonraki dışa aktarıma kalır.
+"""
+import csv
+import json
+from io import StringIO
+
+from django.db.models import JSONField, Max
+
+from .models import (
+    SiteAssessment, BuildingInventory, DamageAssessment, MovableHeritage, MovableTracking, IntangibleHeritage,
+)
+from .personnel_import import CSV_DELIMITER
+
+EXPORT_CHUNK_SIZE = 2000
+# Bu kadar satır birikince tek parça olarak gönderilir (her satır için ayrı yazma yapılmaz)
+ROWS_PER_WRITE = 500
+BOM = '﻿'  # Excel'in UTF-8'i tanıması için (içe aktarımdaki utf-8-sig ile aynı)
+
+# Form kayıtlarında ortak okunabilir sütunlar
+FORM_LABELS = ('worksite__name', 'assignment__team__name')
+
+# URL adı -> (model, id'lerin yanına eklenecek okunabilir ilişki alanları)
+EXPORTS = {
+    'sites': (SiteAssessment, FORM_LABELS),
+    'buildings': (BuildingInventory, FORM_LABELS + ('site_assessment__site_reference_code',)),
+    'damages': (DamageAssessment, FORM_LABELS + ('building__building_code', 'building__building_name')),
+    'assets': (MovableHeritage, FORM_LABELS + ('building__building_code',)),
+    'asset-movements': (MovableTracking, ('asset__object_name', 'asset__worksite__name')),
+    'intangible': (IntangibleHeritage, FORM_LABELS),
+}
+
+
+def flatten(value, prefix):
+    """
+    İç içe sözlüğü {'önek.anahtar.alt': değer} haline getirir.
+    Listeler tek hücrede JSON metni olarak kalır; boş sözlük / liste sütun üretmez.
+    """
+    if isinstance(value, dict):
+        flat = {}
+        for key, sub in value.items():
+            flat.update(flatten(sub, f"{prefix}.{key}"))
+        return flat
+    if isinstance(value, list):
+        return {prefix: json.dumps(value, ensure_ascii=False)} if value else {}
+    return {prefix: value}
+
+
+def export_columns(model):
+    """(düz sütunlar, JSON alanları). Yabancı anahtarlar id olarak (worksite_id ...) yazılır."""
+    plain, json_fields = [], []
+    for field in model._meta.concrete_fields:
+        if isinstance(field, JSONField):
+            json_fields.append(field.name)
+        else:
+            plain.append(field.attname)
+    return plain, json_fields
+
+
+def json_paths(queryset, json_fields):
+    """Sadece JSON sütunlarını tarayıp düzleştirilmiş sütun adlarını toplar (alan sırası korunur)."""
+    if not json_fields:
+        return []
+    found = {name: set() for name in json_fields}
+    for values in queryset.values_list(*json_fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        for name, value in zip(json_fields, values):
+            found[name].update(flatten(value, name))
+    return [path for name in json_fields for path in sorted(found[name])]
+
+
+def iter_csv(dataset):
+    """Dışa aktarımın CSV metnini parça parça üretir (StreamingHttpResponse için)."""
+    model, labels = EXPORTS[dataset]
+    plain, json_fields = export_columns(model)
+
+    yield BOM
+    # İki geçişin aynı kayıt kümesini görmesi için aralık tarama öncesi sabitlenir
+    last_pk = model.objects.aggregate(last=Max('pk'))['last']
+    queryset = model.objects.filter(pk__lte=last_pk or 0).order_by('pk')
+    paths = json_paths(queryset, json_fields)
+
+    buffer = StringIO()
+    writer = csv.writer(buffer, delimiter=CSV_DELIMITER)
+    writer.writerow([*plain, *labels, *paths])
+
+    fixed = len(plain) + len(labels)
+    rows = queryset.values_list(*plain, *labels, *json_fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for count, row in enumerate(rows, start=1):
+        flat = {}
+        for name, value in zip(json_fields, row[fixed:]):
+            flat.update(flatten(value, name))
+        writer.writerow([*row[:fixed], *(flat.get(path, '') for path in paths)])
+        if count % ROWS_PER_WRITE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -1,4 +1,7 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from .geometry import parse_geometry, geometry_summary
+from .spatial import sector_index
 from .models import Personnel, MovableTracking, Institution, JobTitle, Team,Sector, Worksite, Assignment,SiteAssessment, BuildingInventory, DamageAssessment, MovableHeritage, IntangibleHeritage
 class BootstrapFormMixin:
 
@@ -209,6 +212,20 @@ class WorksiteForm(forms.ModelForm):
                 'completion_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date', 'id': 'id_completion_date'}),
             }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        # Sektör seçilmediyse (ör. JS çalışmadı) konumdan sunucu tarafında bul
+        location = cleaned_data.get('location_data')
+        if location and not cleaned_data.get('sector'):
+            try:
+                summary = geometry_summary(parse_geometry(location))
+            except ValidationError:
+                return cleaned_data  # Hata model doğrulamasında gösterilir
+            sector_id = sector_index.sector_at(summary['centroid_lng'], summary['centroid_lat'])
+            if sector_id:
+                cleaned_data['sector'] = Sector.objects.filter(pk=sector_id).first()
+        return cleaned_data
+
 class AssignmentForm(forms.ModelForm):
     # Team ve Worksite için Select2 (Aramalı seçim)
     team = forms.ModelChoiceField(
@@ -0,0 +1,241 @@
+# core/geometry.py
+"""
+GeoJSON geometri yardımcıları (GeoDjango/GDAL olmadan).
+
+Leaflet'in toGeoJSON() çıktısı [lng, lat] sırasındadır; burada da
+tüm koordinatlar (x=lng, y=lat) olarak ele alınır.
+"""
+import json
+
+from django.core.exceptions import ValidationError
+
+GEOMETRY_TYPES = ('Point', 'LineString', 'Polygon', 'MultiPolygon')
+
+
+def _check_position(position):
+    if not isinstance(position, (list, tuple)) or len(position) < 2:
+        raise ValidationError("Invalid coordinate: %(pos)s", params={'pos': position})
+    lng, lat = position[0], position[1]
+    if isinstance(lng, bool) or isinstance(lat, bool) or not isinstance(lng, (int, float)) or not isinstance(lat, (int, float)):
+        raise ValidationError("Coordinates must be numbers: %(pos)s", params={'pos': position})
+    if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+        raise ValidationError("Coordinate out of range (lng, lat): %(pos)s", params={'pos': position})
+    return [float(lng), float(lat)]
+
+
+def _check_ring(ring):
+    if not isinstance(ring, list) or len(ring) < 4:
+        raise ValidationError("A polygon ring needs at least 4 positions.")
+    return [_check_position(p) for p in ring]
+
+
+def parse_geometry(raw):
+    """
+    location_data metnini (veya dict'i) doğrular ve normalize edilmiş
+    GeoJSON geometri dict'i döndürür. Hatalı veride ValidationError fırlatır.
+    """
+    if isinstance(raw, str):
+        try:
+            geom = json.loads(raw)
+        except ValueError:
+            raise ValidationError("Map coordinates are not valid JSON.")
+    else:
+        geom = raw
+
+    # Leaflet bazen Feature döndürebilir, geometriyi içinden al
+    if isinstance(geom, dict) and geom.get('type') == 'Feature':
+        geom = geom.get('geometry')
+
+    if not isinstance(geom, dict) or geom.get('type') not in GEOMETRY_TYPES:
+        raise ValidationError(
+            "Unsupported geometry. Expected one of: %(types)s", params={'types': ", ".join(GEOMETRY_TYPES)}
+        )
+
+    gtype, coords = geom['type'], geom.get('coordinates')
+    if gtype == 'Point':
+        coords = _check_position(coords)
+    elif gtype == 'LineString':
+        if not isinstance(coords, list) or len(coords) < 2:
+            raise ValidationError("A line needs at least 2 positions.")
+        coords = [_check_position(p) for p in coords]
+    elif gtype == 'Polygon':
+        if not isinstance(coords, list) or not coords:
+            raise ValidationError("A polygon needs at least one ring.")
+        coords = [_check_ring(r) for r in coords]
+    else:
+        if not isinstance(coords, list) or not coords:
+            raise ValidationError("A multipolygon needs at least one polygon.")
+        coords = [[_check_ring(r) for r in poly] for poly in coords]
+
+    return {'type': gtype, 'coordinates': coords}
+
+
+def iter_positions(geom):
+    """Geometrideki tüm [lng, lat] noktalarını sırayla verir."""
+    gtype, coords = geom['type'], geom['coordinates']
+    if gtype == 'Point':
+        yield coords
+    elif gtype == 'LineString':
+        yield from coords
+    elif gtype == 'Polygon':
+        for ring in coords:
+            yield from ring
+    else:
+        for poly in coords:
+            for ring in poly:
+                yield from ring
+
+
+def outer_rings(geom):
+    """Polygon / MultiPolygon dış halkaları."""
+    if geom['type'] == 'Polygon':
+        return [geom['coordinates'][0]]
+    if geom['type'] == 'MultiPolygon':
+        return [poly[0] for poly in geom['coordinates']]
+    return []
+
+
+def _ring_area_centroid(ring):
+    """Shoelace formülü: (işaretli alan, cx, cy)."""
+    area = cx = cy = 0.0
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+        cross = x0 * y1 - x1 * y0
+        area += cross
+        cx += (x0 + x1) * cross
+        cy += (y0 + y1) * cross
+    area /= 2.0
+    if area == 0:
+        return 0.0, None, None
+    return area, cx / (6.0 * area), cy / (6.0 * area)
+
+
+def geometry_summary(geom):
+    """
+    Geometri için sınır kutusu (bbox), merkez (centroid) ve nokta sayısı.
+    Poligonlarda alan ağırlıklı merkez, diğerlerinde noktaların ortalaması kullanılır.
+    """
+    positions = list(iter_positions(geom))
+    xs = [p[0] for p in positions]
+    ys = [p[1] for p in positions]
+
+    centroid = None
+    total_area = wx = wy = 0.0
+    for ring in outer_rings(geom):
+        area, cx, cy = _ring_area_centroid(ring)
+        if cx is not None:
+            total_area += abs(area)
+            wx += cx * abs(area)
+            wy += cy * abs(area)
+    if total_area:
+        centroid = (wx / total_area, wy / total_area)
+    else:
+        centroid = (sum(xs) / len(xs), sum(ys) / len(ys))
+
+    return {
+        'min_lng': min(xs), 'min_lat': min(ys),
+        'max_lng': max(xs), 'max_lat': max(ys),
+        'centroid_lng': centroid[0], 'centroid_lat': centroid[1],
+        'vertex_count': len(positions),
+    }
+
+
+# --- ÇOK ÇÖZÜNÜRLÜKLÜ SADELEŞTİRME (Douglas-Peucker) ---
+
+# Sadeleştirilmiş seviyeler: zoom -> ondalık hassasiyet (koordinat kuantalama)
+# Her seviye o zoom'da ~1 piksellik hata payıyla üretilir.
+SIMPLIFY_LEVELS = {
+    6: 3,
+    9: 4,
+    12: 5,
+    15: 6,
+}
+
+
+def degrees_per_pixel(zoom):
+    """Web Mercator'da (256px karo) bir pikselin boylam karşılığı."""
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def level_key(zoom):
+    """
+    İstenen zoom için kullanılacak seviye anahtarı ('z6', 'z9' ...).
+    En yakın daha detaylı seviye seçilir; en detaylı seviyenin üstünde None (tam geometri).
+    """
+    if zoom is None:
+        return None
+    for level in sorted(SIMPLIFY_LEVELS):
+        if zoom <= level:
+            return f"z{level}"
+    return None
+
+
+def _segment_distance(p, a, b):
+    """p noktasının [a, b] doğru parçasına uzaklığı (düzlemsel)."""
+    (px, py), (ax, ay), (bx, by) = p, a, b
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return ((px - ax) ** 2 + (py - ay) ** 2) ** 0.5
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    cx, cy = ax + t * dx, ay + t * dy
+    return ((px - cx) ** 2 + (py - cy) ** 2) ** 0.5
+
+
+def douglas_peucker(points, tolerance):
+    """Özyinelemesiz Douglas-Peucker: uç noktalar her zaman korunur."""
+    if len(points) < 3:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        max_dist, index = 0.0, None
+        for i in range(start + 1, end):
+            dist = _segment_distance(points[i], points[start], points[end])
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _quantize(points, precision):
+    """Koordinatları yuvarlar, art arda tekrar eden noktaları atar."""
+    result = []
+    for lng, lat in points:
+        q = [round(lng, precision), round(lat, precision)]
+        if not result or result[-1] != q:
+            result.append(q)
+    return result
+
+
+def _simplify_ring(ring, tolerance, precision):
+    simplified = _quantize(douglas_peucker(ring, tolerance), precision)
+    if len(simplified) < 4:
+        # Bu ölçekte çöken küçük halka: sadece kuantala
+        simplified = _quantize(ring, precision)
+    return simplified if len(simplified) >= 4 else ring
+
+
+def simplify_geometry(geom, tolerance, precision):
+    """Polygon / MultiPolygon / LineString için sadeleştirilmiş kopya (Point olduğu gibi döner)."""
+    gtype, coords = geom['type'], geom['coordinates']
+    if gtype == 'Polygon':
+        coords = [_simplify_ring(r, tolerance, precision) for r in coords]
+    elif gtype == 'MultiPolygon':
+        coords = [[_simplify_ring(r, tolerance, precision) for r in poly] for poly in coords]
+    elif gtype == 'LineString':
+        coords = _quantize(douglas_peucker(coords, tolerance), precision)
+        if len(coords) < 2:
+            coords = geom['coordinates']
+    return {'type': gtype, 'coordinates': coords}
+
+
+def simplified_levels(geom):
+    """Tüm seviyeler: {'z6': geometri, 'z9': ..., ...}"""
+    return {
+        f"z{zoom}": simplify_geometry(geom, degrees_per_pixel(zoom), precision)
+        for zoom, precision in SIMPLIFY_LEVELS.items()
+    }
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Worksite
+from core.spatial import assign_sectors, sector_index
+
+
+class Command(BaseCommand):
+    help = 'Worksite konumlarını sektör poligonlarıyla karşılaştırır ve sektörü boş olanlara atar.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Sadece kontrol et, veritabanına yazma')
+        parser.add_argument('--overwrite', action='store_true',
+                            help='Poligonu başka bir sektöre düşen worksite\'ların sektörünü de düzelt')
+        parser.add_argument('--sector', type=int,
+                            help='Sadece bu sektöre bağlı (veya sektörsüz) worksite\'ları kontrol et')
+
+    def handle(self, *args, **options):
+        worksites = Worksite.objects.all()
+        if options['sector']:
+            worksites = worksites.filter(sector_id=options['sector']) | worksites.filter(sector__isnull=True)
+
+        sector_index.rebuild()
+        report = assign_sectors(worksites, overwrite=options['overwrite'], dry_run=options['verify'])
+
+        rate = report['checked'] / report['seconds'] if report['seconds'] else 0
+        self.stdout.write(
+            f"Kontrol edilen: {report['checked']} worksite "
+            f"({len(sector_index.sectors)} sektör, {report['seconds']:.2f} sn, {rate:.0f} worksite/sn)"
+        )
+        self.stdout.write(f"  Sektör atanan (boştu): {report['assigned']}")
+        self.stdout.write(f"  Sektörü poligonla uyuşmayan: {report['mismatched']}")
+        self.stdout.write(f"  Hiçbir sektörün içinde değil: {report['outside']}")
+
+        if options['verify']:
+            self.stdout.write(self.style.WARNING("--verify: değişiklik yazılmadı."))
+        else:
+            changed = report['assigned'] + report['reassigned']
+            self.stdout.write(self.style.SUCCESS(f"İşlem tamamlandı. Güncellenen worksite: {changed}"))
@@ -0,0 +1,84 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.benchmarks import DEFAULT_REPEAT, DEFAULT_SCALES, compare, run_benchmarks
+from core.seeding import DEFAULT_SEED
+
+
+class Command(BaseCommand):
+    help = ('Ana görünümleri (home, reporting_dashboard, field_dashboard, worksite listesi, PDF raporu) '
+            'birkaç ölçekte üretilen veriyle ölçer: süre, SQL sayısı, SQL süresi, bellek tepe değeri. '
+            'Ayrı bir test veritabanı kullanılır; gerçek veriye dokunulmaz.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES),
+                            help=f"Worksite sayıları (varsayılan {' '.join(map(str, DEFAULT_SCALES))}).")
+        parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                            help=f'Sıcak önbellekle tekrar sayısı (varsayılan {DEFAULT_REPEAT}).')
+        parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Veri üretecinin tohumu.')
+        parser.add_argument('--output', default='benchmark_results.json', help='Sonuç dosyası (JSON).')
+        parser.add_argument('--baseline', default='benchmark_baseline.json',
+                            help='Karşılaştırılacak temel ölçüm (varsa).')
+        parser.add_argument('--save-baseline', action='store_true', help='Sonuçları temel ölçüm olarak da kaydeder.')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Regresyon veya süper-lineer ölçekleme varsa hata ile çıkar.')
+
+    def handle(self, *args, **options):
+        if min(options['scales']) < 1 or options['repeat'] < 1:
+            raise CommandError('--scales ve --repeat en az 1 olmalı.')
+
+        # Ölçümler flush + seed yapar: test veritabanında çalışılır
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = run_benchmarks(
+                options['scales'], seed=options['seed'], repeat=options['repeat'], progress=self.print_scale
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        regressions = [
+            f"{name}: super-linear scaling (exponent {curve['exponent']})"
+            for name, curve in results['curves'].items() if curve['superlinear']
+        ]
+        self.stdout.write("\nÖlçek eğrileri (log süre / log satır eğimi):")
+        for name, curve in results['curves'].items():
+            flags = [flag for flag in ('superlinear', 'queries_grow') if curve[flag]]
+            self.stdout.write(f"  {name:32} {curve['exponent']!s:>6}  sorgular {curve['queries']}  {' '.join(flags)}")
+
+        baseline_path = options['baseline']
+        if os.path.exists(baseline_path):
+            with open(baseline_path, encoding='utf-8') as f:
+                results['comparison'] = compare(results, json.load(f))
+            regressions += results['comparison']['regressions']
+            self.stdout.write(f"\nTemel ölçümle karşılaştırma ({baseline_path}):")
+            for message in results['comparison']['regressions'] or ['regresyon yok']:
+                self.stdout.write(f"  {message}")
+
+        self.write_json(options['output'], results)
+        if options['save_baseline']:
+            self.write_json(baseline_path, results)
+        self.stdout.write(self.style.SUCCESS(f"\nSonuçlar yazıldı: {options['output']}"))
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"{len(regressions)} regresyon bulundu:\n" + '\n'.join(regressions))
+
+    def write_json(self, path, results):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    def print_scale(self, scale):
+        self.stdout.write(
+            f"\n{scale['worksites']} worksite, {scale['rows']} satır (üretim {scale['seed_seconds']} sn)\n"
+            f"  {'görünüm':32} {'durum':>5} {'soğuk ms':>9} {'ms':>8} {'sorgu':>6} {'SQL ms':>8} {'bellek KB':>10}"
+        )
+        for name, view in scale['views'].items():
+            self.stdout.write(
+                f"  {name:32} {view['status']:>5} {view['cold']['wall'] * 1000:9.1f} {view['wall'] * 1000:8.1f} "
+                f"{view['queries']:>6} {view['sql_time'] * 1000:8.1f} {view['peak_memory_kb']:>10}"
+            )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.query_plans import check_query_plans
+
+
+class Command(BaseCommand):
+    help = ('Sık çalışan sorguların (core/query_plans.py) planlarını yazdırır. '
+            'Bir sorgu tabloyu indeks kullanmadan tarıyorsa hata ile çıkar.')
+
+    def handle(self, *args, **options):
+        failed = []
+        for name, plan, scans in check_query_plans():
+            self.stdout.write(self.style.ERROR(f"{name}: FULL SCAN ({', '.join(scans)})") if scans else name)
+            for line in plan:
+                self.stdout.write(f"    {line}")
+            if scans:
+                failed.append(name)
+        if failed:
+            raise CommandError(f"Tam tablo taraması yapan sorgular: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("Tüm sorgular indeks kullanıyor."))
@@ -0,0 +1,32 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.columnar import FORMATS, ColumnarExportUnavailable, write_damage_matrices
+
+
+class Command(BaseCommand):
+    help = ('Hasar matrislerini (her hücre ayrı sütun) Parquet veya Arrow IPC dosyasına yazar; '
+            'pandas / DuckDB ile analiz için. pyarrow gerektirir.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', type=str, help='Yazılacak dosya (örn. damage_matrices.parquet)')
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Dosya biçimi (varsayılan: uzantıdan, .arrow değilse parquet)')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        file_format = options['format'] or ('arrow' if output.endswith(('.arrow', '.feather')) else 'parquet')
+
+        started = time.perf_counter()
+        try:
+            report = write_damage_matrices(output, file_format)
+        except ColumnarExportUnavailable as e:
+            raise CommandError(str(e))
+
+        size = os.path.getsize(output) / (1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['rows']} hasar tespiti, {report['columns']} sütun ({report['matrix_columns']} matris hücresi) "
+            f"yazıldı: {os.path.abspath(output)} ({size:.1f} MB, {time.perf_counter() - started:.1f} sn)"
+        ))
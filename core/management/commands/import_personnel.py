@@ -1,153 +1,119 @@
-import csv
 import os
-from django.core.management.base import BaseCommand
-from core.models import Personnel, Country, Institution, JobTitle, ExpertiseType
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from core.models import ImportCheckpoint
+from core.statistics import rebuild_statistics
+from core.personnel_import import PersonnelImporter, DEFAULT_BATCH_SIZE, file_hash, iter_chunks
+
+# İlerleme satırı en fazla bu aralıkla yazılır (saniye)
+PROGRESS_INTERVAL = 2.0
+
 
 class Command(BaseCommand):
-    help = 'CSV dosyasından personelleri içe aktarır. (Noktalı Virgül Destekli)'
+    help = 'CSV dosyasından personelleri içe aktarır. (Noktalı Virgül Destekli, parça parça ve kaldığı yerden devam edebilir)'
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='Yüklenecek CSV dosyasının yolu')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Dosyayı doğrula ve raporla, veritabanına yazma')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f'Her transaction\'da işlenecek satır sayısı (varsayılan: {DEFAULT_BATCH_SIZE})')
+        parser.add_argument('--resume', action='store_true',
+                            help='Aynı dosyanın yarıda kalan içe aktarımına kaldığı satırdan devam et')
 
     def handle(self, *args, **kwargs):
         csv_file_path = kwargs['csv_file']
+        dry_run = kwargs['dry_run']
+        batch_size = kwargs['batch_size']
 
         if not os.path.exists(csv_file_path):
-            self.stdout.write(self.style.ERROR(f'Dosya bulunamadı: {csv_file_path}'))
-            return
-
-        # 1. MEVCUT ÜLKELERİ HAFIZAYA AL
-        existing_countries = {c.name.upper(): c for c in Country.objects.all()}
-
-        # 2. ÜLKE EŞLEŞTİRME LİSTESİ
-        country_mapping = {
-            "TURCHIA": "Türkiye",
-            "TURKEY": "Türkiye",
-            "TR": "Türkiye",
-            "BELGIUM": "Belgium",
-            "BULGARIA": "Bulgaria",
-            "CROATIA": "Croatia",
-            "CYPRUS": "Cyprus",
-            "CZECH REPUBLIC": "Czech Republic",
-            "DENMARK": "Denmark",
-            "FRANCE": "France",
-            "GERMANY": "Germany",
-            "GREECE": "Greece",
-            "ICELAND": "Iceland",
-            "ITALY": "Italy",
-            "LATVIA": "Latvia",
-            "MOLDOVA": "Moldova",
-            "NETHERLANDS": "Netherlands",
-            "POLAND": "Poland",
-            "PORTUGAL": "Portugal",
-            "ROMANIA": "Romania",
-            "SERBIA": "Serbia",
-            "SPAIN": "Spain",
-            "SWEDEN": "Sweden",
-            "UNITED KINGDOM": "United Kingdom",
-            "UK": "United Kingdom",
-            "USA": "United States",
-            "BOSNIA AND HERZEGOVINA": "Bosnia and Herzegovina",
-            "NORTH MACEDONIA": "North Macedonia",
-        }
-
-        self.stdout.write("İçe aktarım başlıyor (Delimiter: Noktalı Virgül)...")
-
-        with open(csv_file_path, newline='', encoding='utf-8-sig') as csvfile:
-            # ÖNEMLİ DÜZELTME: delimiter=';' eklendi
-            reader = csv.DictReader(csvfile, delimiter=';')
-            
-            count_created = 0
-            count_updated = 0
-            
-            for row in reader:
+            raise CommandError(f'Dosya bulunamadı: {csv_file_path}')
+        if batch_size < 1:
+            raise CommandError('--batch-size en az 1 olmalı.')
+
+        checkpoint = None
+        skip = 0
+        if not dry_run:
+            checkpoint, skip = self.load_checkpoint(csv_file_path, kwargs['resume'])
+            if checkpoint is None:
+                return
+
+        mode = "DRY-RUN, yazma yok" if dry_run else f"parça: {batch_size} satır"
+        self.stdout.write(f"İçe aktarım başlıyor (Delimiter: Noktalı Virgül, {mode})...")
+        if skip:
+            self.stdout.write(f"Kontrol noktası bulundu: ilk {skip} satır atlanıyor.")
+
+        started = last_progress = time.perf_counter()
+        importer = PersonnelImporter(dry_run=dry_run)
+        rows_done = skip
+
+        try:
+            for chunk in iter_chunks(csv_file_path, batch_size, skip=skip):
+                rows_done += len(chunk)
+                advance = None
+                if checkpoint:
+                    advance = lambda: ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(rows_done=rows_done)
                 try:
-                    # --- A. İSİM AYRIŞTIRMA ---
-                    full_name = row.get('NAME', '').strip()
-                    if not full_name: # İsim yoksa satırı atla
-                        continue
-
-                    if ' ' in full_name:
-                        parts = full_name.rsplit(' ', 1)
-                        first_name = parts[0]
-                        last_name = parts[1]
-                    else:
-                        first_name = full_name
-                        last_name = ""
-
-                    # --- B. ÜLKE EŞLEŞTİRME ---
-                    raw_country = row.get('COUNTRY', '').strip().upper()
-                    country_obj = None
-
-                    if raw_country in country_mapping:
-                        target_db_name = country_mapping[raw_country]
-                        country_obj = existing_countries.get(target_db_name.upper())
-                        if not country_obj:
-                            country_obj, _ = Country.objects.get_or_create(name=target_db_name)
-                            existing_countries[target_db_name.upper()] = country_obj
-                    else:
-                        if raw_country in existing_countries:
-                            country_obj = existing_countries[raw_country]
-                        else:
-                            clean_name = raw_country.title()
-                            # Boş ülke gelirse oluşturma
-                            if clean_name: 
-                                country_obj, _ = Country.objects.get_or_create(name=clean_name)
-                                existing_countries[clean_name.upper()] = country_obj
-
-                    # --- C. KURUM ---
-                    inst_name = row.get('INSTITUTION', '').strip()
-                    institution_obj = None
-                    if inst_name:
-                        institution_obj, _ = Institution.objects.get_or_create(name=inst_name)
-
-                    # --- D. UZMANLIK ---
-                    exp_code = row.get('EXPERTISE', '').strip()
-                    primary_expertise_obj = None
-                    if exp_code:
-                        primary_expertise_obj, _ = ExpertiseType.objects.get_or_create(code=exp_code)
-
-                    # --- E. E-MAIL KONTROLÜ ---
-                    email = row.get('E-MAIL', '').strip()
-                    if not email:
-                        self.stdout.write(self.style.WARNING(f"E-mail eksik, satır atlandı: {full_name}"))
-                        continue
-
-                    # --- F. KAYIT İŞLEMİ ---
-                    personnel, created = Personnel.objects.update_or_create(
-                        email=email,
-                        defaults={
-                            'first_name': first_name,
-                            'last_name': last_name,
-                            'gender': row.get('MALE/FEMALE', 'M').strip()[0].upper(),
-                            'sq_number': row.get('SQ', '').strip(),
-                            'country': country_obj,
-                            'institution': institution_obj,
-                            'primary_expertise': primary_expertise_obj,
-                            'professional_profile': row.get('PROFESSIONAL PROFILE', ''),
-                            # CSV'de iki tane SPECIFIC EXPERTISE sütunu var, DictReader sonuncusunu alır.
-                            'specific_expertise_details': row.get('SPECIFIC EXPERTISE', ''),
-                            'mobile': row.get('MOBILE', ''),
-                            'insurance_code': row.get('CODE FOR INSURANCE', ''),
-                            'notes': row.get('NOTES', ''),
-                            'private_notes': row.get('private e-mail/other notes', '')
-                        }
+                    importer.import_rows(chunk, before_commit=advance)
+                except DatabaseError as e:
+                    raise CommandError(
+                        f"Satır {chunk[0][0]}-{chunk[-1][0]} yazılamadı, bu parça geri alındı: {e}\n"
+                        f"{rows_done - len(chunk)} satır kaydedildi; düzeltip --resume ile devam edebilirsiniz."
                     )
 
-                    # --- G. JOB TITLE ---
-                    job_title_str = row.get('JOB TITLE', '').strip()
-                    if job_title_str:
-                        jt_obj, _ = JobTitle.objects.get_or_create(title=job_title_str)
-                        personnel.job_titles.add(jt_obj)
-
-                    if created:
-                        count_created += 1
-                        self.stdout.write(f"Eklendi: {full_name} ({country_obj.name if country_obj else '-'})")
-                    else:
-                        count_updated += 1
-                        # self.stdout.write(f"Güncellendi: {full_name}") 
-
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Hata ({full_name}): {str(e)}"))
-
-        self.stdout.write(self.style.SUCCESS(f'\nİŞLEM TAMAMLANDI:\n- {count_created} yeni personel eklendi.\n- {count_updated} mevcut personel güncellendi.'))
\ No newline at end of file
+                now = time.perf_counter()
+                if now - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = now
+                    processed = rows_done - skip
+                    self.stdout.write(f"  {rows_done} satır işlendi ({processed / (now - started):.0f} satır/sn)")
+        finally:
+            if not dry_run:
+                # bulk_create / bulk_update sinyal göndermez: KPI satırı yeniden sayılır
+                rebuild_statistics()
+
+        if checkpoint:
+            ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(rows_done=rows_done, completed=True)
+        self.print_report(importer, time.perf_counter() - started)
+
+    def load_checkpoint(self, path, resume):
+        """(kontrol noktası, atlanacak satır) döndürür; yapılacak iş yoksa (None, 0)."""
+        checkpoint, created = ImportCheckpoint.objects.get_or_create(
+            file_hash=file_hash(path), defaults={'file_name': os.path.basename(path)}
+        )
+        if created:
+            return checkpoint, 0
+        if not resume:
+            if not checkpoint.completed and checkpoint.rows_done:
+                self.stdout.write(self.style.WARNING(
+                    f"Bu dosyanın yarım kalmış bir içe aktarımı var ({checkpoint.rows_done} satır). "
+                    f"Baştan başlanıyor; kaldığı yerden devam için --resume kullanın."
+                ))
+            ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(rows_done=0, completed=False)
+            return checkpoint, 0
+        if checkpoint.completed:
+            self.stdout.write(self.style.SUCCESS(
+                f"Bu dosya zaten tamamen içe aktarılmış ({checkpoint.rows_done} satır). Yapılacak iş yok."
+            ))
+            return None, 0
+        return checkpoint, checkpoint.rows_done
+
+    def print_report(self, importer, seconds):
+        report = importer.report
+        for line_no, message in importer.errors:
+            self.stdout.write(self.style.WARNING(f"Satır {line_no} atlandı: {message}"))
+        if report['skipped'] > len(importer.errors):
+            self.stdout.write(self.style.WARNING(f"... ve {report['skipped'] - len(importer.errors)} hata daha"))
+
+        title = 'DRY-RUN TAMAMLANDI (hiçbir şey yazılmadı)' if importer.dry_run else 'İŞLEM TAMAMLANDI'
+        rate = report['rows'] / seconds if seconds else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"\n{title} ({report['rows']} satır, {seconds:.1f} sn, {rate:.0f} satır/sn):\n"
+            f"- {report['created']} yeni personel eklendi.\n"
+            f"- {report['updated']} mevcut personel güncellendi.\n"
+            f"- {report['skipped']} satır atlandı, {report['duplicates']} tekrar eden e-posta.\n"
+            f"- Yeni kayıtlar: {report['new_countries']} ülke, {report['new_institutions']} kurum, "
+            f"{report['new_expertise']} uzmanlık, {report['new_job_titles']} unvan."
+        ))
@@ -0,0 +1,50 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.provisioning import provision_users, pending_personnel, open_credentials_file, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Kullanıcısı olmayan personel için toplu sistem kullanıcısı oluşturur, tek seferlik şifreleri dosyaya yazar.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str,
+                            help='Şifrelerin yazılacağı CSV (varsayılan: credentials_<tarih>.csv). Var olan dosyanın üstüne yazılmaz.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Şifre hash\'i için süreç sayısı (varsayılan: CPU çekirdeği sayısı)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f'Her transaction\'da oluşturulacak kullanıcı (varsayılan: {DEFAULT_BATCH_SIZE})')
+
+    def handle(self, *args, **options):
+        output = options['output'] or f"credentials_{timezone.now():%Y%m%d_%H%M%S}.csv"
+        workers = options['workers'] or os.cpu_count() or 1
+        if workers < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers ve --batch-size en az 1 olmalı.')
+
+        total = pending_personnel().count()
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Kullanıcısı olmayan personel yok. Yapılacak iş yok."))
+            return
+
+        try:
+            credentials_file = open_credentials_file(output)
+        except FileExistsError:
+            raise CommandError(f'Dosya zaten var, üstüne yazılmadı: {output}')
+
+        self.stdout.write(f"{total} personel için kullanıcı oluşturuluyor ({workers} süreç)...")
+        with credentials_file:
+            report = provision_users(credentials_file, workers=workers, batch_size=options['batch_size'])
+
+        rate = report['created'] / report['hash_seconds'] if report['hash_seconds'] else 0
+        if report['skipped_existing']:
+            self.stdout.write(self.style.WARNING(
+                f"{report['skipped_existing']} personelin e-postasıyla zaten bir kullanıcı var, atlandı."
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"\nİŞLEM TAMAMLANDI ({report['seconds']:.1f} sn, hash: {rate:.0f} şifre/sn):\n"
+            f"- {report['created']} kullanıcı oluşturuldu ve personele bağlandı.\n"
+            f"- Tek seferlik şifreler: {os.path.abspath(output)}\n"
+            f"  Dosyayı personele ilettikten sonra silin."
+        ))
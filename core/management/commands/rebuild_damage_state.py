@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.damage_state import rebuild_damage_states
+from core.map_data import bump_data_version
+from core.priority import recompute_priorities
+from core.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = ('Güncel hasar durumu tablosunu (bina ve tehlike başına en son tespit) tespit geçmişinden yeniden kurar; '
+            'öncelik indeksi ve worksite / sektör özetleri de yeniden hesaplanır. '
+            'Sinyal göndermeyen toplu işlemlerden sonra çalıştırın.')
+
+    def handle(self, *args, **options):
+        states = rebuild_damage_states()
+        _, changed = recompute_priorities()
+        # bulk_create sinyal göndermez: derece sayaçları da yeniden sayılır
+        rebuild_rollups()
+        # Harita önbelleği güncel durumdan üretiliyor
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Güncel hasar durumu yeniden oluşturuldu: {states} bina/tehlike kaydı, {changed} binanın önceliği güncellendi."
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.map_data import bump_data_version
+from core.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = ('Worksite ve sektör hasar özetlerini (bina, güncel hasar dereceleri, eser, somut olmayan miras sayıları) '
+            'kaynak tablolardan sıfırdan sayar. Sinyal göndermeyen toplu işlemlerden sonra çalıştırın.')
+
+    def handle(self, *args, **options):
+        worksites, sectors = rebuild_rollups()
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Hasar özetleri yeniden oluşturuldu: {worksites} worksite, {sectors} sektör."
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = ('Operasyon istatistik satırını (KPI) tablolardan sıfırdan sayarak yeniden oluşturur. '
+            'Sinyal göndermeyen toplu işlemlerden (bulk_create, queryset.update) sonra çalıştırın.')
+
+    def handle(self, *args, **options):
+        stats = rebuild_statistics()
+        self.stdout.write(self.style.SUCCESS(
+            f"İstatistikler yeniden oluşturuldu: {stats.total_sites} saha, {stats.total_buildings} bina, "
+            f"{sum(stats.damage_grades.values())} hasar tespiti, {stats.total_assets} eser, "
+            f"{stats.total_personnel} personel ({stats.total_countries} ülke)."
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.priority import RECOMPUTE_BATCH_SIZE, recompute_priorities, top_priority_buildings
+
+
+class Command(BaseCommand):
+    help = ('Tüm binaların öncelik indeksini (priority_index) yeniden hesaplar. '
+            'core/priority.py içindeki ağırlıklar değiştiğinde veya toplu veri yüklemesinden sonra çalıştırın.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=RECOMPUTE_BATCH_SIZE,
+                            help=f'Tek seferde işlenecek bina sayısı (varsayılan {RECOMPUTE_BATCH_SIZE}).')
+        parser.add_argument('--top', type=int, default=0, help='Bitince en yüksek öncelikli N binayı listeler.')
+
+    def handle(self, *args, **options):
+        total, changed = recompute_priorities(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Öncelik indeksi yeniden hesaplandı: {total} bina, {changed} bina güncellendi."
+        ))
+        for building in top_priority_buildings(options['top']) if options['top'] else []:
+            worksite = building.site_assessment.worksite
+            sector = worksite.sector.name if worksite.sector_id else '-'
+            self.stdout.write(f"{building.priority_index:6.2f}  {building.building_code}  {building.building_name}  ({sector})")
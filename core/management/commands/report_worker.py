@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.reports import process_next_job
+
+
+class Command(BaseCommand):
+    help = 'Kuyruktaki görev raporu (PDF) işlerini arka planda üretir.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Bekleyen işleri bitir ve çık (cron / test için)')
+        parser.add_argument('--poll', type=float, default=2.0,
+                            help='Kuyruk boşken kaç saniyede bir bakılacağı (varsayılan: 2)')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rapor worker'ı başladı." + ("" if options['once'] else " Durdurmak için Ctrl+C."))
+        try:
+            while True:
+                job = process_next_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                if job.status == 'DONE':
+                    seconds = (job.finished_at - job.started_at).total_seconds()
+                    self.stdout.write(self.style.SUCCESS(f"Rapor #{job.pk} hazır ({seconds:.1f} sn): {job.file_name}"))
+                else:
+                    self.stdout.write(self.style.ERROR(f"Rapor #{job.pk} başarısız: {job.message}"))
+        except KeyboardInterrupt:
+            self.stdout.write("Durduruldu.")
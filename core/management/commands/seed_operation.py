@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Personnel, Worksite
+from core.seeding import DEFAULT_BATCH_SIZE, DEFAULT_SCALE, DEFAULT_SEED, SCALES, OperationSeeder, scale_plan
+
+
+class Command(BaseCommand):
+    help = ('Yük ve ölçek testleri için sentetik bir operasyon üretir (sektörler, worksite\'lar, takımlar, personel, '
+            'görevler, tespitler, binalar, hasarlar, eserler, somut olmayan miras). '
+            'Aynı --seed ve ölçek her zaman aynı veriyi üretir. Boş bir veritabanında çalıştırın.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default=DEFAULT_SCALE,
+                            help=f"Hazır ölçek: {', '.join(f'{name}={n} worksite' for name, n in SCALES.items())} "
+                                 f"(varsayılan {DEFAULT_SCALE}).")
+        parser.add_argument('--worksites', type=int, help='Worksite sayısı (--scale yerine).')
+        parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f'Rastgele üreteç tohumu (varsayılan {DEFAULT_SEED}).')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f'bulk_create parça boyu (varsayılan {DEFAULT_BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        worksites = options['worksites'] or SCALES[options['scale']]
+        if worksites < 1 or options['batch_size'] < 1:
+            raise CommandError('--worksites ve --batch-size en az 1 olmalı.')
+        if Worksite.objects.exists() or Personnel.objects.exists():
+            raise CommandError('Veritabanında operasyon verisi var; seed_operation boş bir veritabanında çalıştırılmalı.')
+
+        plan = scale_plan(worksites)
+        self.stdout.write(
+            f"Üretiliyor (seed {options['seed']}): {plan['worksites']} worksite, {plan['sectors']} sektör, "
+            f"{plan['teams']} takım, {plan['personnel']} personel..."
+        )
+        started = time.perf_counter()
+
+        def progress(done, total):
+            self.stdout.write(f"  {done}/{total} worksite ({time.perf_counter() - started:.1f} sn)")
+
+        counts = OperationSeeder(worksites, seed=options['seed'], batch_size=options['batch_size']).run(progress)
+        seconds = time.perf_counter() - started
+        total = sum(counts.values())
+        for name, count in counts.items():
+            self.stdout.write(f"- {name}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Sentetik operasyon hazır: {total} satır, {seconds:.1f} sn ({total / seconds:.0f} satır/sn). "
+            f"İstatistik, güncel hasar durumu, öncelik indeksi ve özetler yeniden oluşturuldu."
+        ))
@@ -0,0 +1,259 @@
+# core/map_data.py
+"""
+Harita verisi (map_data) üreticileri ve versiyonlu önbellek katmanı.
+
+build_* fonksiyonları veriyi veritabanından sıfırdan üretir.
+get_* fonksiyonları ise hazır yapıyı veri versiyonu (data version) ile saklar;
+Sector, Worksite, Assignment, DamageAssessment kaydedildiğinde / silindiğinde
+core/signals.py versiyonu artırır ve bir sonraki okumada veri yeniden üretilir.
+Versiyon veritabanında (DataVersion) tutulur; başka süreçlerdeki yazmalar da görülür.
+"""
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, F, Q, JSONField
+from django.db.models.fields.json import KeyTransform
+from django.db.models.functions import Coalesce, Greatest
+
+from .damage import annotate_worst_damage, damage_display
+from .geometry import degrees_per_pixel, level_key, SIMPLIFY_LEVELS
+from .models import DataVersion, Sector, Worksite, Assignment
+
+DATA_VERSION_KEY = 'core:map_data:version'
+# Eski versiyonlara ait kopyalar bir gün sonra kendiliğinden düşer
+PAYLOAD_TIMEOUT = 60 * 60 * 24
+
+# Süreç içi (process-local) kopya: {isim: (versiyon, veri)}
+_payloads = {}
+_stats = Counter()
+
+
+def with_sector_shape(sectors, zoom):
+    """
+    Sektör sorgusuna zoom'a uygun geometriyi 'shape' olarak ekler.
+    Sadece istenen seviye veritabanından okunur; en detaylı seviyenin üstünde tam geometri.
+    """
+    key = level_key(zoom)
+    shape = KeyTransform(key, 'geometry_levels') if key else F('geometry')
+    return sectors.annotate(shape=Coalesce(shape, F('geometry'), output_field=JSONField()))
+
+
+def sector_shapes(*extra_fields, zoom=max(SIMPLIFY_LEVELS)):
+    """
+    Haritada çizilecek sektörler: id, name, color, geometry (+ istenen ek alanlar).
+    Varsayılan olarak en detaylı sadeleştirilmiş seviye gönderilir (Ekranda fark edilmez).
+    """
+    rows = with_sector_shape(Sector.objects.filter(geometry__isnull=False), zoom).values(
+        'id', 'name', 'color', 'shape', *extra_fields
+    )
+    return [_shape_as_geometry(r) for r in rows]
+
+
+def _shape_as_geometry(row):
+    row['geometry'] = row.pop('shape')
+    return row
+
+
+def operational_worksite_rows(worksites):
+    """
+    Operasyon haritası için worksite satırları.
+    Renk Mantığı:
+    - Completed (Worksite Kapalı) = Green (#1cc88a)
+    - Assigned / Ongoing (Aktif Ekip Var) = Orange (#fd7e14)
+    - Not Assigned (Aktif Ekip Yok ve Açık) = Gray (#858796)
+    """
+    # Aktif/Geçmiş görevler ve takım adları toplu çekilir (worksite sayısından bağımsız 3 sorgu)
+    active_qs = Assignment.objects.filter(status='ACTIVE').select_related('team')
+    history_qs = Assignment.objects.exclude(status='ACTIVE').select_related('team').order_by('-end_time')
+    worksites = worksites.select_related(
+        'sector'
+    ).annotate(
+        has_active_team=Exists(Assignment.objects.filter(worksite=OuterRef('pk'), status='ACTIVE'))
+    ).prefetch_related(
+        Prefetch('assignments', queryset=active_qs, to_attr='active_assignments'),
+        Prefetch('assignments', queryset=history_qs, to_attr='history_assignments'),
+    )
+
+    rows = []
+    for w in worksites:
+        # --- RENK MANTIĞI ---
+        if w.status == 'COMPLETED':
+            # İş Tamamlandı -> YEŞİL
+            map_color = '#1cc88a' 
+            status_text = f"COMPLETED ({w.completion_date or 'No Date'})"
+        elif w.has_active_team:
+            # Aktif Ekip Var -> TURUNCU
+            map_color = '#fd7e14'
+            status_text = "ONGOING (Team Assigned)"
+        else:
+            # Ekip Yok ve Açık -> GRİ
+            map_color = '#858796'
+            status_text = "NOT ASSIGNED"
+
+        # Pop-up verileri (Eski mantıkla aynı, sadece renk ekledik)
+        active_teams_list = []
+        for a in w.active_assignments:
+            active_teams_list.append({
+                'team': a.team.name,
+                'start': a.start_time.strftime('%d/%m %H:%M'),
+                'assignment_id': a.id
+            })
+        
+        # Geçmiş verileri
+        history_teams = []
+        for a in w.history_assignments:
+            history_teams.append({
+                'team': a.team.name,
+                'period': f"{a.start_time.strftime('%d/%m')} - {a.end_time.strftime('%d/%m') if a.end_time else '?'}"
+            })
+
+        rows.append({
+            'id': w.id,
+            'name': w.name,
+            'sector_name': w.sector.name if w.sector else "Unassigned",
+            'geometry': w.geometry,
+            'map_color': map_color,       # <--- Harita rengi
+            'status_text': status_text,   # <--- Durum metni
+            'active_teams': active_teams_list,
+            'history_teams': history_teams
+        })
+    return rows
+
+
+def damage_worksite_rows(worksites):
+    """
+    Hasar haritası için worksite satırları.
+    Worksite renkleri ve 'Raporlayan Takım' bilgisi hasar durumuna göre belirlenir.
+    """
+    # En kötü hasar ve raporlayan takım tek sorguda hesaplanır (core/damage.py)
+    rows = []
+    for w in annotate_worst_damage(worksites.select_related('sector')):
+        damage_color, damage_status = damage_display(w.worst_damage)
+        rows.append({
+            'id': w.id,
+            'name': w.name,
+            'sector_name': w.sector.name if w.sector else "Unassigned",
+            'geometry': w.geometry,
+            'damage_color': damage_color,
+            'damage_status': damage_status,
+            'reporting_team': w.worst_damage_team or "-"
+        })
+    return rows
+
+
+def build_operational_map_data():
+    """Operations Haritası için tüm sektör ve worksite verisini hazırlar."""
+    return {
+        'sectors': sector_shapes(),
+        'worksites': operational_worksite_rows(Worksite.objects.filter(geometry__isnull=False)),
+    }
+
+
+# --- GÖRÜNÜM ALANI (VIEWPORT) SORGULARI ---
+
+# Worksite satır üreticileri (API'deki ?view= parametresi)
+WORKSITE_VIEWS = {
+    'damage': damage_worksite_rows,
+    'operations': operational_worksite_rows,
+}
+
+# Bu kadar pikselden küçük kalan poligonlar o zoom seviyesinde gönderilmez
+MIN_FEATURE_PIXELS = 2
+
+
+def viewport_queryset(model, bbox, zoom=None):
+    """
+    bbox = (west, south, east, north) ile kesişen kayıtlar.
+    zoom verilirse, ekranda MIN_FEATURE_PIXELS'ten küçük kalacak poligonlar elenir
+    (Noktalar her zaman gelir).
+    """
+    qs = model.in_bbox(*bbox)
+    if zoom is not None:
+        min_extent = MIN_FEATURE_PIXELS * degrees_per_pixel(zoom)
+        qs = qs.annotate(
+            extent=Greatest(F('max_lng') - F('min_lng'), F('max_lat') - F('min_lat'))
+        ).filter(Q(vertex_count=1) | Q(extent__gte=min_extent))
+    return qs.order_by('pk')
+
+
+def as_feature(layer, row, geometry_field='geometry'):
+    """Harita satırını GeoJSON Feature'a çevirir."""
+    properties = {k: v for k, v in row.items() if k != geometry_field}
+    properties['layer'] = layer
+    return {
+        'type': 'Feature',
+        'id': f"{layer}-{row['id']}",
+        'geometry': row[geometry_field],
+        'properties': properties,
+    }
+
+
+# --- VERSİYONLU ÖNBELLEK ---
+
+def get_data_version(key=DATA_VERSION_KEY):
+    """
+    Güncel veri versiyonu (DataVersion tablosu; tüm süreçler aynı değeri görür).
+    Kayıt yoksa (ilk açılış / veritabanı boşaltıldı) zaman tabanlı bir değerle
+    başlatılır; böylece önbellekteki eski kopyalara asla geri dönülmez.
+    """
+    version = DataVersion.objects.filter(key=key).values_list('version', flat=True).first()
+    if version is None:
+        version = DataVersion.objects.get_or_create(key=key, defaults={'version': int(time.time() * 1_000_000)})[0].version
+    return version
+
+
+def bump_data_version(key=DATA_VERSION_KEY):
+    """
+    Harita verisini etkileyen her yazma işleminden sonra çağrılır.
+    Artırma ve okuma aynı transaction'da: satır kilidi sayesinde dönen değer bu artırmanınkidir.
+    """
+    with transaction.atomic():
+        if not DataVersion.objects.filter(key=key).update(version=F('version') + 1):
+            return get_data_version(key)
+        return DataVersion.objects.filter(key=key).values_list('version', flat=True).get()
+
+
+def cached_payload(name, builder):
+    """
+    Önce süreç içi kopyaya, sonra paylaşılan önbelleğe bakar;
+    ikisinde de yoksa builder() ile üretip iki katmana da yazar.
+    """
+    version = get_data_version()
+    local = _payloads.get(name)
+    if local is not None and local[0] == version:
+        _stats[f'{name}.hits'] += 1
+        return local[1]
+
+    shared_key = f'core:map_data:{name}:{version}'
+    payload = cache.get(shared_key)
+    if payload is None:
+        _stats[f'{name}.misses'] += 1
+        payload = builder()
+        cache.set(shared_key, payload, timeout=PAYLOAD_TIMEOUT)
+    else:
+        _stats[f'{name}.shared_hits'] += 1
+
+    _payloads[name] = (version, payload)
+    return payload
+
+
+def get_operational_map_data():
+    """Operasyon haritası verisi (önbellekten)."""
+    return cached_payload('operational', build_operational_map_data)
+
+
+def cache_stats():
+    """
+    Hit/Miss sayaçları. Örn:
+    {'version': 1739..., 'operational.hits': 12, 'operational.misses': 1, ...}
+    """
+    stats = dict(_stats)
+    stats['version'] = get_data_version()
+    return stats
+
+
+def reset_cache_stats():
+    _stats.clear()
+    _payloads.clear()
@@ -0,0 +1,217 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:02
+
+import json
+
+from django.db import migrations, models
+
+# Donmuş kopya (core/geometry.py, bu migration yazıldığı haliyle): uygulama kodundaki
+# sonraki değişiklikler eski migration'ın sonucunu değiştirmesin diye import edilmez.
+#
+# Not: bu migration ilk yazıldığında core.geometry'yi import ediyordu. Donmuş kopya o zamanki kodla
+# aynı sonucu verir; eski halini uygulamış veritabanlarında ek işlem gerekmez.
+GEOMETRY_TYPES = ('Point', 'LineString', 'Polygon', 'MultiPolygon')
+
+
+def check_position(position):
+    if not isinstance(position, (list, tuple)) or len(position) < 2:
+        raise ValueError(position)
+    lng, lat = position[0], position[1]
+    if isinstance(lng, bool) or isinstance(lat, bool) or not isinstance(lng, (int, float)) or not isinstance(lat, (int, float)):
+        raise ValueError(position)
+    if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+        raise ValueError(position)
+    return [float(lng), float(lat)]
+
+
+def check_ring(ring):
+    if not isinstance(ring, list) or len(ring) < 4:
+        raise ValueError(ring)
+    return [check_position(p) for p in ring]
+
+
+def parse_geometry(raw):
+    geom = json.loads(raw)
+    if isinstance(geom, dict) and geom.get('type') == 'Feature':
+        geom = geom.get('geometry')
+    if not isinstance(geom, dict) or geom.get('type') not in GEOMETRY_TYPES:
+        raise ValueError(raw)
+    gtype, coords = geom['type'], geom.get('coordinates')
+    if gtype == 'Point':
+        coords = check_position(coords)
+    elif gtype == 'LineString':
+        if not isinstance(coords, list) or len(coords) < 2:
+            raise ValueError(raw)
+        coords = [check_position(p) for p in coords]
+    elif gtype == 'Polygon':
+        if not isinstance(coords, list) or not coords:
+            raise ValueError(raw)
+        coords = [check_ring(r) for r in coords]
+    else:
+        if not isinstance(coords, list) or not coords:
+            raise ValueError(raw)
+        coords = [[check_ring(r) for r in poly] for poly in coords]
+    return {'type': gtype, 'coordinates': coords}
+
+
+def positions(geom):
+    gtype, coords = geom['type'], geom['coordinates']
+    if gtype == 'Point':
+        return [coords]
+    if gtype == 'LineString':
+        return list(coords)
+    polygons = [coords] if gtype == 'Polygon' else coords
+    return [p for poly in polygons for ring in poly for p in ring]
+
+
+def outer_rings(geom):
+    if geom['type'] == 'Polygon':
+        return [geom['coordinates'][0]]
+    if geom['type'] == 'MultiPolygon':
+        return [poly[0] for poly in geom['coordinates']]
+    return []
+
+
+def ring_area_centroid(ring):
+    area = cx = cy = 0.0
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+        cross = x0 * y1 - x1 * y0
+        area += cross
+        cx += (x0 + x1) * cross
+        cy += (y0 + y1) * cross
+    area /= 2.0
+    if area == 0:
+        return 0.0, None, None
+    return area, cx / (6.0 * area), cy / (6.0 * area)
+
+
+def geometry_summary(geom):
+    points = positions(geom)
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    total_area = wx = wy = 0.0
+    for ring in outer_rings(geom):
+        area, cx, cy = ring_area_centroid(ring)
+        if cx is not None:
+            total_area += abs(area)
+            wx += cx * abs(area)
+            wy += cy * abs(area)
+    if total_area:
+        centroid = (wx / total_area, wy / total_area)
+    else:
+        centroid = (sum(xs) / len(xs), sum(ys) / len(ys))
+    return {
+        'min_lng': min(xs), 'min_lat': min(ys),
+        'max_lng': max(xs), 'max_lat': max(ys),
+        'centroid_lng': centroid[0], 'centroid_lat': centroid[1],
+        'vertex_count': len(points),
+    }
+
+
+def populate_geometry(apps, schema_editor):
+    # Mevcut kayıtların location_data metnini bir kez ayrıştır (Hatalı olanlar boş kalır)
+    for model_name in ('Sector', 'Worksite'):
+        model = apps.get_model('core', model_name)
+        to_update = []
+        for obj in model.objects.exclude(location_data__isnull=True).exclude(location_data=''):
+            try:
+                geom = parse_geometry(obj.location_data)
+            except ValueError:
+                continue
+            obj.geometry = geom
+            for field, value in geometry_summary(geom).items():
+                setattr(obj, field, value)
+            to_update.append(obj)
+        model.objects.bulk_update(to_update, [
+            'geometry', 'min_lng', 'min_lat', 'max_lng', 'max_lat', 'centroid_lng', 'centroid_lat', 'vertex_count'
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_worksite_completion_date_worksite_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sector',
+            name='centroid_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sector',
+            name='centroid_lng',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sector',
+            name='geometry',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Parsed Geometry'),
+        ),
+        migrations.AddField(
+            model_name='sector',
+            name='max_lat',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sector',
+            name='max_lng',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sector',
+            name='min_lat',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sector',
+            name='min_lng',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sector',
+            name='vertex_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='worksite',
+            name='centroid_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='worksite',
+            name='centroid_lng',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='worksite',
+            name='geometry',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Parsed Geometry'),
+        ),
+        migrations.AddField(
+            model_name='worksite',
+            name='max_lat',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='worksite',
+            name='max_lng',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='worksite',
+            name='min_lat',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='worksite',
+            name='min_lng',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='worksite',
+            name='vertex_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_geometry, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+# Donmuş kopya (core/geometry.py, bu migration yazıldığı haliyle): uygulama kodundaki
+# sonraki değişiklikler eski migration'ın sonucunu değiştirmesin diye import edilmez.
+#
+# Not: bu migration ilk yazıldığında core.geometry'yi import ediyordu. Donmuş kopya o zamanki kodla
+# aynı sonucu verir; eski halini uygulamış veritabanlarında ek işlem gerekmez.
+
+# zoom -> ondalık hassasiyet
+SIMPLIFY_LEVELS = {6: 3, 9: 4, 12: 5, 15: 6}
+
+
+def segment_distance(p, a, b):
+    (px, py), (ax, ay), (bx, by) = p, a, b
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return ((px - ax) ** 2 + (py - ay) ** 2) ** 0.5
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    cx, cy = ax + t * dx, ay + t * dy
+    return ((px - cx) ** 2 + (py - cy) ** 2) ** 0.5
+
+
+def douglas_peucker(points, tolerance):
+    if len(points) < 3:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        max_dist, index = 0.0, None
+        for i in range(start + 1, end):
+            dist = segment_distance(points[i], points[start], points[end])
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def quantize(points, precision):
+    result = []
+    for lng, lat in points:
+        q = [round(lng, precision), round(lat, precision)]
+        if not result or result[-1] != q:
+            result.append(q)
+    return result
+
+
+def simplify_ring(ring, tolerance, precision):
+    simplified = quantize(douglas_peucker(ring, tolerance), precision)
+    if len(simplified) < 4:
+        simplified = quantize(ring, precision)
+    return simplified if len(simplified) >= 4 else ring
+
+
+def simplify_geometry(geom, tolerance, precision):
+    gtype, coords = geom['type'], geom['coordinates']
+    if gtype == 'Polygon':
+        coords = [simplify_ring(r, tolerance, precision) for r in coords]
+    elif gtype == 'MultiPolygon':
+        coords = [[simplify_ring(r, tolerance, precision) for r in poly] for poly in coords]
+    elif gtype == 'LineString':
+        coords = quantize(douglas_peucker(coords, tolerance), precision)
+        if len(coords) < 2:
+            coords = geom['coordinates']
+    return {'type': gtype, 'coordinates': coords}
+
+
+def simplified_levels(geom):
+    # degrees_per_pixel(zoom) = 360 / (256 * 2 ** zoom)
+    return {
+        f"z{zoom}": simplify_geometry(geom, 360.0 / (256 * 2 ** zoom), precision)
+        for zoom, precision in SIMPLIFY_LEVELS.items()
+    }
+
+
+def populate_levels(apps, schema_editor):
+    Sector = apps.get_model('core', 'Sector')
+    sectors = list(Sector.objects.filter(geometry__isnull=False))
+    for sector in sectors:
+        sector.geometry_levels = simplified_levels(sector.geometry)
+    Sector.objects.bulk_update(sectors, ['geometry_levels'], batch_size=200)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_sector_worksite_geometry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sector',
+            name='geometry_levels',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Simplified Geometries'),
+        ),
+        migrations.RunPython(populate_levels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_sector_geometry_levels'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_hash', models.CharField(max_length=64, unique=True, verbose_name='File SHA-256')),
+                ('file_name', models.CharField(max_length=255, verbose_name='File Name')),
+                ('rows_done', models.PositiveIntegerField(default=0, verbose_name='Rows Committed')),
+                ('completed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperationStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_sites', models.PositiveIntegerField(default=0)),
+                ('total_buildings', models.PositiveIntegerField(default=0)),
+                ('total_assets', models.PositiveIntegerField(default=0)),
+                ('total_worksites', models.PositiveIntegerField(default=0)),
+                ('completed_worksites', models.PositiveIntegerField(default=0)),
+                ('total_sectors', models.PositiveIntegerField(default=0)),
+                ('total_teams', models.PositiveIntegerField(default=0)),
+                ('total_personnel', models.PositiveIntegerField(default=0)),
+                ('active_assignments', models.PositiveIntegerField(default=0)),
+                ('damage_grades', models.JSONField(default=dict, verbose_name='Damage Assessments by Overall Grade')),
+                ('sq_types', models.JSONField(default=dict, verbose_name='Personnel by SQ Type')),
+                ('expertise', models.JSONField(default=dict, verbose_name='Personnel by Main Expertise')),
+                ('countries', models.JSONField(default=dict, verbose_name='Personnel by Country')),
+                ('job_titles', models.JSONField(default=dict, verbose_name='Personnel by Job Title')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Operation Statistics',
+                'verbose_name_plural': 'Operation Statistics',
+            },
+        ),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:38
+
+import math
+
+from django.db import migrations, models
+
+# Donmuş kopya (core/priority.py ve core/analytics.cell_levels, bu migration yazıldığı haliyle):
+# uygulama kodundaki sonraki değişiklikler eski migration'ın sonucunu değiştirmesin diye import edilmez.
+#
+# Not: bu migration ilk yazıldığında core.priority'yi import ediyordu. Donmuş kopya iyi biçimli
+# matrislerde o zamanki kodla aynı skoru verir; eski hali bozuk hücrede hata verip durduğundan onu
+# uygulamış veritabanlarında ek işlem gerekmez (şüphede: manage.py recompute_priority).
+SEVERITY_RANK = {'NONE': 0, 'LIGHT': 1, 'MODERATE': 2, 'SEVERE': 3, 'COLLAPSED': 4}
+MAX_RANK = 4
+PRIORITY_WEIGHTS = {'overall': 50, 'structural': 25, 'interventions': 15, 'cultural': 10}
+INTERVENTION_SATURATION = 6
+CULTURAL_SATURATION = 5
+URGENT_VALUES = {'URGENT', 'IMMEDIATE', 'HIGH'}
+
+
+def is_number(value):
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and math.isfinite(value))
+
+
+def cell_levels(cell):
+    """Hücrede işaretli hasar seviyeleri (tanınmayan hücre: boş liste)."""
+    if isinstance(cell, str):
+        grade = cell.strip().upper()
+        return [SEVERITY_RANK[grade]] if grade in SEVERITY_RANK else []
+    if is_number(cell):
+        return [int(cell)] if 0 <= cell <= MAX_RANK and float(cell).is_integer() else []
+    if isinstance(cell, dict):
+        return [
+            SEVERITY_RANK[str(level).strip().upper()] for level, weight in cell.items()
+            if str(level).strip().upper() in SEVERITY_RANK and (weight is True or (is_number(weight) and weight > 0))
+        ]
+    return []
+
+
+def leaves(value):
+    """İç içe sözlüğün yaprak değerleri (boş sözlük / liste atlanır)."""
+    if isinstance(value, dict):
+        for sub in value.values():
+            yield from leaves(sub)
+    elif not isinstance(value, list) or value:
+        yield value
+
+
+def marked(value):
+    if isinstance(value, str):
+        return value.strip().upper() not in ('', 'NO', 'NONE', 'FALSE', '0')
+    return bool(value)
+
+
+def structural_score(matrix):
+    if not isinstance(matrix, dict):
+        return 0.0
+    worst = [max(levels) for levels in map(cell_levels, matrix.values()) if levels]
+    if not worst:
+        return 0.0
+    return 0.5 * max(worst) / MAX_RANK + 0.5 * sum(worst) / (len(worst) * MAX_RANK)
+
+
+def intervention_score(needs):
+    if not isinstance(needs, dict):
+        return 0.0
+    total = 0
+    for value in leaves(needs):
+        if marked(value):
+            total += 2 if isinstance(value, str) and value.strip().upper() in URGENT_VALUES else 1
+    return min(total / INTERVENTION_SATURATION, 1.0)
+
+
+def cultural_score(elements):
+    if not isinstance(elements, dict):
+        return 0.0
+    return min(sum(1 for value in leaves(elements) if marked(value)) / CULTURAL_SATURATION, 1.0)
+
+
+def priority_score(damages, cultural_elements):
+    overall = structural = interventions = 0.0
+    for grade, matrix, needs in damages:
+        overall = max(overall, SEVERITY_RANK.get(grade, 0) / MAX_RANK)
+        structural = max(structural, structural_score(matrix))
+        interventions = max(interventions, intervention_score(needs))
+    parts = {
+        'overall': overall,
+        'structural': structural,
+        'interventions': interventions,
+        'cultural': cultural_score(cultural_elements),
+    }
+    return round(sum(PRIORITY_WEIGHTS[name] * value for name, value in parts.items()), 2)
+
+
+def populate_priority(apps, schema_editor):
+    # Mevcut binaların indeksini bir kez hesapla (sonrası sinyallerle güncellenir)
+    BuildingInventory = apps.get_model('core', 'BuildingInventory')
+    DamageAssessment = apps.get_model('core', 'DamageAssessment')
+    damages = {}
+    rows = DamageAssessment.objects.order_by().values_list(
+        'building_id', 'overall_damage', 'structural_damage', 'intervention_needs'
+    )
+    for building_id, *values in rows.iterator():
+        damages.setdefault(building_id, []).append(tuple(values))
+    buildings = []
+    for building in BuildingInventory.objects.only('pk', 'cultural_elements').iterator():
+        building.priority_index = priority_score(damages.get(building.pk, []), building.cultural_elements)
+        buildings.append(building)
+    BuildingInventory.objects.bulk_update(buildings, ['priority_index'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_operationstatistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buildinginventory',
+            name='priority_index',
+            field=models.FloatField(db_index=True, default=0, editable=False, verbose_name='Priority Index'),
+        ),
+        migrations.RunPython(populate_priority, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,165 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:41
+
+import math
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Donmuş kopya (core/priority.py, core/analytics.cell_levels ve core/damage_state.state_values, bu migration
+# yazıldığı haliyle): uygulama kodundaki sonraki değişiklikler eski migration'ın sonucunu değiştirmesin diye import edilmez.
+#
+# Not: bu migration ilk yazıldığında worksite'ı DamageAssessment.worksite'tan alıyordu. Eski halini
+# uygulamış veritabanlarında satırları 0018 binanın site_assessment worksite'ına yeniden bağlar;
+# ek işlem gerekmez (şüphede: manage.py rebuild_damage_state, ardından rebuild_rollups).
+SEVERITY_RANK = {'NONE': 0, 'LIGHT': 1, 'MODERATE': 2, 'SEVERE': 3, 'COLLAPSED': 4}
+MAX_RANK = 4
+CRITICAL_GRADES = ('SEVERE', 'COLLAPSED')
+PRIORITY_WEIGHTS = {'overall': 50, 'structural': 25, 'interventions': 15, 'cultural': 10}
+INTERVENTION_SATURATION = 6
+CULTURAL_SATURATION = 5
+URGENT_VALUES = {'URGENT', 'IMMEDIATE', 'HIGH'}
+
+
+def is_number(value):
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and math.isfinite(value))
+
+
+def cell_levels(cell):
+    """Hücrede işaretli hasar seviyeleri (tanınmayan hücre: boş liste)."""
+    if isinstance(cell, str):
+        grade = cell.strip().upper()
+        return [SEVERITY_RANK[grade]] if grade in SEVERITY_RANK else []
+    if is_number(cell):
+        return [int(cell)] if 0 <= cell <= MAX_RANK and float(cell).is_integer() else []
+    if isinstance(cell, dict):
+        return [
+            SEVERITY_RANK[str(level).strip().upper()] for level, weight in cell.items()
+            if str(level).strip().upper() in SEVERITY_RANK and (weight is True or (is_number(weight) and weight > 0))
+        ]
+    return []
+
+
+def leaves(value):
+    """İç içe sözlüğün yaprak değerleri (boş sözlük / liste atlanır)."""
+    if isinstance(value, dict):
+        for sub in value.values():
+            yield from leaves(sub)
+    elif not isinstance(value, list) or value:
+        yield value
+
+
+def marked(value):
+    if isinstance(value, str):
+        return value.strip().upper() not in ('', 'NO', 'NONE', 'FALSE', '0')
+    return bool(value)
+
+
+def structural_score(matrix):
+    if not isinstance(matrix, dict):
+        return 0.0
+    worst = [max(levels) for levels in map(cell_levels, matrix.values()) if levels]
+    if not worst:
+        return 0.0
+    return 0.5 * max(worst) / MAX_RANK + 0.5 * sum(worst) / (len(worst) * MAX_RANK)
+
+
+def intervention_score(needs):
+    if not isinstance(needs, dict):
+        return 0.0
+    total = 0
+    for value in leaves(needs):
+        if marked(value):
+            total += 2 if isinstance(value, str) and value.strip().upper() in URGENT_VALUES else 1
+    return min(total / INTERVENTION_SATURATION, 1.0)
+
+
+def cultural_score(elements):
+    if not isinstance(elements, dict):
+        return 0.0
+    return min(sum(1 for value in leaves(elements) if marked(value)) / CULTURAL_SATURATION, 1.0)
+
+
+def priority_score(damages, cultural_elements):
+    overall = structural = interventions = 0.0
+    for grade, matrix, needs in damages:
+        overall = max(overall, SEVERITY_RANK.get(grade, 0) / MAX_RANK)
+        structural = max(structural, structural_score(matrix))
+        interventions = max(interventions, intervention_score(needs))
+    parts = {
+        'overall': overall,
+        'structural': structural,
+        'interventions': interventions,
+        'cultural': cultural_score(cultural_elements),
+    }
+    return round(sum(PRIORITY_WEIGHTS[name] * value for name, value in parts.items()), 2)
+
+
+def state_values(assessment_id, worksite_id, overall_damage, created_at):
+    return {
+        'assessment_id': assessment_id,
+        'worksite_id': worksite_id,
+        'overall_damage': overall_damage,
+        'severity': SEVERITY_RANK.get(overall_damage, 0),
+        'critical': overall_damage in CRITICAL_GRADES,
+        'assessed_at': created_at,
+    }
+
+
+def populate_current_state(apps, schema_editor):
+    # Her (bina, tehlike) için en son tespit; öncelik indeksi de sadece bunlardan yeniden hesaplanır.
+    # Worksite binanın site_assessment'ından (core/damage_state.STATE_FIELDS ile aynı kaynak)
+    DamageAssessment = apps.get_model('core', 'DamageAssessment')
+    CurrentDamageState = apps.get_model('core', 'CurrentDamageState')
+    BuildingInventory = apps.get_model('core', 'BuildingInventory')
+    latest = {}
+    rows = DamageAssessment.objects.order_by('created_at', 'pk').values_list(
+        'pk', 'building_id', 'hazard_type', 'building__site_assessment__worksite_id', 'overall_damage', 'created_at',
+        'structural_damage', 'intervention_needs',
+    )
+    for pk, building_id, hazard, worksite_id, grade, created_at, structural, needs in rows.iterator():
+        latest[building_id, hazard] = (pk, worksite_id, grade, created_at, structural, needs)
+    CurrentDamageState.objects.bulk_create([
+        CurrentDamageState(building_id=building_id, hazard_type=hazard, **state_values(*values[:4]))
+        for (building_id, hazard), values in latest.items()
+    ], batch_size=1000)
+
+    damages = {}
+    for (building_id, _), (_, _, grade, _, structural, needs) in latest.items():
+        damages.setdefault(building_id, []).append((grade, structural, needs))
+    buildings = []
+    for building in BuildingInventory.objects.only('pk', 'cultural_elements').iterator():
+        building.priority_index = priority_score(damages.get(building.pk, []), building.cultural_elements)
+        buildings.append(building)
+    BuildingInventory.objects.bulk_update(buildings, ['priority_index'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_buildinginventory_priority_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrentDamageState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hazard_type', models.CharField(choices=[('SEISMIC', 'Seismic'), ('FIRE', 'Fire'), ('HYDRO', 'Meteorological/Hydro')], max_length=20)),
+                ('overall_damage', models.CharField(choices=[('NONE', 'No Damage'), ('LIGHT', 'Light/Minor'), ('MODERATE', 'Moderate'), ('SEVERE', 'Severe'), ('COLLAPSED', 'Collapsed')], max_length=20)),
+                ('severity', models.PositiveSmallIntegerField(default=0)),
+                ('critical', models.BooleanField(default=False)),
+                ('assessed_at', models.DateTimeField()),
+                ('assessment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='current_state', to='core.damageassessment')),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='current_damage', to='core.buildinginventory')),
+                ('worksite', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='current_damage', to='core.worksite')),
+            ],
+            options={
+                'verbose_name': 'Current Damage State',
+                'indexes': [models.Index(condition=models.Q(('critical', True)), fields=['-assessed_at', '-id'], name='current_damage_critical_idx'), models.Index(fields=['worksite', '-severity', '-assessed_at', '-id'], name='current_damage_worst_idx')],
+                'constraints': [models.UniqueConstraint(fields=('building', 'hazard_type'), name='unique_current_damage_per_hazard')],
+            },
+        ),
+        migrations.RunPython(populate_current_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:46
+
+import django.db.models.deletion
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+GRADE_FIELDS = {
+    'NONE': 'grade_none', 'LIGHT': 'grade_light', 'MODERATE': 'grade_moderate',
+    'SEVERE': 'grade_severe', 'COLLAPSED': 'grade_collapsed',
+}
+
+
+def populate_rollups(apps, schema_editor):
+    # Güncel durumun worksite'ı artık binanın site_assessment'ından; ardından özetler sayılır
+    def get(name):
+        return apps.get_model('core', name)
+
+    CurrentDamageState = get('CurrentDamageState')
+    CurrentDamageState.objects.update(worksite_id=Subquery(
+        get('BuildingInventory').objects.filter(pk=OuterRef('building_id')).values('site_assessment__worksite_id')[:1]
+    ))
+
+    counts = defaultdict(Counter)
+    sources = (
+        ('BuildingInventory', 'site_assessment__worksite', 'buildings_assessed'),
+        ('MovableHeritage', 'worksite', 'assets_recorded'),
+        ('IntangibleHeritage', 'worksite', 'intangible_elements'),
+    )
+    for model, path, counter in sources:
+        for worksite_id, n in get(model).objects.order_by().values_list(path).annotate(n=Count('pk')):
+            counts[worksite_id][counter] += n
+    for worksite_id, grade, n in CurrentDamageState.objects.order_by().values_list(
+        'worksite', 'overall_damage'
+    ).annotate(n=Count('pk')):
+        counts[worksite_id][GRADE_FIELDS[grade]] += n
+
+    worksites = dict(get('Worksite').objects.values_list('pk', 'sector_id'))
+    sectors = {pk: Counter() for pk in get('Sector').objects.values_list('pk', flat=True)}
+    for worksite_id, sector_id in worksites.items():
+        if sector_id is not None:
+            sectors[sector_id].update(counts[worksite_id])
+    WorksiteDamageRollup, SectorDamageRollup = get('WorksiteDamageRollup'), get('SectorDamageRollup')
+    WorksiteDamageRollup.objects.bulk_create(
+        [WorksiteDamageRollup(worksite_id=pk, **counts[pk]) for pk in worksites], batch_size=1000
+    )
+    SectorDamageRollup.objects.bulk_create(
+        [SectorDamageRollup(sector_id=pk, **total) for pk, total in sectors.items()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_currentdamagestate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SectorDamageRollup',
+            fields=[
+                ('buildings_assessed', models.PositiveIntegerField(default=0)),
+                ('assets_recorded', models.PositiveIntegerField(default=0)),
+                ('intangible_elements', models.PositiveIntegerField(default=0)),
+                ('grade_none', models.PositiveIntegerField(default=0)),
+                ('grade_light', models.PositiveIntegerField(default=0)),
+                ('grade_moderate', models.PositiveIntegerField(default=0)),
+                ('grade_severe', models.PositiveIntegerField(default=0)),
+                ('grade_collapsed', models.PositiveIntegerField(default=0)),
+                ('sector', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='damage_rollup', serialize=False, to='core.sector')),
+            ],
+            options={
+                'verbose_name': 'Sector Damage Rollup',
+            },
+        ),
+        migrations.CreateModel(
+            name='WorksiteDamageRollup',
+            fields=[
+                ('buildings_assessed', models.PositiveIntegerField(default=0)),
+                ('assets_recorded', models.PositiveIntegerField(default=0)),
+                ('intangible_elements', models.PositiveIntegerField(default=0)),
+                ('grade_none', models.PositiveIntegerField(default=0)),
+                ('grade_light', models.PositiveIntegerField(default=0)),
+                ('grade_moderate', models.PositiveIntegerField(default=0)),
+                ('grade_severe', models.PositiveIntegerField(default=0)),
+                ('grade_collapsed', models.PositiveIntegerField(default=0)),
+                ('worksite', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='damage_rollup', serialize=False, to='core.worksite')),
+            ],
+            options={
+                'verbose_name': 'Worksite Damage Rollup',
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_damage_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['status', '-start_time'], name='assignment_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(condition=models.Q(('status', 'ACTIVE')), fields=['worksite', '-start_time'], name='assignment_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damageassessment',
+            index=models.Index(fields=['-created_at', '-id'], name='damage_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damageassessment',
+            index=models.Index(fields=['overall_damage', '-created_at'], name='damage_grade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damageassessment',
+            index=models.Index(fields=['building', 'hazard_type', '-created_at', '-id'], name='damage_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='worksite',
+            index=models.Index(fields=['status', 'name'], name='worksite_status_idx'),
+        ),
+    ]
@@ -4,7 +4,9 @@ from django.db import models
 from django.db.models import JSONField
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.core.exceptions import ValidationError
 import json
+from .geometry import parse_geometry, geometry_summary, simplified_levels
 # --- YENİ EKLENEN MODEL ---
 class Team(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name="Team Name")
@@ -125,8 +127,70 @@ class Personnel(models.Model):
     class Meta:
         verbose_name = "Personnel"
         verbose_name_plural = "Personnel List"
+# --- HARİTA GEOMETRİSİ (ORTAK) ---
+class MapGeometry(models.Model):
+    """
+    location_data (ham GeoJSON metni) kaydedilirken bir kez ayrıştırılır.
+    Ayrıştırılmış geometri, sınır kutusu (bbox), merkez ve nokta sayısı
+    ayrı kolonlarda tutulur; okuma tarafı json.loads yapmaz, bbox filtreleri
+    indeksli aralık sorgusu olur.
+    """
+    geometry = JSONField(null=True, blank=True, editable=False, verbose_name="Parsed Geometry")
+
+    min_lng = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    min_lat = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    max_lng = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    max_lat = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    centroid_lng = models.FloatField(null=True, blank=True, editable=False)
+    centroid_lat = models.FloatField(null=True, blank=True, editable=False)
+    vertex_count = models.PositiveIntegerField(default=0, editable=False)
+
+    SUMMARY_FIELDS = ['min_lng', 'min_lat', 'max_lng', 'max_lat', 'centroid_lng', 'centroid_lat', 'vertex_count']
+    GEOMETRY_FIELDS = ['geometry'] + SUMMARY_FIELDS
+
+    class Meta:
+        abstract = True
+
+    def clean(self):
+        super().clean()
+        if self.location_data:
+            try:
+                parse_geometry(self.location_data)
+            except ValidationError as e:
+                raise ValidationError({'location_data': e.messages})
+
+    def refresh_geometry(self):
+        """location_data'dan türetilmiş kolonları yeniden hesaplar (Hatalı veri = boş geometri)."""
+        geom = None
+        if self.location_data:
+            try:
+                geom = parse_geometry(self.location_data)
+            except ValidationError:
+                geom = None
+
+        self.geometry = geom
+        summary = geometry_summary(geom) if geom else {}
+        for field in self.SUMMARY_FIELDS:
+            setattr(self, field, summary.get(field, 0 if field == 'vertex_count' else None))
+
+    def save(self, *args, **kwargs):
+        self.refresh_geometry()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'location_data' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | set(self.GEOMETRY_FIELDS)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def in_bbox(cls, west, south, east, north):
+        """Verilen kutu ile kesişen kayıtlar (indeksli aralık sorgusu)."""
+        return cls.objects.filter(
+            geometry__isnull=False,
+            min_lng__lte=east, max_lng__gte=west,
+            min_lat__lte=north, max_lat__gte=south,
+        )
+
 # --- SECTOR MODELİ (BÖLGE) ---
-class Sector(models.Model):
+class Sector(MapGeometry):
     name = models.CharField(max_length=100, unique=True, verbose_name="Sector Name")
     description = models.TextField(blank=True, null=True)
     color = models.CharField(max_length=7, default="#3388ff", verbose_name="Map Color") # Örn: #FF0000
@@ -134,18 +198,27 @@ class Sector(models.Model):
     # Koordinat verisini JSON string olarak tutacağız (GeoDjango/GDAL zorunluluğunu aşmak için)
     # Format: {"type": "Polygon", "coordinates": [...]}
     location_data = models.TextField(blank=True, null=True, verbose_name="Map Coordinates")
+
+    # Zoom seviyelerine göre sadeleştirilmiş geometriler: {"z6": {...}, "z9": {...}, ...}
+    geometry_levels = JSONField(null=True, blank=True, editable=False, verbose_name="Simplified Geometries")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    GEOMETRY_FIELDS = MapGeometry.GEOMETRY_FIELDS + ['geometry_levels']
+
     def __str__(self):
         return self.name
 
+    def refresh_geometry(self):
+        super().refresh_geometry()
+        self.geometry_levels = simplified_levels(self.geometry) if self.geometry else None
+
     class Meta:
         ordering = ['name']
 
 # --- WORKSITE MODELİ (ÇALIŞMA ALANI) ---
-class Worksite(models.Model):   
+class Worksite(MapGeometry):
     STATUS_CHOICES = [
             ('OPEN', 'Open / Active'),
             ('COMPLETED', 'Completed / Closed'),
@@ -166,6 +239,10 @@ class Worksite(models.Model):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Duruma göre worksite listesi (varsayılan sıralama: ad)
+            models.Index(fields=['status', 'name'], name='worksite_status_idx'),
+        ]
 
 class Assignment(models.Model):
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='assignments', verbose_name="Assigned Team")
@@ -193,6 +270,13 @@ class Assignment(models.Model):
         ordering = ['-start_time']
         verbose_name = "Operation Assignment"
         verbose_name_plural = "Operation Assignments"
+        indexes = [
+            # Duruma göre görev listesi, en yeni önce (harita, istatistik)
+            models.Index(fields=['status', '-start_time'], name='assignment_status_idx'),
+            # Worksite'ın aktif görevleri (Exists / prefetch): sadece aktif satırları içeren kısmi indeks
+            models.Index(fields=['worksite', '-start_time'], condition=models.Q(status='ACTIVE'),
+                         name='assignment_active_idx'),
+        ]
 
 class BaseProcultherForm(models.Model):
     """
@@ -279,6 +363,9 @@ class BuildingInventory(BaseProcultherForm):
     non_structural_elements = JSONField(default=dict, verbose_name="Non-Structural Elements")
     cultural_elements = JSONField(default=dict, verbose_name="Cultural Elements")
 
+    # Müdahale önceliği (0-100). Hasar tespitlerinden hesaplanır, bkz. core/priority.py
+    priority_index = models.FloatField(default=0, db_index=True, editable=False, verbose_name="Priority Index")
+
     def __str__(self):
         return f"{self.building_name} ({self.building_code})"
 
@@ -323,6 +410,17 @@ class DamageAssessment(BaseProcultherForm):
     def __str__(self):
         return f"{self.get_hazard_type_display()} - {self.building.building_name}"
 
+    class Meta:
+        indexes = [
+            # Son tespitler (ana sayfa)
+            models.Index(fields=['-created_at', '-id'], name='damage_recent_idx'),
+            # Dereceye göre tespitler, en yeni önce (kritik liste: overall_damage IN (...) iki aramayla okunur).
+            # Güncel kritik durumların kısmi indeksi CurrentDamageState'te (current_damage_critical_idx)
+            models.Index(fields=['overall_damage', '-created_at'], name='damage_grade_idx'),
+            # (bina, tehlike) için en son tespit (core/damage_state.py)
+            models.Index(fields=['building', 'hazard_type', '-created_at', '-id'], name='damage_latest_idx'),
+        ]
+
 # ==========================================
 # 5. TAŞINIR KÜLTÜREL MİRAS (FORMS 6, 7, 8)
 # ==========================================
@@ -386,3 +484,239 @@ class IntangibleHeritage(BaseProcultherForm):
     def __str__(self):
         return self.element_name
     
+
+# ==========================================
+# 7. İÇE AKTARIM KONTROL NOKTASI
+# ==========================================
+class ImportCheckpoint(models.Model):
+    """
+    Büyük CSV içe aktarımlarında ilerleme kaydı (import_personnel --resume).
+    Dosya içeriğinin özeti anahtardır; dosya değişirse eski kayıt kullanılmaz.
+    rows_done, o parçayla aynı transaction'da artırılır.
+    """
+    file_hash = models.CharField(max_length=64, unique=True, verbose_name="File SHA-256")
+    file_name = models.CharField(max_length=255, verbose_name="File Name")
+    rows_done = models.PositiveIntegerField(default=0, verbose_name="Rows Committed")
+    completed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.rows_done} rows)"
+
+# ==========================================
+# 8. RAPOR İŞLERİ (ARKA PLAN PDF)
+# ==========================================
+class ReportJob(models.Model):
+    """
+    Görev raporu PDF'i için kuyruk kaydı. İstek sadece işi oluşturur;
+    PDF'i 'report_worker' komutu üretir (core/reports.py).
+    data_hash: raporu oluşturan verinin özeti; aynı özet için PDF diskten verilir.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Queued'),
+        ('RUNNING', 'Rendering'),
+        ('DONE', 'Ready'),
+        ('FAILED', 'Failed'),
+    ]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="Progress (%)")
+    message = models.CharField(max_length=255, blank=True)
+    data_hash = models.CharField(max_length=64, db_index=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_jobs')
+    generated_by = models.CharField(max_length=150, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Report #{self.pk} ({self.status})"
+
+# ==========================================
+# 9. OPERASYON İSTATİSTİKLERİ (KPI)
+# ==========================================
+class OperationStatistics(models.Model):
+    """
+    Ana sayfa, raporlama ekranı ve PDF kapağındaki KPI'lar (tek satır, pk=1).
+    Sinyallerle artımlı güncellenir (core/statistics.py); tablolar her istekte sayılmaz.
+    JSON alanları {anahtar: sayı} sayaçlarıdır, boş / tanımsız değerler '' anahtarında tutulur.
+    """
+    total_sites = models.PositiveIntegerField(default=0)
+    total_buildings = models.PositiveIntegerField(default=0)
+    total_assets = models.PositiveIntegerField(default=0)
+    total_worksites = models.PositiveIntegerField(default=0)
+    completed_worksites = models.PositiveIntegerField(default=0)
+    total_sectors = models.PositiveIntegerField(default=0)
+    total_teams = models.PositiveIntegerField(default=0)
+    total_personnel = models.PositiveIntegerField(default=0)
+    active_assignments = models.PositiveIntegerField(default=0)
+
+    damage_grades = JSONField(default=dict, verbose_name="Damage Assessments by Overall Grade")
+    sq_types = JSONField(default=dict, verbose_name="Personnel by SQ Type")
+    expertise = JSONField(default=dict, verbose_name="Personnel by Main Expertise")
+    countries = JSONField(default=dict, verbose_name="Personnel by Country")
+    job_titles = JSONField(default=dict, verbose_name="Personnel by Job Title")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Operation Statistics"
+        verbose_name_plural = "Operation Statistics"
+
+    def __str__(self):
+        return f"Operation Statistics ({self.updated_at:%Y-%m-%d %H:%M})"
+
+    @property
+    def critical_damages(self):
+        return self.damage_grades.get('SEVERE', 0) + self.damage_grades.get('COLLAPSED', 0)
+
+    @property
+    def ongoing_worksites(self):
+        return self.total_worksites - self.completed_worksites
+
+    @property
+    def completion_rate(self):
+        return int((self.completed_worksites / self.total_worksites) * 100) if self.total_worksites > 0 else 0
+
+    @property
+    def total_countries(self):
+        return sum(1 for name, total in self.countries.items() if name and total)
+
+    def ranked(self, field, limit=None):
+        """JSON sayacını [(anahtar, sayı), ...] olarak, çoktan aza sıralı döndürür."""
+        items = sorted(getattr(self, field).items(), key=lambda item: (-item[1], item[0]))
+        return items[:limit] if limit else items
+
+    def job_profile_text(self, limit):
+        return ", ".join(f"{title} ({total})" for title, total in self.ranked('job_titles', limit) if title)
+
+# ==========================================
+# 10. GÜNCEL HASAR DURUMU (BİNA x TEHLİKE)
+# ==========================================
+class CurrentDamageState(models.Model):
+    """
+    Her bina ve tehlike türü için en son hasar tespiti (geçmiş DamageAssessment'ta kalır).
+    Tespit eklenince / düzenlenince / silinince core/damage_state.py tarafından güncellenir.
+    Harita, kırmızı liste ve PDF eski tespitleri değil bu tabloyu okur.
+    """
+    building = models.ForeignKey(BuildingInventory, on_delete=models.CASCADE, related_name='current_damage')
+    hazard_type = models.CharField(max_length=20, choices=DamageAssessment.HAZARD_TYPES)
+    assessment = models.OneToOneField(DamageAssessment, on_delete=models.CASCADE, related_name='current_state')
+
+    # Kopyalanan alanlar (sorgular DamageAssessment'a join yapmadan süzülür / sıralanır).
+    # worksite: binanın site_assessment'ının worksite'ı
+    worksite = models.ForeignKey(Worksite, on_delete=models.CASCADE, related_name='current_damage')
+    overall_damage = models.CharField(max_length=20, choices=DamageAssessment.OVERALL_GRADES)
+    severity = models.PositiveSmallIntegerField(default=0)
+    critical = models.BooleanField(default=False)
+    assessed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Current Damage State"
+        constraints = [
+            models.UniqueConstraint(fields=['building', 'hazard_type'], name='unique_current_damage_per_hazard'),
+        ]
+        indexes = [
+            # Güncel kritik binalar (kırmızı liste), en yeni önce: sadece kritik satırları içeren kısmi indeks
+            models.Index(fields=['-assessed_at', '-id'], condition=models.Q(critical=True),
+                         name='current_damage_critical_idx'),
+            # Worksite'ın en kötü güncel durumu
+            models.Index(fields=['worksite', '-severity', '-assessed_at', '-id'], name='current_damage_worst_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.building_id} / {self.hazard_type}: {self.overall_damage}"
+
+# ==========================================
+# 11. HASAR ÖZETLERİ (WORKSITE / SEKTÖR)
+# ==========================================
+class DamageRollup(models.Model):
+    """
+    Worksite ve sektör düzeyindeki sayaçlar. Kayıtlar değiştikçe farklarla güncellenir
+    (core/rollups.py): bina -> site_assessment -> worksite -> sektör zinciri boyunca.
+    Hasar dereceleri güncel durumdan (CurrentDamageState, bina x tehlike) sayılır.
+    """
+    # Derece -> sayaç alanı (DamageAssessment.OVERALL_GRADES sırasıyla)
+    GRADE_FIELDS = {
+        'NONE': 'grade_none',
+        'LIGHT': 'grade_light',
+        'MODERATE': 'grade_moderate',
+        'SEVERE': 'grade_severe',
+        'COLLAPSED': 'grade_collapsed',
+    }
+
+    buildings_assessed = models.PositiveIntegerField(default=0)
+    assets_recorded = models.PositiveIntegerField(default=0)
+    intangible_elements = models.PositiveIntegerField(default=0)
+    grade_none = models.PositiveIntegerField(default=0)
+    grade_light = models.PositiveIntegerField(default=0)
+    grade_moderate = models.PositiveIntegerField(default=0)
+    grade_severe = models.PositiveIntegerField(default=0)
+    grade_collapsed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def damage_grades(self):
+        return {grade: getattr(self, field) for grade, field in self.GRADE_FIELDS.items()}
+
+    @property
+    def assessed_damages(self):
+        return sum(self.damage_grades.values())
+
+    @property
+    def critical_damages(self):
+        return self.grade_severe + self.grade_collapsed
+
+    @property
+    def critical_share(self):
+        """Güncel tespitlerde SEVERE / COLLAPSED oranı (%)."""
+        total = self.assessed_damages
+        return int(round(100 * self.critical_damages / total)) if total else 0
+
+
+class WorksiteDamageRollup(DamageRollup):
+    worksite = models.OneToOneField(Worksite, on_delete=models.CASCADE, primary_key=True, related_name='damage_rollup')
+
+    class Meta:
+        verbose_name = "Worksite Damage Rollup"
+
+    def __str__(self):
+        return f"Rollup: {self.worksite_id}"
+
+
+class SectorDamageRollup(DamageRollup):
+    sector = models.OneToOneField(Sector, on_delete=models.CASCADE, primary_key=True, related_name='damage_rollup')
+
+    class Meta:
+        verbose_name = "Sector Damage Rollup"
+
+    def __str__(self):
+        return f"Rollup: {self.sector_id}"
+
+# ==========================================
+# 12. VERİ VERSİYONLARI (ÖNBELLEK GEÇERSİZ KILMA)
+# ==========================================
+class DataVersion(models.Model):
+    """
+    Önbellek versiyon sayaçları (core/map_data.py: get_data_version / bump_data_version).
+    Veritabanında tutulur: yönetim komutları, report_worker ve diğer web süreçlerinin
+    artırdığı versiyonu tüm süreçler görür (süreç içi önbellek bunu sağlayamaz).
+    """
+    key = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = "Data Version"
+
+    def __str__(self):
+        return f"{self.key}: {self.version}"
@@ -0,0 +1,282 @@
+# core/personnel_import.py
+"""
+Personel CSV içe aktarımı (toplu / transaction'lı).
+
+Satır başına get_or_create / update_or_create yerine:
+- Ülke, kurum, uzmanlık, unvan ve mevcut e-postalar baştan hafızaya alınır.
+- Eksik sözlük kayıtları (kurum, unvan ...) tek bulk_create ile eklenir.
+- Yeni personel bulk_create (e-posta çakışmasında güncelleme), mevcutlar bulk_update.
+- Unvan (M2M) bağlantıları ara tabloya toplu eklenir.
+- Her parça (chunk) kendi transaction'ında yazılır; hata olursa parça geri alınır.
+
+Dosya parça parça okunur (iter_chunks); hafızada sadece güncel parça ve küçük
+sözlük tabloları tutulur, dosya boyu bellek kullanımını değiştirmez.
+"""
+import csv
+import hashlib
+from collections import Counter
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Personnel, Country, Institution, JobTitle, ExpertiseType
+
+CSV_DELIMITER = ';'
+CSV_ENCODING = 'utf-8-sig'
+DEFAULT_BATCH_SIZE = 500
+# Hafızada tutulacak en fazla hatalı satır mesajı (sayaç yine de hepsini sayar)
+MAX_KEPT_ERRORS = 50
+
+# CSV'deki farklı yazımlar -> veritabanındaki ülke adı
+COUNTRY_MAPPING = {
+    "TURCHIA": "Türkiye",
+    "TURKEY": "Türkiye",
+    "TR": "Türkiye",
+    "BELGIUM": "Belgium",
+    "BULGARIA": "Bulgaria",
+    "CROATIA": "Croatia",
+    "CYPRUS": "Cyprus",
+    "CZECH REPUBLIC": "Czech Republic",
+    "DENMARK": "Denmark",
+    "FRANCE": "France",
+    "GERMANY": "Germany",
+    "GREECE": "Greece",
+    "ICELAND": "Iceland",
+    "ITALY": "Italy",
+    "LATVIA": "Latvia",
+    "MOLDOVA": "Moldova",
+    "NETHERLANDS": "Netherlands",
+    "POLAND": "Poland",
+    "PORTUGAL": "Portugal",
+    "ROMANIA": "Romania",
+    "SERBIA": "Serbia",
+    "SPAIN": "Spain",
+    "SWEDEN": "Sweden",
+    "UNITED KINGDOM": "United Kingdom",
+    "UK": "United Kingdom",
+    "USA": "United States",
+    "BOSNIA AND HERZEGOVINA": "Bosnia and Herzegovina",
+    "NORTH MACEDONIA": "North Macedonia",
+}
+
+# Personel kaydında CSV'den doldurulan alanlar (bulk_update / çakışmada güncellenir)
+PERSONNEL_FIELDS = [
+    'first_name', 'last_name', 'gender', 'sq_number', 'country', 'institution', 'primary_expertise',
+    'professional_profile', 'specific_expertise_details', 'mobile', 'insurance_code', 'notes',
+    'private_notes', 'updated_at',
+]
+
+
+class RowError(ValueError):
+    """Satır atlanır ve rapora yazılır."""
+
+
+def split_name(full_name):
+    """'Ad Ikinci Soyad' -> ('Ad Ikinci', 'Soyad')"""
+    if ' ' in full_name:
+        first_name, last_name = full_name.rsplit(' ', 1)
+        return first_name, last_name
+    return full_name, ""
+
+
+def parse_row(row):
+    """
+    CSV satırını (DictReader) doğrular ve düz bir sözlüğe çevirir.
+    Sözlük kayıtları burada sadece isim olarak döner; nesneye çevirme toplu yapılır.
+    """
+    full_name = (row.get('NAME') or '').strip()
+    if not full_name:
+        raise RowError("İsim eksik")
+    email = (row.get('E-MAIL') or '').strip()
+    if not email:
+        raise RowError(f"E-mail eksik: {full_name}")
+    gender = (row.get('MALE/FEMALE') or 'M').strip()[:1].upper()
+    if gender not in ('M', 'F'):
+        raise RowError(f"Geçersiz cinsiyet ({row.get('MALE/FEMALE')!r}): {full_name}")
+
+    first_name, last_name = split_name(full_name)
+    return {
+        'email': email,
+        'first_name': first_name,
+        'last_name': last_name,
+        'gender': gender,
+        'sq_number': (row.get('SQ') or '').strip(),
+        'country': (row.get('COUNTRY') or '').strip().upper(),
+        'institution': (row.get('INSTITUTION') or '').strip(),
+        'primary_expertise': (row.get('EXPERTISE') or '').strip(),
+        'job_title': (row.get('JOB TITLE') or '').strip(),
+        'professional_profile': row.get('PROFESSIONAL PROFILE') or '',
+        # CSV'de iki tane SPECIFIC EXPERTISE sütunu var, DictReader sonuncusunu alır.
+        'specific_expertise_details': row.get('SPECIFIC EXPERTISE') or '',
+        'mobile': row.get('MOBILE') or '',
+        'insurance_code': row.get('CODE FOR INSURANCE') or '',
+        'notes': row.get('NOTES') or '',
+        'private_notes': row.get('private e-mail/other notes') or '',
+    }
+
+
+def file_hash(path, block_size=1 << 20):
+    """Dosyanın SHA-256 özeti (kontrol noktası anahtarı). Dosya bloklar halinde okunur."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_chunks(path, batch_size, skip=0):
+    """
+    CSV'yi parça parça okur: [(satır_no, csv_satırı), ...] listeleri verir.
+    skip: baştan atlanacak veri satırı sayısı (--resume). Satır numarası başlık dahildir.
+    """
+    with open(path, newline='', encoding=CSV_ENCODING) as csvfile:
+        rows = enumerate(csv.DictReader(csvfile, delimiter=CSV_DELIMITER), start=2)
+        if skip:
+            next(islice(rows, skip, skip), None)
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+class PersonnelImporter:
+    """
+    Kullanım:
+        importer = PersonnelImporter(dry_run=False)
+        for chunk in parçalar:
+            importer.import_rows(chunk)   # [(satır_no, csv_satırı), ...]
+        importer.report, importer.errors
+
+    Mevcut personel e-postaları her parçada sadece o parça için sorgulanır.
+    """
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.report = Counter()
+        self.errors = []   # [(satır_no, mesaj)]
+
+        # Sözlük tabloları küçük: tamamı hafızaya alınır (anahtar -> pk)
+        self.countries = {name.upper(): pk for pk, name in Country.objects.values_list('pk', 'name')}
+        self.institutions = dict(Institution.objects.values_list('name', 'pk'))
+        self.expertise = dict(ExpertiseType.objects.values_list('code', 'pk'))
+        self.job_titles = dict(JobTitle.objects.values_list('title', 'pk'))
+        # dry-run'da yazılmayan yeni e-postalar (sonraki parçalarda "güncelleme" sayılsın diye)
+        self.dry_run_emails = set()
+
+    # --- SÖZLÜK KAYITLARI ---
+
+    def country_name(self, raw):
+        """CSV'deki ülke yazımını veritabanı adına çevirir (yoksa oluşturulacak ad)."""
+        if not raw:
+            return None
+        if raw in COUNTRY_MAPPING:
+            return COUNTRY_MAPPING[raw]
+        return raw.title()
+
+    def _ensure(self, model, field, lookup, names, report_key, key=str):
+        """Eksik sözlük kayıtlarını toplu ekler, lookup haritasını (key(ad) -> pk) günceller."""
+        missing = sorted({n for n in names if n and key(n) not in lookup})
+        if not missing:
+            return
+        self.report[report_key] += len(missing)
+        if self.dry_run:
+            lookup.update((key(n), None) for n in missing)
+            return
+        model.objects.bulk_create([model(**{field: n}) for n in missing], ignore_conflicts=True)
+        for pk, name in model.objects.filter(**{f'{field}__in': missing}).values_list('pk', field):
+            lookup[key(name)] = pk
+
+    # --- PARÇA İŞLEME ---
+
+    def import_rows(self, rows, before_commit=None):
+        """
+        rows: [(satır_no, csv_satırı)]. Parça tek transaction'da yazılır.
+        before_commit: aynı transaction içinde en son çağrılır (ör. kontrol noktasını ilerletmek için).
+        """
+        parsed = {}
+        for line_no, row in rows:
+            self.report['rows'] += 1
+            try:
+                data = parse_row(row)
+            except RowError as e:
+                self.report['skipped'] += 1
+                if len(self.errors) < MAX_KEPT_ERRORS:
+                    self.errors.append((line_no, str(e)))
+                continue
+            data['country'] = self.country_name(data['country'])
+            # Aynı e-posta parçada birden fazla varsa son satır geçerli (eski update_or_create davranışı)
+            if data['email'] in parsed:
+                self.report['duplicates'] += 1
+            parsed[data['email']] = data
+        if self.dry_run:
+            if parsed:
+                self._write(parsed)
+            return
+        with transaction.atomic():
+            if parsed:
+                self._write(parsed)
+            if before_commit:
+                before_commit()
+
+    def _write(self, parsed):
+        rows = parsed.values()
+        self._ensure(Country, 'name', self.countries, [r['country'] for r in rows], 'new_countries', key=str.upper)
+        self._ensure(Institution, 'name', self.institutions, [r['institution'] for r in rows], 'new_institutions')
+        self._ensure(ExpertiseType, 'code', self.expertise, [r['primary_expertise'] for r in rows], 'new_expertise')
+        self._ensure(JobTitle, 'title', self.job_titles, [r['job_title'] for r in rows], 'new_job_titles')
+
+        existing = dict(Personnel.objects.filter(email__in=list(parsed)).values_list('email', 'pk'))
+        if self.dry_run:
+            existing.update((email, None) for email in self.dry_run_emails.intersection(parsed))
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for email, r in parsed.items():
+            person = Personnel(
+                pk=existing.get(email),
+                email=email,
+                first_name=r['first_name'],
+                last_name=r['last_name'],
+                gender=r['gender'],
+                sq_number=r['sq_number'],
+                country_id=self.countries.get(r['country'].upper()) if r['country'] else None,
+                institution_id=self.institutions.get(r['institution']),
+                primary_expertise_id=self.expertise.get(r['primary_expertise']),
+                professional_profile=r['professional_profile'],
+                specific_expertise_details=r['specific_expertise_details'],
+                mobile=r['mobile'],
+                insurance_code=r['insurance_code'],
+                notes=r['notes'],
+                private_notes=r['private_notes'],
+                updated_at=now,
+            )
+            (to_update if email in existing else to_create).append(person)
+
+        self.report['created'] += len(to_create)
+        self.report['updated'] += len(to_update)
+        if self.dry_run:
+            self.dry_run_emails.update(p.email for p in to_create)
+            return
+
+        if to_create:
+            # Başka bir süreç aynı e-postayı araya eklediyse satır güncellemeye döner
+            Personnel.objects.bulk_create(
+                to_create, batch_size=DEFAULT_BATCH_SIZE,
+                update_conflicts=True, unique_fields=['email'], update_fields=PERSONNEL_FIELDS,
+            )
+            existing.update(
+                Personnel.objects.filter(email__in=[p.email for p in to_create]).values_list('email', 'pk')
+            )
+        if to_update:
+            Personnel.objects.bulk_update(to_update, PERSONNEL_FIELDS, batch_size=DEFAULT_BATCH_SIZE)
+
+        # Unvanlar eklenir, mevcutlar silinmez (eski personnel.job_titles.add davranışı)
+        through = Personnel.job_titles.through
+        links = [
+            through(personnel_id=existing[email], jobtitle_id=self.job_titles[r['job_title']])
+            for email, r in parsed.items() if r['job_title']
+        ]
+        through.objects.bulk_create(links, batch_size=DEFAULT_BATCH_SIZE, ignore_conflicts=True)
+        self.report['job_title_links'] += len(links)
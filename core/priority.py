@@ -0,0 +1,168 @@
+# core/priority.py
+"""
+Bina öncelik indeksi (BuildingInventory.priority_index, 0-100).
+
+Dört bileşenin ağırlıklı toplamıdır (her bileşen 0-1 arasına normalize edilir).
+Tespitlerden sadece güncel olanlar (her tehlike için en son, bkz. core/damage_state.py) sayılır:
+- overall: binanın tespitlerindeki en kötü overall_damage (damage.SEVERITY_RANK / 4)
+- structural: structural_damage matrisi; en kötü elemanın şiddeti ile elemanların
+  ortalama şiddetinin yarı yarıya karışımı (tespitler arasında en yükseği)
+- interventions: intervention_needs'teki işaretli müdahale sayısı (acil olanlar iki kat)
+- cultural: binanın cultural_elements matrisindeki işaretli kültürel eleman sayısı
+
+İndeks hasar tespiti kaydedilince / silinince ve bina kaydedilince yeniden hesaplanır
+(core/signals.py). Ağırlıklar değişirse 'recompute_priority' komutu tüm binaları
+yeniden yazar. Sütun indeksli olduğu için "sektörde en acil N bina" tek sorgudur
+(top_priority_buildings).
+"""
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .analytics import cell_levels, LEVELS
+from .damage import SEVERITY_RANK
+from .exports import flatten
+from .models import BuildingInventory, DamageAssessment
+
+# Bileşen ağırlıkları (toplam 100)
+PRIORITY_WEIGHTS = {
+    'overall': 50,
+    'structural': 25,
+    'interventions': 15,
+    'cultural': 10,
+}
+# Bu sayıda (ağırlıklı) müdahale / kültürel eleman bileşeni doldurur
+INTERVENTION_SATURATION = 6
+CULTURAL_SATURATION = 5
+# Müdahale hücresinde bu değerler acil sayılır
+URGENT_VALUES = {'URGENT', 'IMMEDIATE', 'HIGH'}
+MAX_RANK = max(SEVERITY_RANK.values())
+RECOMPUTE_BATCH_SIZE = 1000
+
+# Binanın worksite'ı (core/rollups.py, core/damage_state.py ve harita ile aynı yol)
+SITE_WORKSITE = 'site_assessment__worksite'
+# Skor için okunan tespit alanları
+DAMAGE_FIELDS = ('building_id', 'overall_damage', 'structural_damage', 'intervention_needs')
+
+
+def _marked(value):
+    # Boş metin, 0, False, 'no' gibi değerler işaret sayılmaz
+    if isinstance(value, str):
+        return value.strip().upper() not in ('', 'NO', 'NONE', 'FALSE', '0')
+    return bool(value)
+
+
+def structural_score(matrix):
+    """Yapısal hasar matrisinin 0-1 skoru."""
+    if not isinstance(matrix, dict):
+        return 0.0
+    worst = [max(level for level, _ in levels) for levels in map(cell_levels, matrix.values()) if levels]
+    if not worst:
+        return 0.0
+    top = len(LEVELS) - 1
+    return 0.5 * max(worst) / top + 0.5 * sum(worst) / (len(worst) * top)
+
+
+def intervention_score(needs):
+    if not isinstance(needs, dict):
+        return 0.0
+    total = 0
+    for value in flatten(needs, 'needs').values():
+        if _marked(value):
+            total += 2 if isinstance(value, str) and value.strip().upper() in URGENT_VALUES else 1
+    return min(total / INTERVENTION_SATURATION, 1.0)
+
+
+def cultural_score(elements):
+    if not isinstance(elements, dict):
+        return 0.0
+    marked = sum(1 for value in flatten(elements, 'cultural').values() if _marked(value))
+    return min(marked / CULTURAL_SATURATION, 1.0)
+
+
+def priority_score(damages, cultural_elements, weights=None):
+    """
+    damages: binanın tespitleri [(overall_damage, structural_damage, intervention_needs), ...]
+    Döner: 0-100 arası öncelik indeksi (2 basamak).
+    """
+    weights = PRIORITY_WEIGHTS if weights is None else weights
+    overall = structural = interventions = 0.0
+    for grade, matrix, needs in damages:
+        overall = max(overall, SEVERITY_RANK.get(grade, 0) / MAX_RANK)
+        structural = max(structural, structural_score(matrix))
+        interventions = max(interventions, intervention_score(needs))
+    parts = {
+        'overall': overall,
+        'structural': structural,
+        'interventions': interventions,
+        'cultural': cultural_score(cultural_elements),
+    }
+    return round(sum(weights[name] * value for name, value in parts.items()), 2)
+
+
+def building_damages(building_ids):
+    """{bina id: [(overall_damage, structural_damage, intervention_needs), ...]}: güncel tespitler (tek sorgu)."""
+    damages = {}
+    rows = DamageAssessment.objects.filter(
+        building_id__in=building_ids, current_state__isnull=False
+    ).order_by().values_list(*DAMAGE_FIELDS)
+    for building_id, *values in rows:
+        damages.setdefault(building_id, []).append(tuple(values))
+    return damages
+
+
+def update_building_priority(building_id):
+    """Tek binanın indeksini yeniden hesaplar ve yazar (sinyal göndermeden)."""
+    cultural = BuildingInventory.objects.filter(pk=building_id).values_list('cultural_elements', flat=True).first()
+    if cultural is None:  # bina silinmiş (cascade)
+        return None
+    score = priority_score(building_damages([building_id]).get(building_id, []), cultural)
+    BuildingInventory.objects.filter(pk=building_id).update(priority_index=score)
+    return score
+
+
+def recompute_priorities(batch_size=RECOMPUTE_BATCH_SIZE, weights=None):
+    """
+    Tüm binaların indeksini parça parça yeniden hesaplar (bulk_update).
+    Döner: (bina sayısı, değişen bina sayısı)
+    """
+    total = changed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            BuildingInventory.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'cultural_elements', 'priority_index')[:batch_size]
+        )
+        if not batch:
+            return total, changed
+        last_pk = batch[-1].pk
+        damages = building_damages([building.pk for building in batch])
+        updated = []
+        for building in batch:
+            score = priority_score(damages.get(building.pk, []), building.cultural_elements, weights)
+            if score != building.priority_index:
+                building.priority_index = score
+                updated.append(building)
+        BuildingInventory.objects.bulk_update(updated, ['priority_index'])
+        total += len(batch)
+        changed += len(updated)
+
+
+def top_priority_buildings(limit=10, sector=None, per_sector=False):
+    """
+    En yüksek öncelikli binalar (priority_index indeksi sırasıyla okunur; eşitlikte yeni kayıt önce).
+    sector: sadece bu sektör (Sector nesnesi veya id)
+    per_sector: her sektörden ilk `limit` bina (ROW_NUMBER penceresi, yine tek sorgu)
+    Bina, özetler ve hasar durumundaki gibi site_assessment'ının worksite'ına / sektörüne sayılır
+    (formdaki worksite alanına değil).
+    """
+    buildings = BuildingInventory.objects.select_related(f'{SITE_WORKSITE}__sector').filter(priority_index__gt=0)
+    if sector is not None:
+        buildings = buildings.filter(**{f'{SITE_WORKSITE}__sector': sector})
+    if not per_sector:
+        return buildings.order_by('-priority_index', '-pk')[:limit]
+    return buildings.annotate(
+        sector_rank=Window(
+            RowNumber(), partition_by=[F(f'{SITE_WORKSITE}__sector_id')],
+            order_by=[F('priority_index').desc(), F('pk').desc()],
+        )
+    ).filter(sector_rank__lte=limit).order_by(f'{SITE_WORKSITE}__sector__name', 'sector_rank')
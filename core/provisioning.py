@@ -0,0 +1,102 @@
+# core/provisioning.py
+"""
+İçe aktarılan personel için toplu sistem kullanıcısı oluşturma.
+
+Şifre hash'i (PBKDF2) bilerek yavaştır ve işin neredeyse tamamıdır;
+bu yüzden hash'ler bir süreç havuzunda (ProcessPoolExecutor) paralel üretilir.
+Kullanıcılar bulk_create ile eklenir, Personnel.user toplu güncellenir ve
+tek seferlik şifreler sadece yerel bir dışa aktarım dosyasına yazılır.
+"""
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Personnel
+from .utils import generate_random_password
+
+DEFAULT_BATCH_SIZE = 500
+CREDENTIAL_COLUMNS = ['personnel_id', 'first_name', 'last_name', 'username', 'password']
+
+
+def _init_worker():
+    # spawn ile başlayan süreçlerde (macOS/Windows) ayarlar yüklü gelmez
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Şifreleri make_password ile hash'ler; sıra korunur.
+    workers=1 ise havuz kurulmadan bu süreçte çalışır.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < 2:
+        return [make_password(p) for p in passwords]
+    workers = min(workers, len(passwords))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def pending_personnel():
+    """Kullanıcısı olmayan ve e-postası dolu personel."""
+    return Personnel.objects.filter(user__isnull=True).exclude(email='').order_by('pk')
+
+
+def open_credentials_file(path):
+    """Dosya sadece sahibince okunabilir oluşturulur; var olan dosyanın üstüne yazılmaz."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    return open(fd, 'w', newline='', encoding='utf-8')
+
+
+def provision_users(credentials_file, personnel=None, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    personnel (varsayılan: pending_personnel()) için kullanıcı oluşturur.
+    credentials_file: açık bir metin dosyası; her parça commit edildikten sonra yazılır.
+
+    Döner: {'created', 'skipped_existing', 'seconds', 'hash_seconds'}
+    """
+    started = time.perf_counter()
+    if personnel is None:
+        personnel = pending_personnel()
+    rows = list(personnel.values_list('pk', 'email', 'first_name', 'last_name'))
+
+    # Aynı kullanıcı adı (e-posta) zaten varsa dokunulmaz (PersonnelCreateView ile aynı kural)
+    taken = set(User.objects.filter(username__in=[r[1] for r in rows]).values_list('username', flat=True))
+    skipped = sum(1 for r in rows if r[1] in taken)
+    rows = [r for r in rows if r[1] not in taken]
+
+    passwords = [generate_random_password() for _ in rows]
+    hash_started = time.perf_counter()
+    hashes = hash_passwords(passwords, workers=workers)
+    hash_seconds = time.perf_counter() - hash_started
+
+    writer = csv.writer(credentials_file)
+    writer.writerow(CREDENTIAL_COLUMNS)
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        with transaction.atomic():
+            User.objects.bulk_create([
+                User(username=email, email=email, first_name=first_name, last_name=last_name, password=hashed)
+                for (pk, email, first_name, last_name), hashed in zip(batch, hashes[start:start + batch_size])
+            ])
+            user_ids = dict(User.objects.filter(username__in=[r[1] for r in batch]).values_list('username', 'pk'))
+            Personnel.objects.bulk_update(
+                [Personnel(pk=pk, user_id=user_ids[email]) for pk, email, _, _ in batch], ['user']
+            )
+        for (pk, email, first_name, last_name), password in zip(batch, passwords[start:start + batch_size]):
+            writer.writerow([pk, first_name, last_name, email, password])
+        credentials_file.flush()
+
+    return {
+        'created': len(rows),
+        'skipped_existing': skipped,
+        'seconds': time.perf_counter() - started,
+        'hash_seconds': hash_seconds,
+    }
@@ -0,0 +1,80 @@
+# core/query_plans.py
+"""
+Sık çalışan (operasyonel) sorgular ve sorgu planı kontrolü.
+
+HOT_QUERIES'teki her sorgunun planı (SQLite'ta EXPLAIN QUERY PLAN, QuerySet.explain)
+okunur; tabloyu indeks kullanmadan baştan sona tarayan adım "tam tarama" sayılır.
+Sorguların dayandığı indeksler modellerin Meta.indexes listelerinde tanımlıdır
+(Assignment, Worksite, DamageAssessment, CurrentDamageState). Personnel.team__isnull ve
+MovableHeritage.building sorguları ForeignKey indeksini kullanır.
+
+Testler (core/tests.py) ve 'check_query_plans' komutu bu kontrolü çalıştırır;
+büyük veriyle denemek için önce veritabanı doldurulmalı.
+Sorgu parametreleri örnek değerlerdir; plan verinin kendisine değil şemaya bağlıdır.
+"""
+import re
+
+from .damage import CRITICAL_GRADES
+from .damage_state import LATEST_ORDER, current_critical_states
+from .models import Assignment, Worksite, Personnel, DamageAssessment, MovableHeritage
+
+# Örnek anahtar değerleri
+SAMPLE_PK = 1
+SAMPLE_IDS = [1, 2, 3]
+
+# (ad, sorgu üreten fonksiyon). Her sorgu uygulamadaki bir kullanım yerini temsil eder.
+HOT_QUERIES = (
+    # Harita: aktif görevler (map_data.operational_worksite_rows)
+    ('active_assignments', lambda: Assignment.objects.filter(status='ACTIVE')),
+    # Harita: worksite'ların aktif görevleri (prefetch / Exists)
+    ('worksite_active_assignments', lambda: Assignment.objects.filter(worksite_id__in=SAMPLE_IDS, status='ACTIVE')),
+    ('worksite_has_active_assignment', lambda: Assignment.objects.filter(worksite_id=SAMPLE_PK, status='ACTIVE')),
+    ('assignments_by_status', lambda: Assignment.objects.filter(status='COMPLETED')),
+    ('open_worksites', lambda: Worksite.objects.filter(status='OPEN')),
+    # Takım formu: takımı olmayan personel (forms.TeamForm)
+    ('unassigned_personnel', lambda: Personnel.objects.filter(team__isnull=True)),
+    # Ana sayfa: son hasar tespitleri
+    ('recent_damages', lambda: DamageAssessment.objects.order_by('-created_at')[:5]),
+    # Kritik tespitler, en yeni önce
+    ('critical_damages', lambda: DamageAssessment.objects.filter(
+        overall_damage__in=CRITICAL_GRADES).order_by('-created_at', '-pk')),
+    # Güncel hasar durumu: (bina, tehlike) için en son tespit (damage_state.refresh_damage_state)
+    ('latest_damage', lambda: DamageAssessment.objects.filter(
+        building_id=SAMPLE_PK, hazard_type='SEISMIC').order_by(*LATEST_ORDER)),
+    # Kırmızı liste
+    ('current_critical_states', lambda: current_critical_states()[:10]),
+    # Görev raporu: binanın eserleri
+    ('building_assets', lambda: MovableHeritage.objects.filter(building_id=SAMPLE_PK).order_by('pk')),
+)
+
+# SQLite: "SCAN core_assignment" (indeks yok) / "SCAN core_assignment USING INDEX ..." (indeks taraması)
+# PostgreSQL: "Seq Scan on core_assignment"
+FULL_SCAN_PATTERNS = (
+    re.compile(r'\bSCAN (?P<table>\w+)(?P<rest>.*)$'),
+    re.compile(r'\bSeq Scan on (?P<table>\w+)(?P<rest>)'),
+)
+
+
+def explain_plan(queryset):
+    """Sorgunun planı (satır listesi)."""
+    return queryset.explain().splitlines()
+
+
+def full_scans(plan):
+    """Planda indeks kullanmadan taranan tablolar."""
+    tables = []
+    for line in plan:
+        for pattern in FULL_SCAN_PATTERNS:
+            match = pattern.search(line)
+            if match and 'USING' not in match.group('rest'):
+                tables.append(match.group('table'))
+    return tables
+
+
+def check_query_plans(queries=HOT_QUERIES):
+    """Her sorgunun planını okur. Döner: [(ad, plan satırları, tam taranan tablolar), ...]"""
+    results = []
+    for name, build in queries:
+        plan = explain_plan(build())
+        results.append((name, plan, full_scans(plan)))
+    return results
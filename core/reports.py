@@ -0,0 +1,475 @@
+# core/reports.py
+"""
+Görev raporu (Mission Report) PDF'i: veri toplama, çizim ve arka plan işleri.
+
+- report_data_hash(): raporda yer alan tabloların özeti (sayı + en büyük id + son
+  güncelleme + updated_at'i olmayan tablolar için REPORT_VERSION_KEY). Veri değişmediyse
+  özet aynı kalır ve PDF diskteki önbellekten verilir.
+- enqueue_report(): istek sırasında sadece ReportJob kaydı açar.
+- process_next_job(): 'report_worker' komutu tarafından çağrılır; PDF'i üretir,
+  REPORT_CACHE_DIR altına <özet>.pdf olarak yazar.
+- stamp_cover(): önbellekteki PDF kişiye / tarihe bağlı değildir; indiren kişi ve tarih
+  dosya verilirken kapağa basılır.
+
+Rapor bağımsız bölümlerden oluşur (kapak, kırmızı liste, saha grupları, eserler).
+Her bölüm ayrı PDF olarak bir süreç havuzunda çizilir, sonra pypdf ile birleştirilir.
+Verisi değişmeyen bölümlerin PDF'i REPORT_CACHE_DIR/sections altından tekrar kullanılır.
+"""
+import hashlib
+import json
+import os
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.db.models import CharField, Count, DateTimeField, IntegerField, Max, Value
+from django.template.loader import get_template, render_to_string
+from django.utils import dateformat, timezone
+from pypdf import PdfReader, PdfWriter
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+from xhtml2pdf import pisa
+
+from .damage_state import critical_building_count
+from .statistics import get_statistics
+from .models import (
+    Personnel, Team, Sector, Worksite, Assignment, SiteAssessment, BuildingInventory, DamageAssessment,
+    MovableHeritage, Country, ExpertiseType, JobTitle, ReportJob, CurrentDamageState, DataVersion,
+)
+
+# Bu süreden uzun süredir RUNNING kalan iş (çöken worker) FAILED sayılır; yeni istek yeni iş açar
+STALE_JOB_AFTER = timedelta(minutes=30)
+STALE_JOB_MESSAGE = "The report worker stopped before finishing"
+
+# Detaylı saha kayıtları bu kadar sahalık bölümler halinde çizilir ve önbelleğe alınır
+SITES_PER_SECTION = 20
+SECTION_BASE_TEMPLATE = 'core/report/_pdf_base.html'
+# Bu süredir hiçbir raporda kullanılmayan bölüm PDF'leri silinir
+SECTION_CACHE_MAX_AGE = timedelta(days=7)
+
+# Rapor içeriğini etkileyen modeller
+REPORT_MODELS = (
+    SiteAssessment, BuildingInventory, DamageAssessment, CurrentDamageState, MovableHeritage, Personnel,
+    Sector, Worksite, Team, Assignment, Country, ExpertiseType, JobTitle, Personnel.job_titles.through,
+)
+# updated_at'i olmayan tablolardaki düzenlemeler (ülke / uzmanlık / unvan adı, personelin unvanları)
+# sayıyı ve en büyük id'yi değiştirmeyebilir: core/signals.py bu versiyonu artırır
+REPORT_VERSION_KEY = 'core:reports:version'
+REPORT_FOOTER = "Mission Report"
+
+
+def report_cache_dir():
+    path = getattr(settings, 'REPORT_CACHE_DIR', os.path.join(settings.BASE_DIR, 'report_cache'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cached_report_path(data_hash):
+    return os.path.join(report_cache_dir(), f"mission_report_{data_hash}.pdf")
+
+
+def report_data_hash():
+    """
+    Rapor verisinin özeti. Her model için (sayı, en büyük id, son updated_at):
+    ekleme ve silme sayıyı / id'yi, düzenleme updated_at'i (yoksa REPORT_VERSION_KEY'i) değiştirir.
+    Tüm modeller tek UNION ALL sorgusunda özetlenir.
+    """
+    parts = []
+    for model in REPORT_MODELS:
+        has_updated_at = any(f.name == 'updated_at' for f in model._meta.fields)
+        parts.append(model.objects.order_by().annotate(
+            label=Value(model._meta.label, output_field=CharField()),
+        ).values('label').annotate(
+            n=Count('pk'), last_id=Max('pk'),
+            last_update=Max('updated_at') if has_updated_at else Value(None, output_field=DateTimeField()),
+        ).values_list('label', 'n', 'last_id', 'last_update'))
+    # Versiyon satırı da aynı sorguda (yoksa henüz hiç artırılmamış: 0)
+    parts.append(DataVersion.objects.filter(key=REPORT_VERSION_KEY).annotate(
+        label=Value(REPORT_VERSION_KEY, output_field=CharField()),
+        last_id=Value(None, output_field=IntegerField()), last_update=Value(None, output_field=DateTimeField()),
+    ).values_list('label', 'version', 'last_id', 'last_update'))
+    rows = {row[0]: row for row in parts[0].union(*parts[1:], all=True)}
+    summary = "|".join(
+        "{}:{}:{}:{}".format(*rows.get(label, (label, 0, None, None)))
+        for label in [model._meta.label for model in REPORT_MODELS] + [REPORT_VERSION_KEY]
+    )
+    return hashlib.sha256(summary.encode()).hexdigest()
+
+
+# --- RAPOR VERİSİ ---
+
+def build_report_context():
+    """
+    Kapak, genel bakış ve İK bölümünün verisi (önceden download_mission_report içindeydi).
+    Oluşturan kişi ve tarih burada yok: indirme anında kapağa basılır (stamp_cover).
+    """
+    # KPI'lar tek satırdan okunur (sinyallerle güncellenir, core/statistics.py)
+    stats = get_statistics()
+
+    # SQ Type Listesi (Building, Movable, Observer)
+    sq_stats = [{'sq_number': sq, 'total': total} for sq, total in stats.ranked('sq_types')]
+
+    # Main Expertise (DRM, CH, BOTH)
+    expertise_stats = [{'primary_expertise__code': code, 'total': total} for code, total in stats.ranked('expertise')]
+
+    # Ülkelere Göre Dağılım
+    country_stats = [{'country__name': name, 'total': total} for name, total in stats.ranked('countries')]
+
+    # --- OTOMATİK RAPOR METNİ (NARRATIVE) ---
+    narrative_text = (
+        f"The Cultural Heritage Response Operation is currently active across {stats.total_sectors} designated sectors, "
+        f"covering a total of {stats.total_worksites} worksites. To date, {stats.completed_worksites} worksites have been successfully closed/completed. "
+        f"The operation is supported by a multinational force of {stats.total_personnel} experts from {stats.total_countries} different countries. "
+        f"The field teams are structured into {stats.total_teams} operational units, currently managing {stats.active_assignments} active assignments. "
+        f"The primary focus remains on damage assessment and emergency salvage of movable heritage."
+    )
+
+    return {
+        # Mevcut Veriler
+        'total_sites': stats.total_sites,
+        'total_buildings': stats.total_buildings,
+        'critical_total': critical_building_count(),
+        'total_assets': stats.total_assets,
+
+        # Yeni Veriler
+        'total_personnel': stats.total_personnel,
+        'sq_stats': sq_stats,
+        'expertise_stats': expertise_stats,
+        'country_stats': country_stats,
+        # Professional Profile: en çok tekrar eden 8 unvan
+        'job_profile_text': stats.job_profile_text(8),
+        'total_sectors': stats.total_sectors,
+        'total_worksites': stats.total_worksites,
+        'completed_worksites': stats.completed_worksites,
+        'ongoing_worksites': stats.ongoing_worksites,
+        'total_teams': stats.total_teams,
+        'narrative_text': narrative_text,
+    }
+
+
+class ReportSection:
+    """Bağımsız çizilen rapor bölümü. Önbellek anahtarı şablon + verinin özetidir."""
+
+    def __init__(self, name, template, context, cacheable=True):
+        self.name = name
+        self.template = template
+        self.context = context
+        self.cacheable = cacheable
+
+    def cache_key(self):
+        # Şablon metni de anahtara dahil: şablon değişince eski PDF'ler kullanılmaz
+        sources = [get_template(t).template.source for t in (self.template, SECTION_BASE_TEMPLATE)]
+        payload = json.dumps([sources, self.context], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def site_sections():
+    """
+    Saha kayıtları SITES_PER_SECTION'lık gruplara bölünür (grup = pk // SITES_PER_SECTION).
+    Gruplama id'ye göre olduğu için yeni saha sadece son grubu, bir düzenleme sadece
+    kendi grubunu değiştirir; diğer grupların PDF'i önbellekten gelir.
+    Tüm veri üç sorguyla okunur. Binalarda her tehlike için sadece güncel (en son) tespit yer alır.
+    """
+    hazards = dict(DamageAssessment.HAZARD_TYPES)
+    damages = defaultdict(list)
+    for building_id, grade, hazard in CurrentDamageState.objects.order_by('assessment_id').values_list(
+        'building_id', 'overall_damage', 'hazard_type'
+    ):
+        damages[building_id].append({'grade': grade, 'hazard': hazards.get(hazard, hazard)})
+
+    buildings = defaultdict(list)
+    for pk, site_id, code, name, asset_count in BuildingInventory.objects.annotate(
+        asset_count=Count('assets')
+    ).order_by('pk').values_list('pk', 'site_assessment_id', 'building_code', 'building_name', 'asset_count'):
+        buildings[site_id].append({'code': code, 'name': name, 'asset_count': asset_count, 'damages': damages[pk]})
+
+    groups = defaultdict(list)
+    for pk, worksite_name, reference, team_name, created_at in SiteAssessment.objects.order_by('pk').values_list(
+        'pk', 'worksite__name', 'site_reference_code', 'assignment__team__name', 'created_at'
+    ):
+        groups[pk // SITES_PER_SECTION].append({
+            'worksite_name': worksite_name,
+            'reference': reference,
+            'team_name': team_name,
+            'created_at': timezone.localtime(created_at),
+            'buildings': buildings[pk],
+        })
+
+    return [
+        ReportSection(f'sites-{group}', 'core/report/sites.html', {'sites': sites, 'show_heading': i == 0})
+        for i, (group, sites) in enumerate(sorted(groups.items()))
+    ] or [ReportSection('sites-empty', 'core/report/sites.html', {'sites': [], 'show_heading': True})]
+
+
+def build_sections():
+    """Raporun bölümleri, sırasıyla."""
+    hazards = dict(DamageAssessment.HAZARD_TYPES)
+    # Kırmızı liste güncel durumdan: sonradan hafif olarak yeniden değerlendirilen bina listede kalmaz
+    red_list = [
+        {'site_name': site_name, 'building_name': building_name, 'overall_damage': grade, 'hazard': hazards.get(hazard, hazard)}
+        for site_name, building_name, grade, hazard in CurrentDamageState.objects.filter(
+            critical=True
+        ).order_by('overall_damage', 'assessment_id').values_list(
+            'building__site_assessment__worksite__name', 'building__building_name', 'overall_damage', 'hazard_type'
+        )
+    ]
+    assets_list = [
+        {'object_name': name, 'category': category, 'building_name': building_name}
+        for name, category, building_name in MovableHeritage.objects.order_by('pk').values_list(
+            'object_name', 'category', 'building__building_name'
+        )
+    ]
+    return [
+        ReportSection('cover', 'core/report/cover.html', build_report_context()),
+        ReportSection('red-list', 'core/report/red_list.html', {'red_list': red_list}),
+        *site_sections(),
+        ReportSection('assets', 'core/report/assets.html', {'assets_list': assets_list}),
+    ]
+
+
+# --- PDF ÇİZİMİ ---
+
+def html_to_pdf(html_string):
+    """HTML -> PDF baytları. Süreç havuzunda çalışır; Django'ya ihtiyaç duymaz."""
+    result = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(html_string.encode("UTF-8")), result)
+    if pdf.err:
+        raise RuntimeError("Error Rendering PDF")
+    return result.getvalue()
+
+
+def section_cache_path(key):
+    path = os.path.join(report_cache_dir(), 'sections')
+    os.makedirs(path, exist_ok=True)
+    return os.path.join(path, f"{key}.pdf")
+
+
+def render_sections(sections, workers=None, progress=None):
+    """
+    Bölümleri PDF'e çevirir; önbellekte olanlar diskten okunur, kalanlar süreç
+    havuzunda paralel çizilir. progress(bitmiş, toplam) her bölümden sonra çağrılır.
+    Döner: (bölüm PDF baytları listesi, önbellekten gelen bölüm sayısı)
+    """
+    pdfs = [None] * len(sections)
+    pending = {}   # index -> (html, önbellek yolu)
+    for i, section in enumerate(sections):
+        path = section_cache_path(section.cache_key()) if section.cacheable else None
+        if path and os.path.exists(path):
+            with open(path, 'rb') as handle:
+                pdfs[i] = handle.read()
+            os.utime(path)  # Kullanılıyor: temizlikte silinmesin
+        else:
+            pending[i] = (render_to_string(section.template, section.context), path)
+
+    reused = len(sections) - len(pending)
+    done = reused
+    if progress:
+        progress(done, len(sections))
+
+    def store(i, content):
+        nonlocal done
+        pdfs[i] = content
+        path = pending[i][1]
+        if path:
+            write_atomic(path, content)
+        done += 1
+        if progress:
+            progress(done, len(sections))
+
+    workers = min(workers or getattr(settings, 'REPORT_RENDER_WORKERS', None) or os.cpu_count() or 1, len(pending))
+    if workers <= 1:
+        for i, (html, _) in pending.items():
+            store(i, html_to_pdf(html))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(html_to_pdf, html): i for i, (html, _) in pending.items()}
+            for future in as_completed(futures):
+                store(futures[future], future.result())
+    return pdfs, reused
+
+
+def merge_pdfs(pdfs, footer_text):
+    """
+    Bölümleri birleştirir ve sayfa altbilgisini ("Page X of Y | ...") basar.
+    Numaralar bölümler birleştikten sonra bilinir; bu yüzden bölüm PDF'lerinde altbilgi yok.
+    Kapak sayfasına (ilk sayfa) altbilgi basılmaz.
+    """
+    writer = PdfWriter()
+    for content in pdfs:
+        writer.append(PdfReader(BytesIO(content)))
+
+    total = len(writer.pages)
+    overlay_buffer = BytesIO()
+    overlay = canvas.Canvas(overlay_buffer)
+    for number, page in enumerate(writer.pages, start=1):
+        width, height = float(page.mediabox.width), float(page.mediabox.height)
+        overlay.setPageSize((width, height))
+        if number > 1:
+            overlay.setFont('Helvetica', 9)
+            overlay.setFillColorRGB(0.4, 0.4, 0.4)
+            overlay.drawCentredString(width / 2, 1 * cm, f"Page {number} of {total} | {footer_text}")
+        overlay.showPage()
+    overlay.save()
+
+    for page, stamp in zip(writer.pages, PdfReader(BytesIO(overlay_buffer.getvalue())).pages):
+        page.merge_page(stamp)
+
+    result = BytesIO()
+    writer.write(result)
+    return result.getvalue()
+
+
+def render_report(workers=None, progress=None):
+    """Tüm raporu üretir; PDF baytlarını döndürür (kişiye / tarihe bağlı değil, önbelleğe yazılır)."""
+    sections = build_sections()
+    pdfs, _ = render_sections(sections, workers=workers, progress=progress)
+    return merge_pdfs(pdfs, REPORT_FOOTER)
+
+
+def stamp_cover(path, generated_by, when=None):
+    """
+    Önbellekteki rapor PDF'inin kapağına indiren kişiyi ve tarihi basar; PDF baytlarını döndürür.
+    Dosya artımlı güncellenir: sadece kapak sayfası eklenir, diğer sayfalar kopyalanmaz.
+    """
+    when = timezone.localtime(when or timezone.now())
+    writer = PdfWriter(path, incremental=True)
+    cover = writer.pages[0]
+    width, height = float(cover.mediabox.width), float(cover.mediabox.height)
+
+    overlay_buffer = BytesIO()
+    overlay = canvas.Canvas(overlay_buffer, pagesize=(width, height))
+    overlay.setFont('Helvetica', 12)
+    overlay.drawCentredString(width / 2, 3 * cm, f"Date: {dateformat.format(when, 'd F Y, H:i')}")
+    if generated_by:
+        overlay.drawCentredString(width / 2, 2.3 * cm, f"Generated by {generated_by}")
+    overlay.save()
+    cover.merge_page(PdfReader(BytesIO(overlay_buffer.getvalue())).pages[0])
+
+    result = BytesIO()
+    writer.write(result)
+    return result.getvalue()
+
+
+def prune_section_cache(max_age=SECTION_CACHE_MAX_AGE):
+    """Uzun süredir kullanılmayan bölüm PDF'lerini siler."""
+    path = os.path.join(report_cache_dir(), 'sections')
+    if not os.path.isdir(path):
+        return 0
+    cutoff = time.time() - max_age.total_seconds()
+    removed = 0
+    for entry in os.scandir(path):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+def write_atomic(path, content):
+    """Yarım dosya görünmesin diye önce geçici dosyaya yazılır, sonra yerine taşınır."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as handle:
+        handle.write(content)
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_cached_report(data_hash, content):
+    return write_atomic(cached_report_path(data_hash), content)
+
+
+# --- İŞ KUYRUĞU ---
+
+def display_name(user):
+    """Raporda görünen ad; anonim kullanıcı için boş."""
+    if user is None or not user.is_authenticated:
+        return ''
+    return user.get_full_name() or user.username
+
+
+def fail_stale_jobs():
+    """STALE_JOB_AFTER'dan uzun süredir RUNNING kalan işleri FAILED yapar (durum sayfası biter). Döner: iş sayısı."""
+    now = timezone.now()
+    return ReportJob.objects.filter(status='RUNNING', started_at__lt=now - STALE_JOB_AFTER).update(
+        status='FAILED', message=STALE_JOB_MESSAGE, finished_at=now,
+    )
+
+
+def enqueue_report(data_hash, user=None):
+    """Aynı veri için bekleyen / çalışan iş varsa onu döndürür, yoksa yeni iş açar."""
+    fail_stale_jobs()
+    active = ReportJob.objects.filter(data_hash=data_hash, status='PENDING').first() or ReportJob.objects.filter(
+        data_hash=data_hash, status='RUNNING'
+    ).first()
+    if active:
+        return active
+    generated_by = display_name(user)
+    return ReportJob.objects.create(
+        data_hash=data_hash,
+        requested_by=user if generated_by else None,
+        generated_by=generated_by,
+        message="Waiting for the report worker",
+    )
+
+
+def set_progress(job, progress, message):
+    job.progress, job.message = progress, message
+    ReportJob.objects.filter(pk=job.pk).update(progress=progress, message=message)
+
+
+def claim_next_job():
+    """En eski bekleyen işi alır. Koşullu UPDATE: iki worker aynı işi alamaz."""
+    fail_stale_jobs()
+    while True:
+        job = ReportJob.objects.filter(status='PENDING').order_by('created_at', 'pk').first()
+        if job is None:
+            return None
+        claimed = ReportJob.objects.filter(pk=job.pk, status='PENDING').update(
+            status='RUNNING', started_at=timezone.now(), progress=1, message="Started"
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_job(job):
+    try:
+        # Özet veriyi okumadan önce alınır: arada değişen veri yeni bir özet üretir
+        data_hash = report_data_hash()
+        path = cached_report_path(data_hash)
+        if not os.path.exists(path):
+            set_progress(job, 5, "Collecting operation data")
+
+            def section_done(done, total):
+                set_progress(job, 10 + 85 * done // total, f"Rendering sections ({done}/{total})")
+
+            content = render_report(progress=section_done)
+            path = write_cached_report(data_hash, content)
+            prune_section_cache()
+        ReportJob.objects.filter(pk=job.pk).update(
+            status='DONE', progress=100, message="Ready", data_hash=data_hash,
+            file_name=os.path.basename(path), finished_at=timezone.now(),
+        )
+    except Exception as e:
+        ReportJob.objects.filter(pk=job.pk).update(
+            status='FAILED', message=str(e)[:255], error=traceback.format_exc(), finished_at=timezone.now(),
+        )
+    job.refresh_from_db()
+    return job
+
+
+def process_next_job():
+    """Bir iş işler; kuyruk boşsa None döner."""
+    job = claim_next_job()
+    return run_job(job) if job else None
+
+
+def job_file_path(job):
+    """Hazır işin PDF yolu; dosya yoksa (önbellek temizlendi) None."""
+    if job.status != 'DONE' or not job.file_name:
+        return None
+    path = os.path.join(report_cache_dir(), job.file_name)
+    return path if os.path.exists(path) else None
@@ -0,0 +1,196 @@
+# core/rollups.py
+"""
+Worksite ve sektör hasar özetleri (WorksiteDamageRollup, SectorDamageRollup).
+
+Sayaçlar yeniden sayılmaz, farklarla güncellenir (core/signals.py):
+- BuildingInventory: binanın site_assessment'ının worksite'ına +1 / -1 (buildings_assessed)
+- CurrentDamageState: güncel derece sayaçları (grade_*); derece değişince eskisi -1, yenisi +1
+- MovableHeritage: binasının site_assessment worksite'ına (binasızsa kendi worksite'ına) +1 / -1
+- IntangibleHeritage: kaydın worksite'ına +1 / -1
+Her fark worksite satırına ve worksite'ın sektörünün satırına aynı anda uygulanır.
+Worksite başka sektöre geçince satırı eski sektörden düşülüp yenisine eklenir. Kaydın üstü
+değişince (binanın saha tespiti, eserin binası) sayacı eski worksite'tan yenisine taşınır;
+bina taşınınca eserleri ve güncel hasar durumları da onunla gider.
+
+Cascade silmelerde her alt kayıt kendi farkını uyguladığı için worksite silinince
+sektör toplamları da kendiliğinden düşer.
+
+bulk_create / bulk_update / queryset.update() sinyal göndermez; bunlardan sonra
+rebuild_rollups() çağrılmalı ('rebuild_rollups' komutu).
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .damage import DAMAGE_DISPLAY, NOT_ASSESSED
+from .models import (
+    Sector, Worksite, SiteAssessment, BuildingInventory, CurrentDamageState, MovableHeritage, IntangibleHeritage,
+    DamageRollup, WorksiteDamageRollup, SectorDamageRollup,
+)
+
+ROLLUP_FIELDS = (
+    'buildings_assessed', 'assets_recorded', 'intangible_elements', *DamageRollup.GRADE_FIELDS.values(),
+)
+
+# values() ile ilişki üzerinden okunurken (Sector / Worksite sorgusuna join)
+ROLLUP_VALUES = tuple(f'damage_rollup__{field}' for field in ROLLUP_FIELDS)
+
+# Harita dolgu rengi (choropleth): güncel tespitlerde kritik oranı (%) en az bu kadarsa bu renk
+CHOROPLETH_STEPS = (
+    (50, DAMAGE_DISPLAY['COLLAPSED'][0]),
+    (25, DAMAGE_DISPLAY['MODERATE'][0]),
+    (1, DAMAGE_DISPLAY['LIGHT'][0]),
+    (0, DAMAGE_DISPLAY['NONE'][0]),
+)
+
+# Binaya bağlı eser binanın site_assessment worksite'ında, binasız eser kendi worksite'ında sayılır
+ASSET_WORKSITE = Coalesce('building__site_assessment__worksite', 'worksite')
+
+# Sayılan modeller: (worksite yolu, sayaç). Hasar durumunun sayacı derecesine göre seçilir (None).
+ROLLUP_SOURCES = {
+    BuildingInventory: ('site_assessment__worksite', 'buildings_assessed'),
+    CurrentDamageState: ('worksite', None),
+    MovableHeritage: (ASSET_WORKSITE, 'assets_recorded'),
+    IntangibleHeritage: ('worksite', 'intangible_elements'),
+}
+
+
+def rollup_worksite_id(instance):
+    """Kaydın sayıldığı worksite (bina ve binaya bağlı eser için site_assessment üzerinden)."""
+    if isinstance(instance, BuildingInventory):
+        return SiteAssessment.objects.filter(pk=instance.site_assessment_id).values_list('worksite_id', flat=True).first()
+    if isinstance(instance, MovableHeritage) and instance.building_id is not None:
+        site_worksite_id = BuildingInventory.objects.filter(pk=instance.building_id).values_list(
+            'site_assessment__worksite_id', flat=True
+        ).first()
+        return site_worksite_id or instance.worksite_id
+    return instance.worksite_id
+
+
+def stored_rollup_worksite_id(instance):
+    """Kaydın veritabanındaki haliyle sayıldığı worksite (düzenlemeden önce okunur)."""
+    path = ROLLUP_SOURCES[type(instance)][0]
+    return type(instance).objects.filter(pk=instance.pk).values_list(path, flat=True).first()
+
+
+def contribution(instance):
+    """Kaydın sayaçlara katkısı: {sayaç: 1}."""
+    counter = ROLLUP_SOURCES[type(instance)][1] or DamageRollup.GRADE_FIELDS[instance.overall_damage]
+    return {counter: 1}
+
+
+def _increments(counts):
+    # Sayaçlar eksiye düşmez (sapma olursa rebuild_rollups düzeltir)
+    return {field: Greatest(F(field) + n, Value(0)) for field, n in counts.items()}
+
+
+def apply_rollup_delta(worksite_id, counts, sign=1):
+    """counts farkını (sign ile çarpılarak) worksite'a ve sektörüne uygular: iki UPDATE."""
+    counts = {field: sign * n for field, n in counts.items() if n}
+    if worksite_id is None or not counts:
+        return
+    increments = _increments(counts)
+    with transaction.atomic():
+        WorksiteDamageRollup.objects.filter(pk=worksite_id).update(**increments)
+        SectorDamageRollup.objects.filter(sector__worksites=worksite_id).update(**increments)
+
+
+def move_rollup_counts(old_worksite_id, new_worksite_id, counts):
+    """Kaydı (veya kayıtları) başka worksite'a geçenlerin sayaçlarını eskisinden düşüp yenisine ekler."""
+    if old_worksite_id != new_worksite_id:
+        apply_rollup_delta(old_worksite_id, counts, sign=-1)
+        apply_rollup_delta(new_worksite_id, counts)
+
+
+def move_worksite_rollups(moves):
+    """
+    Sektör değiştiren worksite'ların sayaçlarını eski sektörden düşüp yenisine ekler.
+    moves: [(worksite id, eski sektör id, yeni sektör id), ...]
+    Worksite satırları tek sorguda okunur; etkilenen her sektöre tek UPDATE.
+    """
+    moves = [(pk, old, new) for pk, old, new in moves if old != new]
+    if not moves:
+        return
+    rows = WorksiteDamageRollup.objects.filter(pk__in=[pk for pk, _, _ in moves]).values_list('pk', *ROLLUP_FIELDS)
+    values = {pk: dict(zip(ROLLUP_FIELDS, counts)) for pk, *counts in rows if any(counts)}
+    deltas = defaultdict(Counter)
+    for pk, old_sector_id, new_sector_id in moves:
+        if pk not in values:
+            continue
+        if old_sector_id is not None:
+            deltas[old_sector_id].subtract(values[pk])
+        if new_sector_id is not None:
+            deltas[new_sector_id].update(values[pk])
+    updates = {sector_id: {field: n for field, n in delta.items() if n} for sector_id, delta in deltas.items()}
+    updates = {sector_id: counts for sector_id, counts in updates.items() if counts}
+    if not updates:
+        return
+    with transaction.atomic():
+        for sector_id, counts in updates.items():
+            SectorDamageRollup.objects.filter(pk=sector_id).update(**_increments(counts))
+
+
+def move_worksite_rollup(worksite_id, old_sector_id, new_sector_id):
+    move_worksite_rollups([(worksite_id, old_sector_id, new_sector_id)])
+
+
+def count_rollups():
+    """Kaynak tablolardan worksite bazında sayım: {worksite id: Counter(sayaç -> n)} (dört sorgu)."""
+    counts = defaultdict(Counter)
+    for model, (path, counter) in ROLLUP_SOURCES.items():
+        if counter is None:
+            rows = model.objects.order_by().values_list(path, 'overall_damage').annotate(n=Count('pk'))
+            for worksite_id, grade, n in rows:
+                counts[worksite_id][DamageRollup.GRADE_FIELDS[grade]] += n
+        else:
+            for worksite_id, n in model.objects.order_by().values_list(path).annotate(n=Count('pk')):
+                counts[worksite_id][counter] += n
+    counts.pop(None, None)
+    return counts
+
+
+def rebuild_rollups():
+    """Tüm worksite ve sektör özetlerini sıfırdan yazar. Döner: (worksite sayısı, sektör sayısı)."""
+    counts = count_rollups()
+    worksites = dict(Worksite.objects.values_list('pk', 'sector_id'))
+    sectors = {pk: Counter() for pk in Sector.objects.values_list('pk', flat=True)}
+    for worksite_id, sector_id in worksites.items():
+        if sector_id is not None:
+            sectors[sector_id].update(counts[worksite_id])
+
+    with transaction.atomic():
+        WorksiteDamageRollup.objects.all().delete()
+        SectorDamageRollup.objects.all().delete()
+        WorksiteDamageRollup.objects.bulk_create(
+            [WorksiteDamageRollup(worksite_id=pk, **counts[pk]) for pk in worksites], batch_size=1000
+        )
+        SectorDamageRollup.objects.bulk_create(
+            [SectorDamageRollup(sector_id=pk, **total) for pk, total in sectors.items()], batch_size=1000
+        )
+    return len(worksites), len(sectors)
+
+
+def rollup_summary(counts):
+    """Sayaçlardan harita / tablo özeti: sayılar, derece dağılımı, kritik oranı ve dolgu rengi."""
+    grades = {grade: counts.get(field) or 0 for grade, field in DamageRollup.GRADE_FIELDS.items()}
+    assessed = sum(grades.values())
+    critical = grades['SEVERE'] + grades['COLLAPSED']
+    share = int(round(100 * critical / assessed)) if assessed else 0
+    color = next(color for minimum, color in CHOROPLETH_STEPS if share >= minimum) if assessed else NOT_ASSESSED[0]
+    return {
+        'buildings': counts.get('buildings_assessed') or 0,
+        'assets': counts.get('assets_recorded') or 0,
+        'intangible': counts.get('intangible_elements') or 0,
+        'damages': grades,
+        'critical': critical,
+        'critical_share': share,
+        'color': color,
+    }
+
+
+def pop_rollup(row):
+    """values() satırındaki damage_rollup__* alanlarını tek 'rollup' özetine çevirir."""
+    row['rollup'] = rollup_summary({field: row.pop(value) for field, value in zip(ROLLUP_FIELDS, ROLLUP_VALUES)})
+    return row
@@ -0,0 +1,522 @@
+# core/seeding.py
+"""
+Yük / ölçek testleri için sentetik operasyon üretimi ('seed_operation' komutu).
+
+Aynı tohum (seed) ve ölçek her zaman aynı veriyi üretir: tüm rastgele seçimler tek bir
+random.Random örneğinden, tarihler sabit OPERATION_START'tan türetilir.
+
+Üretilen zincir:
+- Sektörler: ızgara hücreleri, kenarları içe doğru oynatılmış poligonlar
+- Worksite'lar: sektör poligonunun iç kutusunda nokta (sektörü doğrudan atanır)
+- Takımlar, unvanlı personel (bir kısmı takımsız), takım liderleri
+- Görevler: worksite başına zaman içinde ardışık 1-3 görev (sonuncusu aktif olabilir)
+- Saha tespiti, binalar (tam JSON matrisleri), tehlike türlerine göre hasar tespitleri
+  (artçı şok sonrası yeniden tespitler dahil), eserler ve transfer zincirleri,
+  somut olmayan miras öğeleri
+
+Her şey bulk_create ile yazılır; worksite'lar parça parça (WORKSITE_CHUNK) üretilir, her
+parça kendi transaction'ındadır ve bellek ölçekle büyümez. bulk_create sinyal göndermediği
+için sonunda istatistik, güncel hasar durumu, öncelik indeksi ve özetler yeniden kurulur.
+"""
+import json
+import math
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+
+from .damage import CRITICAL_GRADES
+from .damage_state import rebuild_damage_states
+from .map_data import bump_data_version
+from .models import (
+    Team, ExpertiseType, Institution, JobTitle, Country, Personnel, Sector, Worksite, Assignment,
+    SiteAssessment, BuildingInventory, DamageAssessment, MovableHeritage, MovableTracking, IntangibleHeritage,
+)
+from .personnel_import import COUNTRY_MAPPING
+from .priority import recompute_priorities
+from .rollups import rebuild_rollups
+from .spatial import SECTOR_VERSION_KEY
+from .statistics import rebuild_statistics
+
+# Ölçek adı -> worksite sayısı. Worksite başına ~20 satır üretilir: 'large' ~1M satır
+SCALES = {
+    'small': 200,
+    'medium': 5000,
+    'large': 50000,
+}
+DEFAULT_SCALE = 'small'
+DEFAULT_SEED = 1
+DEFAULT_BATCH_SIZE = 500
+WORKSITE_CHUNK = 500
+
+WORKSITES_PER_SECTOR = 150
+WORKSITES_PER_TEAM = 10
+TEAM_SIZE = 6
+# Takımsız (boşta) personel oranı
+UNASSIGNED_SHARE = 0.2
+
+OPERATION_START = datetime(2026, 2, 6, 4, 17, tzinfo=dt_timezone.utc)
+OPERATION_DAYS = 60
+
+# Operasyon bölgesinin güneybatı köşesi ve sektör hücresinin boyu (derece)
+ORIGIN_LNG, ORIGIN_LAT = 29.0, 40.1
+SECTOR_SIZE = 0.02
+# Poligon kenarları hücre boyunun bu oranı kadar içe oynar; worksite'lar bu payın içinde kalır
+EDGE_JITTER = 0.1
+
+GRADE_WEIGHTS = {'NONE': 20, 'LIGHT': 30, 'MODERATE': 25, 'SEVERE': 15, 'COLLAPSED': 10}
+GRADES = list(GRADE_WEIGHTS)
+# Binadaki tespit olasılıkları: artçı şok sonrası yeniden tespit, yangın, sel
+AFTERSHOCK_SHARE = 0.3
+FIRE_SHARE = 0.12
+HYDRO_SHARE = 0.08
+
+BUILDINGS_PER_SITE = ((1, 30), (2, 25), (3, 20), (4, 12), (5, 8), (6, 5))
+ASSETS_PER_BUILDING = ((0, 35), (1, 25), (2, 20), (3, 12), (4, 8))
+MOVEMENTS_PER_ASSET = ((0, 40), (1, 30), (2, 20), (3, 10))
+INTANGIBLE_SHARE = 0.3
+
+FIRST_NAMES = (
+    'Ayşe', 'Mehmet', 'Elif', 'Mustafa', 'Zeynep', 'Ahmet', 'Giulia', 'Marco', 'Sofia', 'Luca', 'Ana', 'Jan',
+    'Maria', 'Nikos', 'Eleni', 'Ivan', 'Petra', 'Tomas', 'Clara', 'Jonas', 'Ines', 'Pablo', 'Lena', 'Emre',
+)
+LAST_NAMES = (
+    'Yılmaz', 'Kaya', 'Demir', 'Şahin', 'Çelik', 'Rossi', 'Bianchi', 'Costa', 'Novak', 'Horvat', 'Popescu',
+    'Papadopoulos', 'Dimitrov', 'Schmidt', 'Müller', 'García', 'Silva', 'Jensen', 'Nowak', 'Dubois', 'Öztürk',
+)
+JOB_TITLES = (
+    'Architect', 'Structural Engineer', 'Conservator', 'Restorer', 'Archaeologist', 'Art Historian',
+    'Museum Curator', 'Civil Protection Officer', 'Logistics Coordinator', 'Documentation Specialist',
+    'Photographer', 'GIS Specialist', 'Team Leader', 'Safety Officer',
+)
+INSTITUTIONS = (
+    'Ministry of Culture', 'Civil Protection Department', 'Regional Heritage Directorate', 'National Museum',
+    'Technical University', 'Fire Brigade', 'Restoration Institute', 'Municipality',
+)
+EXPERTISE_CODES = ('DRM', 'CH', 'BOTH')
+CALL_SIGNS = ('Alpha', 'Bravo', 'Charlie', 'Delta', 'Echo', 'Foxtrot', 'Golf', 'Hotel', 'India', 'Juliet')
+SITE_KINDS = (
+    'Mosque', 'Church', 'Covered Bazaar', 'Caravanserai', 'Hamam', 'Museum', 'Library', 'Madrasa', 'Fountain',
+    'Mansion', 'Clock Tower', 'Bridge', 'Synagogue', 'Castle', 'Archive',
+)
+BUILDING_TYPES = ('Prayer hall', 'Minaret', 'Courtyard wing', 'Main block', 'Storage', 'Gate', 'Annex', 'Tower')
+ASSET_CATEGORIES = ('Painting', 'Sculpture', 'Manuscript', 'Textile', 'Ceramic', 'Icon', 'Furniture', 'Metalwork')
+INTANGIBLE_ELEMENTS = (
+    'Shadow theatre', 'Ritual procession', 'Traditional weaving', 'Coppersmith craft', 'Folk music ensemble',
+    'Calligraphy school', 'Seasonal festival', 'Storytelling tradition',
+)
+
+STRUCTURAL_ELEMENTS = ('foundations', 'walls', 'columns', 'arches', 'vaults', 'floors', 'roof', 'stairs')
+NON_STRUCTURAL_ELEMENTS = ('plaster', 'decorations', 'windows_doors', 'partitions', 'installations', 'chimneys')
+INTERVENTIONS = ('shoring', 'propping', 'tie_rods', 'covering', 'debris_removal', 'fencing', 'evacuation')
+INTERVENTION_LEVELS = ('URGENT', 'HIGH', 'MEDIUM', 'LOW', 'NO')
+CULTURAL_ELEMENTS = ('frescoes', 'carved_stone', 'tiles', 'woodwork', 'inscriptions', 'stained_glass', 'mosaics')
+MATERIALS = ('stone', 'brick', 'timber', 'rubble', 'reinforced_concrete', 'adobe')
+
+
+def timestamp_fields(model):
+    """auto_now / auto_now_add alanlarının adları (created_at, updated_at)."""
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+
+
+def stamped(when):
+    return {'created_at': when, 'updated_at': when}
+
+
+def scale_plan(worksites):
+    """Worksite sayısından türetilen sayılar."""
+    teams = max(2, math.ceil(worksites / WORKSITES_PER_TEAM))
+    return {
+        'worksites': worksites,
+        'sectors': max(1, round(worksites / WORKSITES_PER_SECTOR)),
+        'teams': teams,
+        'personnel': teams * TEAM_SIZE + math.ceil(teams * TEAM_SIZE * UNASSIGNED_SHARE),
+    }
+
+
+class OperationSeeder:
+    """
+    Sentetik operasyonu üretir. run() sonunda self.counts: {model adı: eklenen satır}.
+    """
+    def __init__(self, worksites, seed=DEFAULT_SEED, batch_size=DEFAULT_BATCH_SIZE):
+        self.plan = scale_plan(worksites)
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.counts = Counter()
+
+    # --- yardımcılar ---
+    def pick(self, weighted):
+        values, weights = zip(*weighted)
+        return self.rng.choices(values, weights)[0]
+
+    def grade(self, around=None):
+        """Ağırlıklı rastgele derece; around verilirse ona yakın (±1) bir derece."""
+        if around is None:
+            return self.rng.choices(GRADES, list(GRADE_WEIGHTS.values()))[0]
+        rank = GRADES.index(around) + self.rng.choice((-1, 0, 0, 1))
+        return GRADES[min(max(rank, 0), len(GRADES) - 1)]
+
+    def moment(self, start, hours):
+        return start + timedelta(hours=self.rng.uniform(0, hours))
+
+    def create(self, model, objects):
+        """
+        bulk_create, auto_now alanlarını şimdiki zamanla ezer; üretilen tarihler
+        önceden saklanıp ardından bulk_update ile geri yazılır (alan tanımlarına dokunulmaz).
+        """
+        fields = timestamp_fields(model)
+        planned = [[getattr(obj, name) for name in fields] for obj in objects]
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        if fields and created:
+            for obj, values in zip(created, planned):
+                for name, value in zip(fields, values):
+                    if value is not None:
+                        setattr(obj, name, value)
+            model.objects.bulk_update(created, fields, batch_size=self.batch_size)
+        self.counts[model.__name__] += len(created)
+        return created
+
+    # --- üretim ---
+    def run(self, progress=None):
+        """progress(üretilen worksite, toplam worksite) her parçadan sonra çağrılır."""
+        with transaction.atomic():
+            lookups = self.seed_lookups()
+            sectors = self.seed_sectors()
+            teams = self.seed_teams(lookups)
+        total = self.plan['worksites']
+        for start in range(0, total, WORKSITE_CHUNK):
+            size = min(WORKSITE_CHUNK, total - start)
+            with transaction.atomic():
+                self.seed_worksites(start, size, sectors, teams)
+            if progress:
+                progress(start + size, total)
+        self.rebuild()
+        return self.counts
+
+    def seed_lookups(self):
+        """Ülke, kurum, uzmanlık ve unvan sözlükleri (mevcutlar korunur, eksikler eklenir)."""
+        wanted = (
+            (Country, 'name', sorted(set(COUNTRY_MAPPING.values()))),
+            (Institution, 'name', INSTITUTIONS),
+            (ExpertiseType, 'code', EXPERTISE_CODES),
+            (JobTitle, 'title', JOB_TITLES),
+        )
+        lookups = {}
+        for model, field, names in wanted:
+            model.objects.bulk_create([model(**{field: name}) for name in names], ignore_conflicts=True)
+            lookups[model] = list(model.objects.filter(**{f'{field}__in': names}).order_by(field))
+        return lookups
+
+    def sector_polygon(self, west, south):
+        """Hücre kenarları boyunca, içe doğru oynatılmış noktalardan poligon."""
+        jitter = SECTOR_SIZE * EDGE_JITTER
+        east, north = west + SECTOR_SIZE, south + SECTOR_SIZE
+        steps = [i / 4 for i in range(4)]
+        ring = (
+            [(west + SECTOR_SIZE * t, south + self.rng.uniform(0, jitter)) for t in steps]
+            + [(east - self.rng.uniform(0, jitter), south + SECTOR_SIZE * t) for t in steps]
+            + [(east - SECTOR_SIZE * t, north - self.rng.uniform(0, jitter)) for t in steps]
+            + [(west + self.rng.uniform(0, jitter), north - SECTOR_SIZE * t) for t in steps]
+        )
+        ring = [[round(lng, 6), round(lat, 6)] for lng, lat in ring]
+        return {"type": "Polygon", "coordinates": [ring + [ring[0]]]}
+
+    def seed_sectors(self):
+        """Sektörler ve iç kutuları: [(sektör, (batı, güney, doğu, kuzey)), ...]"""
+        count = self.plan['sectors']
+        columns = math.ceil(math.sqrt(count))
+        sectors, boxes = [], []
+        for i in range(count):
+            row, column = divmod(i, columns)
+            west, south = ORIGIN_LNG + column * SECTOR_SIZE, ORIGIN_LAT + row * SECTOR_SIZE
+            sector = Sector(
+                name=f"Sector {chr(ord('A') + row % 26)}{row // 26 or ''}-{column + 1:02d}",
+                color='#%06x' % self.rng.randrange(0x1000000),
+                location_data=json.dumps(self.sector_polygon(west, south)),
+                **stamped(OPERATION_START),
+            )
+            sector.refresh_geometry()  # save() çağrılmadığı için türetilmiş kolonlar burada
+            sectors.append(sector)
+            margin = SECTOR_SIZE * EDGE_JITTER
+            boxes.append((west + margin, south + margin, west + SECTOR_SIZE - margin, south + SECTOR_SIZE - margin))
+        return list(zip(self.create(Sector, sectors), boxes))
+
+    def seed_teams(self, lookups):
+        """Takımlar, personel (unvanlarıyla) ve takım liderleri. Döner: [(takım, üye adları), ...]"""
+        teams = self.create(Team, [
+            Team(name=f"{CALL_SIGNS[i % len(CALL_SIGNS)]} {i // len(CALL_SIGNS) + 1}",
+                 description="Field assessment team", **stamped(OPERATION_START))
+            for i in range(self.plan['teams'])
+        ])
+        countries, institutions = lookups[Country], lookups[Institution]
+        expertise, titles = lookups[ExpertiseType], lookups[JobTitle]
+        people = []
+        for i in range(self.plan['personnel']):
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            team = teams[i // TEAM_SIZE] if i < len(teams) * TEAM_SIZE else None
+            people.append(Personnel(
+                team=team,
+                first_name=first,
+                last_name=last,
+                gender=self.rng.choice('MF'),
+                email=f"person{i + 1:06d}@seed.example.org",
+                mobile=f"+90 5{self.rng.randrange(10 ** 9):09d}",
+                sq_number=self.rng.choice(Personnel.SQ_TYPE_CHOICES)[0],
+                country=self.rng.choice(countries),
+                institution=self.rng.choice(institutions),
+                primary_expertise=self.rng.choice(expertise),
+                **stamped(OPERATION_START - timedelta(days=self.rng.randint(1, 30))),
+            ))
+        people = self.create(Personnel, people)
+
+        through = Personnel.job_titles.through
+        self.create(through, [
+            through(personnel_id=person.pk, jobtitle_id=title.pk)
+            for person in people for title in self.rng.sample(titles, self.rng.randint(1, 2))
+        ])
+
+        members = {team.pk: [] for team in teams}
+        for person in people:
+            if person.team_id is not None:
+                members[person.team_id].append(person)
+        for team in teams:
+            team.team_leader = members[team.pk][0]
+        Team.objects.bulk_update(teams, ['team_leader'], batch_size=self.batch_size)
+        return [(team, [str(person) for person in members[team.pk]]) for team in teams]
+
+    def seed_worksites(self, offset, size, sectors, teams):
+        """Bir parça worksite ve altındaki tüm kayıtlar."""
+        worksites, assignments, visits_by_site = [], [], []
+        for i in range(offset, offset + size):
+            sector, (west, south, east, north) = sectors[i % len(sectors)]
+            lng, lat = self.rng.uniform(west, east), self.rng.uniform(south, north)
+            start = self.moment(OPERATION_START, OPERATION_DAYS * 0.7 * 24)
+            completed = self.rng.random() < 0.35
+            worksite = Worksite(
+                name=f"{self.rng.choice(SITE_KINDS)} {i + 1}",
+                sector=sector,
+                description=f"Synthetic worksite {i + 1}",
+                location_data=json.dumps({"type": "Point", "coordinates": [round(lng, 6), round(lat, 6)]}),
+                status='COMPLETED' if completed else 'OPEN',
+                **stamped(start),
+            )
+            worksite.refresh_geometry()
+
+            # Görevler: ardışık ziyaretler; worksite açıksa sonuncusu çoğunlukla aktif
+            visits = self.pick(((1, 50), (2, 35), (3, 15)))
+            visit_list = []
+            for n in range(visits):
+                team, names = self.rng.choice(teams)
+                end = start + timedelta(hours=self.rng.uniform(12, 120))
+                status = 'COMPLETED'
+                if n == visits - 1 and not completed:
+                    status = 'ACTIVE' if self.rng.random() < 0.8 else 'CANCELLED'
+                assignment = Assignment(
+                    team=team, worksite=worksite, start_time=start,
+                    end_time=None if status == 'ACTIVE' else end, status=status,
+                    notes=f"Visit {n + 1}", **stamped(start),
+                )
+                assignments.append(assignment)
+                visit_list.append((assignment, names, start, end))
+                start = end + timedelta(hours=self.rng.uniform(0, 72))
+            if completed:
+                worksite.completion_date = visit_list[-1][3].date()
+            worksites.append(worksite)
+            visits_by_site.append((i + 1, worksite, visit_list))
+        self.create(Worksite, worksites)
+        self.create(Assignment, assignments)
+
+        sites, buildings, damages, assets, intangibles = [], [], [], [], []
+        for number, worksite, visit_list in visits_by_site:
+            first, names, start, _ = visit_list[0]
+            site = self.site_assessment(number, worksite, first, names, start)
+            sites.append((site, worksite, visit_list))
+        self.create(SiteAssessment, [site for site, _, _ in sites])
+
+        for site, worksite, visit_list in sites:
+            for j in range(site.number_of_buildings):
+                assignment, names, start, end = self.rng.choice(visit_list)
+                building = self.building(site, worksite, assignment, names, start, end, j)
+                buildings.append((building, worksite, visit_list))
+            if site.has_intangible_link:
+                for _ in range(self.rng.randint(1, 2)):
+                    assignment, names, start, end = self.rng.choice(visit_list)
+                    intangibles.append(self.intangible(worksite, assignment, names, start, end))
+        self.create(BuildingInventory, [building for building, _, _ in buildings])
+
+        for building, worksite, visit_list in buildings:
+            damages.extend(self.damages(building, worksite, visit_list))
+            for _ in range(self.pick(ASSETS_PER_BUILDING)):
+                assets.append(self.asset(building, worksite, self.rng.choice(visit_list)))
+        self.create(DamageAssessment, damages)
+        self.create(IntangibleHeritage, intangibles)
+        assets = self.create(MovableHeritage, assets)
+        self.create(MovableTracking, [movement for asset in assets for movement in self.movements(asset)])
+
+    def site_assessment(self, number, worksite, assignment, names, start):
+        return SiteAssessment(
+            assignment=assignment, worksite=worksite,
+            team_leader=names[0], editor_name=self.rng.choice(names),
+            site_reference_code=f"ST-{number:06d}",
+            region='Marmara', province='Bursa', municipality=self.rng.choice(('Osmangazi', 'Yıldırım', 'Nilüfer')),
+            address=f"{worksite.name} street {self.rng.randint(1, 200)}",
+            site_type=self.rng.choice(SiteAssessment.SITE_TYPES)[0],
+            number_of_buildings=self.pick(BUILDINGS_PER_SITE),
+            description_details={
+                'typology': worksite.name.rsplit(' ', 1)[0],
+                'use': self.rng.choice(('religious', 'museum', 'commercial', 'residential', 'public')),
+                'context': self.rng.choice(('historic centre', 'rural', 'urban fabric')),
+            },
+            is_protected=self.rng.choice(('YES', 'NO', 'UNKNOWN')),
+            has_intangible_link=self.rng.random() < INTANGIBLE_SHARE,
+            hazard_data={
+                'seismic': True,
+                'fire': self.rng.random() < FIRE_SHARE,
+                'hydro': self.rng.random() < HYDRO_SHARE,
+                'aftershock_risk': self.rng.choice(('LOW', 'MEDIUM', 'HIGH')),
+            },
+            **stamped(self.moment(start, 6)),
+        )
+
+    def building(self, site, worksite, assignment, names, start, end, index):
+        floors = self.rng.randint(1, 4)
+        area = round(self.rng.uniform(40, 1500), 1)
+        height = round(floors * self.rng.uniform(3, 4.5), 1)
+        return BuildingInventory(
+            assignment=assignment, worksite=worksite, site_assessment=site,
+            team_leader=names[0], editor_name=self.rng.choice(names),
+            building_code=f"{site.site_reference_code}-B{index + 1}",
+            building_name=f"{self.rng.choice(BUILDING_TYPES)} of {worksite.name}",
+            description_matrix={
+                'type': self.rng.choice(BUILDING_TYPES),
+                'original_use': self.rng.choice(('religious', 'residential', 'commercial')),
+                'current_use': self.rng.choice(('religious', 'museum', 'unused', 'residential')),
+                'occupied': self.rng.random() < 0.6,
+            },
+            surface_area=area, avg_height=height, floors_above=floors, floors_below=self.rng.randint(0, 1),
+            volume=round(area * height, 1), construction_age=f"{self.rng.randint(14, 19)}th century",
+            structural_elements={
+                element: {material: True for material in self.rng.sample(MATERIALS, self.rng.randint(1, 2))}
+                for element in STRUCTURAL_ELEMENTS
+            },
+            non_structural_elements={element: self.rng.random() < 0.7 for element in NON_STRUCTURAL_ELEMENTS},
+            cultural_elements={element: self.rng.random() < 0.35 for element in CULTURAL_ELEMENTS},
+            **stamped(self.moment(start, (end - start).total_seconds() / 3600)),
+        )
+
+    def damage_matrix(self, elements, overall):
+        """Eleman -> derece; bazı hücreler seviye -> oran biçiminde (core/analytics.py)."""
+        matrix = {}
+        for element in elements:
+            grade = self.grade(overall)
+            if self.rng.random() < 0.25 and grade != 'NONE':
+                share = self.rng.choice((20, 40, 60))
+                matrix[element] = {GRADES[GRADES.index(grade) - 1]: share, grade: 100 - share}
+            else:
+                matrix[element] = grade
+        return matrix
+
+    def damages(self, building, worksite, visit_list):
+        """Binanın tespitleri: sismik (artçı sonrası yeniden), yangın, sel."""
+        hazards = ['SEISMIC']
+        if self.rng.random() < AFTERSHOCK_SHARE:
+            hazards.append('SEISMIC')
+        if self.rng.random() < FIRE_SHARE:
+            hazards.append('FIRE')
+        if self.rng.random() < HYDRO_SHARE:
+            hazards.append('HYDRO')
+        when = building.created_at
+        previous = {}
+        for hazard in hazards:
+            assignment, names, _, _ = self.rng.choice(visit_list)
+            when = when + timedelta(hours=self.rng.uniform(1, 48))
+            # Yeniden tespitte derece önceki tespitten çok uzaklaşmaz
+            overall = self.grade(previous.get(hazard))
+            previous[hazard] = overall
+            # Acil müdahale sadece ağır hasarda
+            levels = INTERVENTION_LEVELS if overall in CRITICAL_GRADES else INTERVENTION_LEVELS[1:]
+            event = {}
+            if hazard == 'FIRE':
+                event = {'fire_origin': self.rng.choice(('electrical', 'unknown', 'adjacent building'))}
+            elif hazard == 'HYDRO':
+                event = {'water_level_cm': self.rng.randint(10, 180), 'water_type': self.rng.choice(('clean', 'muddy'))}
+            yield DamageAssessment(
+                assignment=assignment, worksite=worksite, building=building,
+                team_leader=names[0], editor_name=self.rng.choice(names),
+                hazard_type=hazard, event_details=event, overall_damage=overall,
+                structural_damage=self.damage_matrix(STRUCTURAL_ELEMENTS, overall),
+                non_structural_damage=self.damage_matrix(NON_STRUCTURAL_ELEMENTS, overall),
+                intervention_needs={
+                    need: self.rng.choice(levels)
+                    for need in self.rng.sample(INTERVENTIONS, self.rng.randint(2, len(INTERVENTIONS)))
+                },
+                notes='', **stamped(when),
+            )
+
+    def asset(self, building, worksite, visit):
+        assignment, names, start, end = visit
+        category = self.rng.choice(ASSET_CATEGORIES)
+        return MovableHeritage(
+            assignment=assignment, worksite=worksite, building=building,
+            team_leader=names[0], editor_name=self.rng.choice(names),
+            object_name=f"{category} {self.rng.randint(1, 999)}", category=category,
+            quantity=str(self.rng.randint(1, 5)),
+            description_details={
+                'material': self.rng.choice(('canvas', 'wood', 'stone', 'paper', 'bronze', 'textile')),
+                'dimensions_cm': [self.rng.randint(10, 300), self.rng.randint(10, 300)],
+                'inventory_no': f"INV-{self.rng.randrange(10 ** 6):06d}",
+            },
+            damage_condition={
+                'condition': self.grade(),
+                'wet': self.rng.random() < 0.1,
+                'fragments': self.rng.random() < 0.15,
+            },
+            evacuation_needs={
+                'packing': self.rng.choice(('crate', 'wrap', 'box')),
+                'priority': self.rng.choice(INTERVENTION_LEVELS[:4]),
+                'people_needed': self.rng.randint(1, 6),
+            },
+            **stamped(self.moment(start, (end - start).total_seconds() / 3600)),
+        )
+
+    def movements(self, asset):
+        """Eser transfer zinciri: yerinden geçici depoya, oradan bölge deposuna ..."""
+        location = f"Floor {self.rng.randint(0, 3)} / Room {self.rng.randint(1, 20)}"
+        when = asset.created_at
+        for n in range(self.pick(MOVEMENTS_PER_ASSET)):
+            when = when + timedelta(hours=self.rng.uniform(6, 96))
+            target = f"Temporary storage {self.rng.randint(1, 40)}" if n == 0 else f"Regional depot {self.rng.randint(1, 8)}"
+            yield MovableTracking(
+                asset=asset, transfer_date=when, team_id=asset.assignment.team.name,
+                responsible_person=asset.editor_name, from_location=location, to_location=target,
+            )
+            location = target
+
+    def intangible(self, worksite, assignment, names, start, end):
+        return IntangibleHeritage(
+            assignment=assignment, worksite=worksite,
+            team_leader=names[0], editor_name=self.rng.choice(names),
+            element_name=self.rng.choice(INTANGIBLE_ELEMENTS),
+            community_contact=f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+            description_data={'domain': self.rng.choice(('performing arts', 'craftsmanship', 'rituals', 'oral traditions'))},
+            impact_data={
+                'practitioners_affected': self.rng.randint(1, 80),
+                'venue_damaged': self.rng.random() < 0.5,
+                'tools_lost': self.rng.random() < 0.3,
+            },
+            assistance_needs={'temporary_venue': self.rng.random() < 0.4, 'funding': self.rng.choice(('HIGH', 'MEDIUM', 'LOW'))},
+            **stamped(self.moment(start, (end - start).total_seconds() / 3600)),
+        )
+
+    def rebuild(self):
+        """bulk_create sinyal göndermez: türetilmiş tablolar ve önbellek versiyonları yeniden kurulur."""
+        rebuild_statistics()
+        rebuild_damage_states()
+        recompute_priorities()
+        rebuild_rollups()
+        bump_data_version()
+        bump_data_version(SECTOR_VERSION_KEY)
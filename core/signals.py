@@ -0,0 +1,354 @@
+# core/signals.py
+"""
+Model sinyalleri. CoreConfig.ready() içinde yüklenir.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+
+from .clustering import worksite_clusters
+from .map_data import bump_data_version
+from .models import (
+    Team, Sector, Worksite, Assignment, SiteAssessment, BuildingInventory, DamageAssessment, CurrentDamageState,
+    Personnel, JobTitle, Country, ExpertiseType, MovableHeritage, IntangibleHeritage, WorksiteDamageRollup,
+    SectorDamageRollup,
+)
+from .damage_state import refresh_damage_state
+from .priority import update_building_priority
+from .reports import REPORT_VERSION_KEY
+from .rollups import (
+    ROLLUP_SOURCES, apply_rollup_delta, contribution as rollup_contribution, move_rollup_counts, move_worksite_rollup,
+    rollup_worksite_id, stored_rollup_worksite_id,
+)
+from .spatial import SECTOR_VERSION_KEY
+from .statistics import (
+    CONTRIBUTIONS, LOOKUP_COUNTERS, contribution, load_previous, difference, negate,
+    apply_delta, move_counter_key, counter_key,
+)
+
+# Harita verisini (map_data) etkileyen modeller.
+# Team de eklendi: takım adı pop-up'larda gösteriliyor.
+# Bina / eser / somut olmayan miras: sektör pop-up'larındaki özet sayılar (core/rollups.py)
+# Saha tespiti: matris analitiği sektörü binanın site_assessment'ından okur (core/analytics.py)
+MAP_DATA_MODELS = (
+    Sector, Worksite, Assignment, DamageAssessment, Team, BuildingInventory, MovableHeritage, IntangibleHeritage,
+    SiteAssessment,
+)
+
+# Worksite kümelerini (renk / görev durumu) etkileyen modeller: {model: worksite yolu}
+# Bina: güncel hasar durumu binanın site_assessment worksite'ında; bina taşınınca o da taşınır
+CLUSTER_MODELS = {
+    Worksite: 'pk',
+    Assignment: 'worksite',
+    DamageAssessment: 'worksite',
+    BuildingInventory: 'site_assessment__worksite',
+}
+
+
+def data_changed(worksite_ids=()):
+    """Commit sonrası: versiyonu artır, kümelerde sadece ilgili worksite'ları güncelle."""
+    version = bump_data_version()
+    worksite_clusters.apply_change(version, worksite_ids)
+
+
+def remember_cluster_worksite(sender, instance, raw=False, **kwargs):
+    # Kayıt başka worksite'a taşınırsa eski worksite'ın kümedeki durumu da yenilenir
+    instance._cluster_worksite = None
+    if not raw and instance.pk is not None and not instance._state.adding:
+        instance._cluster_worksite = sender.objects.filter(pk=instance.pk).values_list(
+            CLUSTER_MODELS[sender], flat=True
+        ).first()
+
+
+def invalidate_map_data(sender, instance, **kwargs):
+    worksite_ids = set()
+    if sender is Worksite:
+        worksite_ids = {instance.pk}
+    elif sender in CLUSTER_MODELS:
+        current = rollup_worksite_id(instance) if sender is BuildingInventory else instance.worksite_id
+        worksite_ids = {current, instance.__dict__.pop('_cluster_worksite', None)} - {None}
+    # Commit'ten önce artırırsak başka bir istek eski veriyi yeni versiyonla saklayabilir
+    transaction.on_commit(lambda: data_changed(sorted(worksite_ids)))
+
+
+for model in MAP_DATA_MODELS:
+    post_save.connect(invalidate_map_data, sender=model, dispatch_uid=f'map_data_save_{model.__name__}')
+    post_delete.connect(invalidate_map_data, sender=model, dispatch_uid=f'map_data_delete_{model.__name__}')
+for model in CLUSTER_MODELS:
+    if model is not Worksite:
+        pre_save.connect(remember_cluster_worksite, sender=model, dispatch_uid=f'cluster_pre_save_{model.__name__}')
+
+
+def invalidate_sector_index(sender, instance, **kwargs):
+    # Sektör poligon indeksi (core/spatial.py) sadece sektörler değişince yeniden kurulur
+    transaction.on_commit(lambda: bump_data_version(SECTOR_VERSION_KEY))
+
+
+post_save.connect(invalidate_sector_index, sender=Sector, dispatch_uid='sector_index_save')
+post_delete.connect(invalidate_sector_index, sender=Sector, dispatch_uid='sector_index_delete')
+
+
+def invalidate_report(sender, **kwargs):
+    # Rapor özeti (core/reports.py) bu tabloların düzenlemesini sayı / id / updated_at'ten göremez
+    if kwargs.get('action', 'post').startswith('post'):
+        transaction.on_commit(lambda: bump_data_version(REPORT_VERSION_KEY))
+
+
+for model in (Country, ExpertiseType, JobTitle):
+    post_save.connect(invalidate_report, sender=model, dispatch_uid=f'report_save_{model.__name__}')
+    post_delete.connect(invalidate_report, sender=model, dispatch_uid=f'report_delete_{model.__name__}')
+m2m_changed.connect(invalidate_report, sender=Personnel.job_titles.through, dispatch_uid='report_job_titles')
+
+
+# --- OPERASYON İSTATİSTİKLERİ (core/statistics.py) ---
+# Sayaçlar farklarla güncellenir: pre_save eski hali saklar, post_save / post_delete farkı uygular.
+
+def remember_statistics_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        instance._statistics_previous = load_previous(instance, update_fields)
+
+
+def update_statistics_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance.__dict__.pop('_statistics_previous', None)
+    if created:
+        apply_delta(*contribution(instance))
+    elif previous is not None:
+        apply_delta(*difference(contribution(instance), contribution(previous)))
+
+
+def remember_deleted_state(sender, instance, origin=None, **kwargs):
+    # Silme isteğindeki nesne bellekte eski kalmış olabilir (örn. uzmanlığı sonradan silinmiş);
+    # cascade ile silinenler zaten veritabanından okunmuştur
+    if origin is instance:
+        instance._statistics_previous = load_previous(instance)
+    if sender is Personnel:
+        # Unvan bağlantıları cascade ile gider, m2m_changed gönderilmez
+        instance._statistics_job_titles = Counter(instance.job_titles.values_list('title', flat=True))
+
+
+def update_statistics_on_delete(sender, instance, **kwargs):
+    previous = instance.__dict__.pop('_statistics_previous', None)
+    counts, buckets = negate(contribution(previous or instance))
+    titles = instance.__dict__.pop('_statistics_job_titles', None)
+    if titles:
+        buckets['job_titles'] = Counter({title: -n for title, n in titles.items()})
+    apply_delta(counts, buckets)
+
+
+for model in CONTRIBUTIONS:
+    pre_save.connect(remember_statistics_state, sender=model, dispatch_uid=f'statistics_pre_save_{model.__name__}')
+    post_save.connect(update_statistics_on_save, sender=model, dispatch_uid=f'statistics_save_{model.__name__}')
+    pre_delete.connect(remember_deleted_state, sender=model, dispatch_uid=f'statistics_pre_delete_{model.__name__}')
+    post_delete.connect(update_statistics_on_delete, sender=model, dispatch_uid=f'statistics_delete_{model.__name__}')
+
+
+def linked_job_titles(instance, reverse, pk_set=None):
+    """Unvan bağlantılarının {unvan: bağlantı sayısı} hali (pk_set yoksa mevcut bağlantılar)."""
+    if reverse:  # instance bir JobTitle, pk_set personel id'leri
+        total = len(pk_set) if pk_set is not None else instance.personnel_set.count()
+        return Counter({instance.title: total})
+    titles = JobTitle.objects.filter(pk__in=pk_set) if pk_set is not None else instance.job_titles.all()
+    return Counter(titles.values_list('title', flat=True))
+
+
+def update_job_title_statistics(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._statistics_cleared = linked_job_titles(instance, reverse)
+        return
+    if action == 'post_clear':
+        titles, sign = instance.__dict__.pop('_statistics_cleared', Counter()), -1
+    elif action in ('post_add', 'post_remove') and pk_set:
+        titles, sign = linked_job_titles(instance, reverse, pk_set), (1 if action == 'post_add' else -1)
+    else:
+        return
+    apply_delta(buckets={'job_titles': {title: sign * n for title, n in titles.items()}})
+
+
+m2m_changed.connect(update_job_title_statistics, sender=Personnel.job_titles.through,
+                    dispatch_uid='statistics_job_titles')
+
+
+def remember_lookup_name(sender, instance, raw=False, **kwargs):
+    name_field = LOOKUP_COUNTERS[sender][0]
+    instance._statistics_name = None
+    if not raw and instance.pk is not None and not instance._state.adding:
+        instance._statistics_name = sender.objects.filter(pk=instance.pk).values_list(name_field, flat=True).first()
+
+
+def rename_lookup_counter(sender, instance, raw=False, **kwargs):
+    name_field, counter, _ = LOOKUP_COUNTERS[sender]
+    old_name = instance.__dict__.pop('_statistics_name', None)
+    new_name = getattr(instance, name_field)
+    if not raw and old_name is not None and old_name != new_name:
+        move_counter_key(counter, counter_key(old_name), counter_key(new_name))
+
+
+def drop_lookup_counter(sender, instance, **kwargs):
+    name_field, counter, moved_to = LOOKUP_COUNTERS[sender]
+    move_counter_key(counter, counter_key(getattr(instance, name_field)), moved_to)
+
+
+for model in LOOKUP_COUNTERS:
+    pre_save.connect(remember_lookup_name, sender=model, dispatch_uid=f'statistics_lookup_pre_save_{model.__name__}')
+    post_save.connect(rename_lookup_counter, sender=model, dispatch_uid=f'statistics_lookup_save_{model.__name__}')
+    post_delete.connect(drop_lookup_counter, sender=model, dispatch_uid=f'statistics_lookup_delete_{model.__name__}')
+
+
+
+# --- GÜNCEL HASAR DURUMU (core/damage_state.py) ---
+# Öncelik indeksinden önce bağlanır: indeks güncel durum tablosunu okur.
+
+def remember_damage_key(sender, instance, raw=False, **kwargs):
+    # Düzenlemede bina / tehlike değişirse eski anahtarın durumu da yeniden belirlenir
+    instance._damage_state_key = None
+    if not raw and instance.pk is not None and not instance._state.adding:
+        instance._damage_state_key = DamageAssessment.objects.filter(pk=instance.pk).values_list(
+            'building_id', 'hazard_type'
+        ).first()
+
+
+def update_damage_state_on_save(sender, instance, raw=False, **kwargs):
+    previous = instance.__dict__.pop('_damage_state_key', None)
+    if raw:
+        return
+    key = (instance.building_id, instance.hazard_type)
+    # Önce eski anahtar: tespit yeni anahtara geçmeden eski satırdan ayrılmalı (assessment tekil)
+    if previous is not None and previous != key:
+        refresh_damage_state(*previous)
+    refresh_damage_state(*key)
+
+
+def update_damage_state_on_delete(sender, instance, **kwargs):
+    refresh_damage_state(instance.building_id, instance.hazard_type)
+
+
+pre_save.connect(remember_damage_key, sender=DamageAssessment, dispatch_uid='damage_state_pre_save')
+post_save.connect(update_damage_state_on_save, sender=DamageAssessment, dispatch_uid='damage_state_save')
+post_delete.connect(update_damage_state_on_delete, sender=DamageAssessment, dispatch_uid='damage_state_delete')
+
+# --- BİNA ÖNCELİK İNDEKSİ (core/priority.py) ---
+
+def update_priority_on_damage(sender, instance, raw=False, **kwargs):
+    # Bina cascade ile siliniyorsa update_building_priority bir şey yazmaz
+    if not raw:
+        update_building_priority(instance.building_id)
+
+
+def update_priority_on_building(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Sadece kültürel elemanlar skoru etkiler; priority_index kendisi queryset.update() ile yazılır
+    if raw or not (created or update_fields is None or 'cultural_elements' in update_fields):
+        return
+    instance.priority_index = update_building_priority(instance.pk)
+
+
+post_save.connect(update_priority_on_damage, sender=DamageAssessment, dispatch_uid='priority_damage_save')
+post_delete.connect(update_priority_on_damage, sender=DamageAssessment, dispatch_uid='priority_damage_delete')
+post_save.connect(update_priority_on_building, sender=BuildingInventory, dispatch_uid='priority_building_save')
+
+
+
+# --- WORKSITE / SEKTÖR HASAR ÖZETLERİ (core/rollups.py) ---
+
+def remember_rollup_grade(sender, instance, raw=False, **kwargs):
+    # Güncel durum başka tespite geçince derecesi (ve worksite'ı) değişebilir
+    instance._rollup_previous = None
+    if not raw and instance.pk is not None and not instance._state.adding:
+        instance._rollup_previous = CurrentDamageState.objects.filter(pk=instance.pk).values_list(
+            'worksite_id', 'overall_damage'
+        ).first()
+
+
+def remember_rollup_parent(sender, instance, raw=False, **kwargs):
+    # Üst kayıt değişirse (binanın saha tespiti, eserin binası / worksite'ı) sayaç eski worksite'tan taşınır
+    instance._rollup_parent = None
+    if not raw and instance.pk is not None and not instance._state.adding:
+        instance._rollup_parent = (stored_rollup_worksite_id(instance),)
+
+
+def move_building_dependents(building, old_worksite_id, new_worksite_id):
+    # Binaya bağlı eserler binanın worksite'ında sayılır; güncel hasar durumları worksite'ı yeniden okur
+    assets = MovableHeritage.objects.filter(building=building).count()
+    move_rollup_counts(old_worksite_id, new_worksite_id, {'assets_recorded': assets})
+    for hazard in CurrentDamageState.objects.filter(building=building).values_list('hazard_type', flat=True):
+        refresh_damage_state(building.pk, hazard)
+
+
+def update_rollups_on_save(sender, instance, created, raw=False, **kwargs):
+    previous = instance.__dict__.pop('_rollup_previous', None)
+    parent = instance.__dict__.pop('_rollup_parent', None)
+    if raw:
+        return
+    if created:
+        apply_rollup_delta(rollup_worksite_id(instance), rollup_contribution(instance))
+    elif previous is not None and previous != (instance.worksite_id, instance.overall_damage):
+        worksite_id, grade = previous
+        apply_rollup_delta(worksite_id, rollup_contribution(CurrentDamageState(overall_damage=grade)), sign=-1)
+        apply_rollup_delta(instance.worksite_id, rollup_contribution(instance))
+    elif parent is not None:
+        old_worksite_id, worksite_id = parent[0], rollup_worksite_id(instance)
+        if old_worksite_id != worksite_id:
+            move_rollup_counts(old_worksite_id, worksite_id, rollup_contribution(instance))
+            if sender is BuildingInventory:
+                move_building_dependents(instance, old_worksite_id, worksite_id)
+
+
+def remember_rollup_worksite(sender, instance, **kwargs):
+    # Bina cascade ile silinirken site_assessment satırı post_delete'te artık olmayabilir
+    instance._rollup_worksite = rollup_worksite_id(instance)
+    if sender is BuildingInventory:
+        # Eserler SET_NULL ile binasız kalır ve kendi worksite'larında sayılmaya başlar
+        instance._rollup_assets = list(MovableHeritage.objects.filter(building=instance).values_list('pk', flat=True))
+
+
+def update_rollups_on_delete(sender, instance, **kwargs):
+    worksite_id = instance.__dict__.pop('_rollup_worksite', None)
+    if sender is MovableHeritage and instance.building_id is not None:
+        # Binası aynı silmede önce gittiyse eser o sırada kendi worksite'ına taşındı (aşağıda)
+        if not BuildingInventory.objects.filter(pk=instance.building_id).exists():
+            worksite_id = instance.worksite_id
+    apply_rollup_delta(worksite_id, rollup_contribution(instance), sign=-1)
+    assets = instance.__dict__.pop('_rollup_assets', None)
+    if assets:
+        # Binasız kalan eserler kendi worksite'larına taşınır (aynı silmede sonra gidecekler de)
+        remaining = MovableHeritage.objects.filter(pk__in=assets).order_by().values_list('worksite_id').annotate(n=Count('pk'))
+        for asset_worksite_id, n in remaining:
+            move_rollup_counts(worksite_id, asset_worksite_id, {'assets_recorded': n})
+
+
+for model in ROLLUP_SOURCES:
+    post_save.connect(update_rollups_on_save, sender=model, dispatch_uid=f'rollup_save_{model.__name__}')
+    pre_delete.connect(remember_rollup_worksite, sender=model, dispatch_uid=f'rollup_pre_delete_{model.__name__}')
+    post_delete.connect(update_rollups_on_delete, sender=model, dispatch_uid=f'rollup_delete_{model.__name__}')
+    if model is not CurrentDamageState:
+        pre_save.connect(remember_rollup_parent, sender=model, dispatch_uid=f'rollup_pre_save_{model.__name__}')
+pre_save.connect(remember_rollup_grade, sender=CurrentDamageState, dispatch_uid='rollup_pre_save_state')
+
+
+def remember_worksite_sector(sender, instance, raw=False, **kwargs):
+    instance._rollup_sector = None
+    if not raw and instance.pk is not None and not instance._state.adding:
+        instance._rollup_sector = Worksite.objects.filter(pk=instance.pk).values_list('sector_id', flat=True).first()
+
+
+def update_worksite_rollup(sender, instance, created, raw=False, **kwargs):
+    old_sector_id = instance.__dict__.pop('_rollup_sector', None)
+    if raw:
+        return
+    if created:
+        WorksiteDamageRollup.objects.get_or_create(worksite=instance)
+    elif old_sector_id != instance.sector_id:
+        move_worksite_rollup(instance.pk, old_sector_id, instance.sector_id)
+
+
+def create_sector_rollup(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        SectorDamageRollup.objects.get_or_create(sector=instance)
+
+
+pre_save.connect(remember_worksite_sector, sender=Worksite, dispatch_uid='rollup_worksite_pre_save')
+post_save.connect(update_worksite_rollup, sender=Worksite, dispatch_uid='rollup_worksite_save')
+post_save.connect(create_sector_rollup, sender=Sector, dispatch_uid='rollup_sector_save')
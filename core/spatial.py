@@ -0,0 +1,169 @@
+# core/spatial.py
+"""
+Sektör poligonları için süreç içi mekânsal indeks.
+
+Sektör sınır kutuları (bbox) düzenli bir ızgaraya yerleştirilir; bir nokta
+sorgusunda sadece o hücredeki aday sektörler için kesin poligon içi testi
+(ray casting) yapılır. İndeks sadece sektörler değiştiğinde yeniden kurulur
+(SECTOR_VERSION_KEY, core/signals.py tarafından artırılır).
+"""
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from itertools import chain
+
+from .geometry import outer_rings
+from .map_data import get_data_version, bump_data_version
+from .models import Sector, Worksite
+from .rollups import move_worksite_rollups
+
+SECTOR_VERSION_KEY = 'core:sectors:version'
+
+# Izgara hücresi ~ ortalama sektör boyutu; çok küçük değerlere karşı alt sınır
+MIN_CELL_DEGREES = 0.001
+# Bundan çok hücreye yayılan sektör (örn. tüm il poligonu) ızgaraya yazılmaz,
+# her sorguda bbox ile ayrıca denenir: ızgara boyutu sektör sayısıyla orantılı kalır
+MAX_CELLS_PER_SECTOR = 64
+
+
+def point_in_ring(lng, lat, ring):
+    """Ray casting: nokta halkanın içinde mi?"""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > lat) != (yj > lat) and lng < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def point_in_geometry(lng, lat, geom):
+    """Polygon / MultiPolygon (delikler dahil) için kesin test."""
+    if geom['type'] == 'Polygon':
+        polygons = [geom['coordinates']]
+    elif geom['type'] == 'MultiPolygon':
+        polygons = geom['coordinates']
+    else:
+        return False
+    for rings in polygons:
+        if point_in_ring(lng, lat, rings[0]) and not any(point_in_ring(lng, lat, hole) for hole in rings[1:]):
+            return True
+    return False
+
+
+class SectorIndex:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = None
+        self.cell_size = 1.0
+        self.grid = defaultdict(list)
+        self.oversized = []  # ızgaraya sığmayan büyük sektörlerin id'leri
+        self.sectors = {}   # id -> (bbox, geometry, alan)
+        self.stats = Counter()
+
+    def _cell(self, lng, lat):
+        return int(math.floor(lng / self.cell_size)), int(math.floor(lat / self.cell_size))
+
+    def rebuild(self):
+        with self._lock:
+            version = get_data_version(SECTOR_VERSION_KEY)
+            rows = list(Sector.objects.filter(geometry__isnull=False).values_list(
+                'pk', 'geometry', 'min_lng', 'min_lat', 'max_lng', 'max_lat'
+            ))
+            rows = [r for r in rows if outer_rings(r[1])]
+
+            # Hücre boyu: sektör bbox kenarlarının medyanı
+            extents = sorted(max(r[4] - r[2], r[5] - r[3]) for r in rows)
+            self.cell_size = max(extents[len(extents) // 2], MIN_CELL_DEGREES) if extents else 1.0
+
+            self.grid = defaultdict(list)
+            self.oversized = []
+            self.sectors = {}
+            for pk, geom, min_lng, min_lat, max_lng, max_lat in rows:
+                self.sectors[pk] = ((min_lng, min_lat, max_lng, max_lat), geom, (max_lng - min_lng) * (max_lat - min_lat))
+                x0, y0 = self._cell(min_lng, min_lat)
+                x1, y1 = self._cell(max_lng, max_lat)
+                if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_CELLS_PER_SECTOR:
+                    self.oversized.append(pk)
+                    continue
+                for x in range(x0, x1 + 1):
+                    for y in range(y0, y1 + 1):
+                        self.grid[(x, y)].append(pk)
+            self.version = version
+            self.stats['rebuilds'] += 1
+
+    def ensure_current(self):
+        with self._lock:
+            if self.version is None or self.version != get_data_version(SECTOR_VERSION_KEY):
+                self.rebuild()
+
+    def sectors_at(self, lng, lat):
+        """Noktayı içeren sektör id'leri (küçük sektör önce: iç içe sektörlerde en özel olan)."""
+        self.ensure_current()
+        return self._sectors_at(lng, lat)
+
+    def _sectors_at(self, lng, lat):
+        # Versiyon kontrolü yok (bir sorgu): toplu kullanımda ensure_current() bir kez çağrılır
+        matches = []
+        for pk in chain(self.grid.get(self._cell(lng, lat), ()), self.oversized):
+            (min_lng, min_lat, max_lng, max_lat), geom, area = self.sectors[pk]
+            if min_lng <= lng <= max_lng and min_lat <= lat <= max_lat and point_in_geometry(lng, lat, geom):
+                matches.append((area, pk))
+        self.stats['lookups'] += 1
+        return [pk for _, pk in sorted(matches)]
+
+    def sector_at(self, lng, lat):
+        matches = self.sectors_at(lng, lat)
+        return matches[0] if matches else None
+
+
+sector_index = SectorIndex()
+
+
+def assign_sectors(worksites=None, overwrite=False, dry_run=False):
+    """
+    Worksite'ların noktasını (centroid) sektör poligonlarıyla karşılaştırır.
+
+    - Sektörü boş olanlara bulunan sektör atanır.
+    - overwrite=True ise yanlış sektördekiler de düzeltilir.
+    - dry_run=True ise hiçbir şey yazılmaz, sadece rapor döner.
+
+    Döner: {'checked', 'assigned', 'reassigned', 'mismatched', 'outside', 'seconds'}
+    """
+    started = time.perf_counter()
+    if worksites is None:
+        worksites = Worksite.objects.all()
+    rows = worksites.filter(geometry__isnull=False).values_list('pk', 'sector_id', 'centroid_lng', 'centroid_lat')
+
+    sector_index.ensure_current()
+    report = Counter()
+    moves = []  # (worksite id, eski sektör, yeni sektör)
+    for pk, sector_id, lng, lat in rows.iterator(chunk_size=2000):
+        report['checked'] += 1
+        matches = sector_index._sectors_at(lng, lat)
+        if not matches:
+            report['outside'] += 1
+            continue
+        if sector_id is None:
+            report['assigned'] += 1
+            moves.append((pk, sector_id, matches[0]))
+        elif sector_id not in matches:
+            report['mismatched'] += 1
+            if overwrite:
+                report['reassigned'] += 1
+                moves.append((pk, sector_id, matches[0]))
+
+    if moves and not dry_run:
+        to_update = [Worksite(pk=pk, sector_id=new_sector_id) for pk, _, new_sector_id in moves]
+        Worksite.objects.bulk_update(to_update, ['sector'], batch_size=1000)
+        # bulk_update sinyal göndermez: harita verisi ve sektör özetleri elle güncellenir
+        move_worksite_rollups(moves)
+        bump_data_version()
+
+    report = {key: report[key] for key in ('checked', 'assigned', 'reassigned', 'mismatched', 'outside')}
+    report['seconds'] = time.perf_counter() - started
+    return report
@@ -0,0 +1,239 @@
+# core/statistics.py
+"""
+Operasyon istatistikleri: ana sayfa, raporlama ekranı ve PDF kapağı KPI'ları
+tek bir OperationStatistics satırından okur (get_statistics()).
+
+Satır sayılarak değil, farklarla güncellenir: her kayıt / silme sinyali
+(core/signals.py) kaydın istatistiklere katkısını hesaplar, eski katkıyı
+çıkarıp yenisini ekler (apply_delta). Fark, kaydı yazan transaction içinde
+uygulanır; transaction geri alınırsa sayaçlar da geri alınır.
+
+bulk_create / bulk_update / queryset.update() sinyal göndermez. Bunlardan
+sonra rebuild_statistics() çağrılmalı ('rebuild_statistics' komutu da aynı işi yapar).
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import CharField, Count, F, Value
+
+from .models import (
+    OperationStatistics, Personnel, Country, ExpertiseType, JobTitle, Team, Sector, Worksite, Assignment,
+    SiteAssessment, BuildingInventory, DamageAssessment, MovableHeritage,
+)
+
+STATISTICS_PK = 1
+# Boş / tanımsız değerlerin JSON sayaçlarındaki anahtarı
+EMPTY_KEY = ''
+
+
+def counter_key(value):
+    return EMPTY_KEY if value in (None, '') else str(value)
+
+
+def _personnel_contribution(person):
+    return {'total_personnel': 1}, {
+        'sq_types': {counter_key(person.sq_number): 1},
+        'expertise': {counter_key(person.primary_expertise.code if person.primary_expertise_id else None): 1},
+        'countries': {counter_key(person.country.name if person.country_id else None): 1},
+    }
+
+
+# Bir kaydın istatistiklere katkısı: ({sayaç: n}, {json alanı: {anahtar: n}})
+CONTRIBUTIONS = {
+    SiteAssessment: lambda obj: ({'total_sites': 1}, {}),
+    BuildingInventory: lambda obj: ({'total_buildings': 1}, {}),
+    MovableHeritage: lambda obj: ({'total_assets': 1}, {}),
+    Sector: lambda obj: ({'total_sectors': 1}, {}),
+    Team: lambda obj: ({'total_teams': 1}, {}),
+    Worksite: lambda obj: ({'total_worksites': 1, 'completed_worksites': int(obj.status == 'COMPLETED')}, {}),
+    Assignment: lambda obj: ({'active_assignments': int(obj.status == 'ACTIVE')}, {}),
+    DamageAssessment: lambda obj: ({}, {'damage_grades': {obj.overall_damage: 1}}),
+    Personnel: _personnel_contribution,
+}
+
+# Düzenlenince katkısı değişebilen modeller: katkıyı belirleyen alanlar ve
+# eski kaydı okurken birlikte getirilecek ilişkiler
+MUTABLE_CONTRIBUTIONS = {
+    Worksite: (('status',), ()),
+    Assignment: (('status',), ()),
+    DamageAssessment: (('overall_damage',), ()),
+    Personnel: (('sq_number', 'country', 'primary_expertise'), ('country', 'primary_expertise')),
+}
+
+
+# Adı JSON sayacında anahtar olan sözlük modelleri: (ad alanı, sayaç, silinince taşınacağı anahtar).
+# Silinen ülke / uzmanlık personelde NULL olur ('' anahtarı); silinen unvanın bağlantıları da silinir.
+LOOKUP_COUNTERS = {
+    Country: ('name', 'countries', EMPTY_KEY),
+    ExpertiseType: ('code', 'expertise', EMPTY_KEY),
+    JobTitle: ('title', 'job_titles', None),
+}
+
+
+def contribution(instance):
+    return CONTRIBUTIONS[type(instance)](instance)
+
+
+def load_previous(instance, update_fields=None):
+    """
+    pre_save: kaydın veritabanındaki (eski) halini döndürür.
+    Katkısı sabit modellerde, yeni kayıtlarda ya da katkıyı etkilemeyen
+    update_fields ile kaydedilirken sorgu yapılmaz (None).
+    """
+    model = type(instance)
+    if model not in MUTABLE_CONTRIBUTIONS or instance._state.adding or instance.pk is None:
+        return None
+    fields, related = MUTABLE_CONTRIBUTIONS[model]
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return None
+    return model.objects.select_related(*related).filter(pk=instance.pk).first()
+
+
+def difference(new, old):
+    """İki katkı arasındaki fark (yeni - eski)."""
+    counts = Counter(new[0])
+    counts.subtract(old[0])
+    buckets = {}
+    for field in set(new[1]) | set(old[1]):
+        bucket = Counter(new[1].get(field, {}))
+        bucket.subtract(old[1].get(field, {}))
+        buckets[field] = bucket
+    return counts, buckets
+
+
+def negate(change):
+    return difference(({}, {}), change)
+
+
+def apply_delta(counts=None, buckets=None):
+    """
+    Farkları istatistik satırına uygular.
+    counts: {'total_sites': 1, ...}  buckets: {'damage_grades': {'SEVERE': 1, 'LIGHT': -1}, ...}
+    """
+    counts = {field: n for field, n in (counts or {}).items() if n}
+    buckets = {field: {key: n for key, n in bucket.items() if n} for field, bucket in (buckets or {}).items()}
+    buckets = {field: bucket for field, bucket in buckets.items() if bucket}
+    if not counts and not buckets:
+        return
+
+    with transaction.atomic():
+        stats = OperationStatistics.objects.select_for_update().filter(pk=STATISTICS_PK).first()
+        if stats is None:
+            # Satır henüz yok (ilk kurulum): sayarak oluştur, bu değişiklik zaten sayıma dahil
+            rebuild_statistics()
+            return
+        for field, n in counts.items():
+            setattr(stats, field, max(getattr(stats, field) + n, 0))
+        for field, bucket in buckets.items():
+            merged = dict(getattr(stats, field))
+            for key, n in bucket.items():
+                total = merged.get(key, 0) + n
+                if total > 0:
+                    merged[key] = total
+                else:
+                    merged.pop(key, None)
+            setattr(stats, field, merged)
+        stats.save(update_fields=[*counts, *buckets, 'updated_at'])
+
+
+def move_counter_key(field, old_key, new_key=None):
+    """
+    JSON sayacındaki bir anahtarın sayısını başka anahtara taşır (new_key=None ise siler).
+    Ülke / uzmanlık / unvan adı değişince veya sözlük kaydı silinince kullanılır.
+    """
+    with transaction.atomic():
+        stats = OperationStatistics.objects.select_for_update().filter(pk=STATISTICS_PK).first()
+        if stats is None:
+            rebuild_statistics()
+            return
+        merged = dict(getattr(stats, field))
+        total = merged.pop(old_key, 0)
+        if not total:
+            return
+        if new_key is not None:
+            merged[new_key] = merged.get(new_key, 0) + total
+        setattr(stats, field, merged)
+        stats.save(update_fields=[field, 'updated_at'])
+
+
+# Sıfırdan sayımda tek UNION ALL sorgusunda birleşen parçalar: (sayaç, queryset, gruplama alanı).
+# Durum alanına göre gruplanan tablolar hem toplamı hem durum sayısını tek taramada verir.
+COUNT_PARTS = (
+    ('sites', SiteAssessment.objects.all(), None),
+    ('buildings', BuildingInventory.objects.all(), None),
+    ('assets', MovableHeritage.objects.all(), None),
+    ('sectors', Sector.objects.all(), None),
+    ('teams', Team.objects.all(), None),
+    ('worksites', Worksite.objects.all(), 'status'),
+    ('assignments', Assignment.objects.all(), 'status'),
+    ('damage_grades', DamageAssessment.objects.all(), 'overall_damage'),
+    ('job_titles', Personnel.job_titles.through.objects.all(), 'jobtitle__title'),
+)
+
+
+def _count_part(name, queryset, field):
+    # Varsayılan sıralama (Meta.ordering) birleşik sorguda kullanılamaz
+    queryset = queryset.order_by()
+    label = Value(name, output_field=CharField())
+    if field is None:
+        return queryset.values(counter=label).annotate(
+            key=Value(EMPTY_KEY, output_field=CharField()), total=Count('pk')
+        ).values_list('counter', 'key', 'total')
+    return queryset.values(key=F(field)).annotate(counter=label, total=Count('pk')).values_list('counter', 'key', 'total')
+
+
+def count_tables():
+    """COUNT_PARTS'ı tek sorguda sayar: {sayaç: {anahtar: sayı}} (gruplanmayanlar '' anahtarında)."""
+    parts = [_count_part(*part) for part in COUNT_PARTS]
+    counters = defaultdict(Counter)
+    for name, key, total in parts[0].union(*parts[1:], all=True):
+        counters[name][counter_key(key)] += total
+    return counters
+
+
+def count_personnel():
+    """
+    Personel toplamı ve SQ tipi / uzmanlık / ülke dağılımı tek sorguda:
+    (toplam, sq_types, expertise, countries).
+
+    Üç alanın birlikte gruplanmış hali okunur ve dağılımlar Python'da toplanır;
+    kombinasyon sayısı (SQ tipi x uzmanlık x ülke) personel sayısından çok küçüktür.
+    """
+    sq_types, expertise, countries = Counter(), Counter(), Counter()
+    rows = Personnel.objects.order_by().values_list(
+        'sq_number', 'primary_expertise__code', 'country__name'
+    ).annotate(total=Count('pk'))
+    for sq, code, country, n in rows:
+        sq_types[counter_key(sq)] += n
+        expertise[counter_key(code)] += n
+        countries[counter_key(country)] += n
+    return sum(sq_types.values()), dict(sq_types), dict(expertise), dict(countries)
+
+
+def rebuild_statistics():
+    """İstatistik satırını tablolardan sıfırdan sayarak yeniden yazar (iki okuma sorgusu)."""
+    counts = count_tables()
+    total_personnel, sq_types, expertise, countries = count_personnel()
+    values = {
+        'total_sites': counts['sites'][EMPTY_KEY],
+        'total_buildings': counts['buildings'][EMPTY_KEY],
+        'total_assets': counts['assets'][EMPTY_KEY],
+        'total_worksites': sum(counts['worksites'].values()),
+        'completed_worksites': counts['worksites']['COMPLETED'],
+        'total_sectors': counts['sectors'][EMPTY_KEY],
+        'total_teams': counts['teams'][EMPTY_KEY],
+        'total_personnel': total_personnel,
+        'active_assignments': counts['assignments']['ACTIVE'],
+        'damage_grades': dict(counts['damage_grades']),
+        'sq_types': sq_types,
+        'expertise': expertise,
+        'countries': countries,
+        'job_titles': dict(counts['job_titles']),
+    }
+    stats, _ = OperationStatistics.objects.update_or_create(pk=STATISTICS_PK, defaults=values)
+    return stats
+
+
+def get_statistics():
+    """KPI'ların okunduğu tek satır; yoksa sayılarak oluşturulur."""
+    return OperationStatistics.objects.filter(pk=STATISTICS_PK).first() or rebuild_statistics()
@@ -1,3 +1,1506 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command, CommandError
+from django.db import connection, transaction, DatabaseError
+from django.forms.models import model_to_dict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from pypdf import PdfReader
+try:
+    import numpy
+except ImportError:  # isteğe bağlı (core/analytics.py)
+    numpy = None
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # isteğe bağlı (core/columnar.py)
+    pq = None
+from django.utils import dateformat, timezone
+
+from . import columnar, exports
+from .damage import annotate_worst_damage, damage_display
+from .clustering import WorksiteClusterIndex, worksite_clusters
+from .forms import WorksiteForm
+from .geometry import parse_geometry, douglas_peucker, iter_positions
+from .spatial import sector_index, assign_sectors
+from .personnel_import import PersonnelImporter
+from .provisioning import provision_users
+from .analytics import build_matrix_analytics, cell_levels, get_matrix_analytics
+from .damage_state import critical_building_count, current_critical_states, rebuild_damage_states
+from .rollups import ROLLUP_FIELDS, rebuild_rollups
+from .query_plans import HOT_QUERIES, check_query_plans, full_scans
+from .seeding import OPERATION_DAYS, OPERATION_START, OperationSeeder
+from .benchmarks import BENCHMARK_VIEWS, compare, run_benchmarks, scaling_exponent
+from .priority import PRIORITY_WEIGHTS, priority_score, recompute_priorities, top_priority_buildings
+from .statistics import get_statistics, rebuild_statistics, count_tables, count_personnel
+from .reports import (
+    report_data_hash, enqueue_report, process_next_job, build_sections, render_sections, render_report, write_cached_report,
+    STALE_JOB_AFTER, STALE_JOB_MESSAGE,
+)
+from .models import (
+    Team, Sector, Worksite, Assignment, SiteAssessment, BuildingInventory, DamageAssessment,
+    Personnel, Institution, JobTitle, ImportCheckpoint, ReportJob, MovableHeritage, MovableTracking, IntangibleHeritage,
+    Country, ExpertiseType, OperationStatistics, CurrentDamageState, WorksiteDamageRollup, SectorDamageRollup,
+)
+from .map_data import (
+    bump_data_version, get_data_version, damage_worksite_rows, sector_shapes, build_operational_map_data, get_operational_map_data, cache_stats, reset_cache_stats
+)
+
+
+def point(lng, lat):
+    return json.dumps({"type": "Point", "coordinates": [lng, lat]})
+
+
+class OperationFixtureMixin:
+    """Testler için küçük bir operasyon (sektör, worksite, takım, bina) kurar."""
+
+    def make_worksite(self, name, sector=None, location_data=None):
+        return Worksite.objects.create(name=name, sector=sector, location_data=location_data or point(29.06, 40.18))
+
+    def make_assignment(self, team, worksite, **kwargs):
+        return Assignment.objects.create(team=team, worksite=worksite, **kwargs)
+
+    def make_building(self, assignment, code='B1'):
+        site = SiteAssessment.objects.create(
+            assignment=assignment, worksite=assignment.worksite, editor_name='tester', site_type='COMPLEX'
+        )
+        return BuildingInventory.objects.create(
+            assignment=assignment, worksite=assignment.worksite, site_assessment=site,
+            editor_name='tester', building_code=code, building_name=f"Building {code}"
+        )
+
+    def make_damage(self, assignment, building, grade, hazard='SEISMIC'):
+        return DamageAssessment.objects.create(
+            assignment=assignment, worksite=assignment.worksite, building=building,
+            editor_name='tester', hazard_type=hazard, overall_damage=grade
+        )
+
+
+class WorstDamageEngineTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.sector = Sector.objects.create(name='S1')
+        self.alpha = Team.objects.create(name='Alpha')
+        self.bravo = Team.objects.create(name='Bravo')
+
+    def test_worst_grade_and_latest_reporting_team(self):
+        ws = self.make_worksite('W1', self.sector)
+        a1 = self.make_assignment(self.alpha, ws)
+        a2 = self.make_assignment(self.bravo, ws)
+        b1, b2 = self.make_building(a1, 'B1'), self.make_building(a2, 'B2')
+        self.make_damage(a1, b1, 'MODERATE')
+        self.make_damage(a1, b1, 'SEVERE')
+        self.make_damage(a2, b2, 'SEVERE')
+        self.make_damage(a1, b1, 'LIGHT', hazard='FIRE')
+
+        w = annotate_worst_damage(Worksite.objects.filter(pk=ws.pk)).get()
+        self.assertEqual(w.worst_damage, 'SEVERE')
+        self.assertEqual(w.worst_damage_team, 'Bravo')
+        self.assertEqual(damage_display(w.worst_damage), ('#e74a3b', "Critical (Severe)"))
+
+        # Yeniden değerlendirme eski dereceyi geçersiz kılar (sadece güncel durum sayılır)
+        self.make_damage(a2, b2, 'LIGHT')
+        w = annotate_worst_damage(Worksite.objects.filter(pk=ws.pk)).get()
+        self.assertEqual((w.worst_damage, w.worst_damage_team), ('SEVERE', 'Alpha'))
+
+    def test_unassessed_worksite(self):
+        ws = self.make_worksite('W1')
+        w = annotate_worst_damage(Worksite.objects.filter(pk=ws.pk)).get()
+        self.assertIsNone(w.worst_damage)
+        self.assertEqual(damage_display(w.worst_damage), ('#858796', "Not Assessed"))
+
+    def test_damage_rows_query_count_is_constant(self):
+        for i in range(5):
+            ws = self.make_worksite(f"W{i}", self.sector)
+            a = self.make_assignment(self.alpha, ws)
+            self.make_damage(a, self.make_building(a), 'COLLAPSED' if i % 2 else 'NONE')
+
+        with self.assertNumQueries(1):
+            rows = damage_worksite_rows(Worksite.objects.filter(geometry__isnull=False))
+
+        statuses = sorted(w['damage_status'] for w in rows)
+        self.assertEqual(statuses, ["Critical (Collapsed)"] * 2 + ["No Damage"] * 3)
+        self.assertEqual({w['reporting_team'] for w in rows}, {'Alpha'})
+
+
+class OperationalMapDataTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.sector = Sector.objects.create(name='S1', location_data=json.dumps(
+            {"type": "Polygon", "coordinates": [[[29.0, 40.1], [29.2, 40.1], [29.2, 40.3], [29.0, 40.1]]]}
+        ))
+        self.teams = [Team.objects.create(name=f"Team {i}") for i in range(3)]
+
+    def build_worksites(self, count):
+        for i in range(count):
+            ws = self.make_worksite(f"WS {Worksite.objects.count()}", self.sector)
+            for team in self.teams:
+                self.make_assignment(team, ws, status='COMPLETED', end_time=timezone.now())
+            self.make_assignment(self.teams[i % 3], ws)
+
+    def test_query_count_does_not_grow_with_worksites(self):
+        self.build_worksites(2)
+        with self.assertNumQueries(4):
+            build_operational_map_data()
+
+        self.build_worksites(10)
+        with self.assertNumQueries(4):
+            data = build_operational_map_data()
+
+        self.assertEqual(len(data['worksites']), 12)
+        for w in data['worksites']:
+            self.assertEqual(w['status_text'], "ONGOING (Team Assigned)")
+            self.assertEqual(len(w['active_teams']), 1)
+            self.assertEqual(len(w['history_teams']), 3)
+
+    def test_status_colours(self):
+        idle = self.make_worksite('Idle', self.sector)
+        done = self.make_worksite('Done', self.sector)
+        done.status = 'COMPLETED'
+        done.save()
+
+        colours = {w['name']: w['map_color'] for w in build_operational_map_data()['worksites']}
+        self.assertEqual(colours[idle.name], '#858796')
+        self.assertEqual(colours[done.name], '#1cc88a')
+
+
+class MapDataCacheTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team = Team.objects.create(name='Alpha')
+            self.worksite = self.make_worksite('W1')
+        reset_cache_stats()
+
+    def test_cached_until_relevant_write(self):
+        first = get_operational_map_data()
+        with self.assertNumQueries(1):  # Sadece versiyon okunur
+            second = get_operational_map_data()
+        self.assertIs(first, second)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_assignment(self.team, self.worksite)
+        third = get_operational_map_data()
+        self.assertEqual(third['worksites'][0]['status_text'], "ONGOING (Team Assigned)")
+
+        stats = cache_stats()
+        self.assertEqual(stats['operational.hits'], 1)
+        self.assertEqual(stats['operational.misses'], 2)
+
+    def test_write_from_another_process_is_seen(self):
+        first = get_operational_map_data()
+        # Başka bir süreç (ör. yönetim komutu): kendi süreç içi önbelleği var, veritabanı ortak
+        with mock.patch('core.map_data.cache', LocMemCache('other-process', {})):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.make_assignment(self.team, self.worksite)
+        second = get_operational_map_data()
+        self.assertIsNot(first, second)
+        self.assertEqual(second['worksites'][0]['status_text'], "ONGOING (Team Assigned)")
+
+
+class GeometryStorageTests(TestCase):
+
+    SQUARE = {"type": "Polygon", "coordinates": [[[29.0, 40.0], [29.2, 40.0], [29.2, 40.2], [29.0, 40.2], [29.0, 40.0]]]}
+
+    def test_geometry_parsed_once_at_save(self):
+        sector = Sector.objects.create(name='S1', location_data=json.dumps(self.SQUARE))
+        sector.refresh_from_db()
+        self.assertEqual(sector.geometry, self.SQUARE)
+        self.assertEqual((sector.min_lng, sector.min_lat, sector.max_lng, sector.max_lat), (29.0, 40.0, 29.2, 40.2))
+        self.assertAlmostEqual(sector.centroid_lng, 29.1)
+        self.assertAlmostEqual(sector.centroid_lat, 40.1)
+        self.assertEqual(sector.vertex_count, 5)
+
+    def test_bbox_filter(self):
+        inside = Worksite.objects.create(name='In', location_data=point(29.1, 40.1))
+        Worksite.objects.create(name='Out', location_data=point(31.0, 41.0))
+        Worksite.objects.create(name='Empty')
+        self.assertEqual(list(Worksite.in_bbox(29.0, 40.0, 29.5, 40.5)), [inside])
+
+    def test_invalid_geometry_rejected(self):
+        for raw in ['not json', '{"type": "Circle"}', point(200, 40), '{"type": "Polygon", "coordinates": [[[1, 2]]]}']:
+            with self.assertRaises(ValidationError):
+                parse_geometry(raw)
+        with self.assertRaises(ValidationError) as ctx:
+            Worksite(name='Bad', location_data='{"type": "Point"}').full_clean()
+        self.assertIn('location_data', ctx.exception.message_dict)
+
+    def test_malformed_legacy_row_has_no_geometry(self):
+        ws = Worksite.objects.create(name='Legacy', location_data='{broken')
+        self.assertIsNone(ws.geometry)
+        self.assertEqual(ws.vertex_count, 0)
+
+
+class MapFeaturesApiTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.url = reverse('map_features_api')
+        self.sector = Sector.objects.create(name='Big', color='#ff0000', location_data=json.dumps(
+            {"type": "Polygon", "coordinates": [[[29.0, 40.0], [29.5, 40.0], [29.5, 40.5], [29.0, 40.0]]]}
+        ))
+        self.tiny = Sector.objects.create(name='Tiny', location_data=json.dumps(
+            {"type": "Polygon", "coordinates": [[[29.1, 40.1], [29.1001, 40.1], [29.1001, 40.1001], [29.1, 40.1]]]}
+        ))
+        self.inside = [self.make_worksite(f"In {i}", self.sector, point(29.1 + i / 100, 40.2)) for i in range(3)]
+        self.make_worksite('Far', None, point(35.0, 38.0))
+
+    def get(self, **params):
+        params.setdefault('bbox', '28.9,39.9,29.6,40.6')
+        return self.client.get(self.url, params)
+
+    def test_returns_features_in_bbox(self):
+        data = self.get().json()
+        self.assertEqual(data['type'], 'FeatureCollection')
+        ids = {f['id'] for f in data['features']}
+        self.assertEqual(ids, {f'sector-{self.sector.pk}', f'sector-{self.tiny.pk}'} | {f'worksite-{w.pk}' for w in self.inside})
+        worksite = next(f for f in data['features'] if f['properties']['layer'] == 'worksite')
+        self.assertEqual(worksite['properties']['damage_status'], "Not Assessed")
+        self.assertEqual(worksite['geometry']['type'], 'Point')
+
+    def test_zoom_drops_sub_pixel_polygons(self):
+        ids = {f['id'] for f in self.get(zoom=8, cluster=0).json()['features']}
+        self.assertNotIn(f'sector-{self.tiny.pk}', ids)
+        self.assertIn(f'sector-{self.sector.pk}', ids)
+        self.assertTrue(all(f'worksite-{w.pk}' in ids for w in self.inside))
+
+    def test_paging(self):
+        first = self.get(layers='worksites', page_size=2).json()
+        self.assertEqual(len(first['features']), 2)
+        self.assertEqual(first['next_page'], 2)
+        second = self.get(layers='worksites', page_size=2, page=2).json()
+        self.assertEqual(len(second['features']), 1)
+        self.assertIsNone(second['next_page'])
+
+    def test_operations_view(self):
+        props = self.get(layers='worksites', view='operations').json()['features'][0]['properties']
+        self.assertEqual(props['status_text'], "NOT ASSIGNED")
+        self.assertEqual(props['active_teams'], [])
+
+    def test_conditional_get(self):
+        response = self.get()
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, {'bbox': '28.9,39.9,29.6,40.6'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_bad_request(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.get(bbox='1,2,3').status_code, 400)
+        self.assertEqual(self.get(view='nope').status_code, 400)
+
+    def test_map_pages_share_viewport_script(self):
+        for name in ('home', 'worksite_list', 'sector_list'):
+            with self.subTest(page=name):
+                content = self.client.get(reverse(name)).content.decode()
+                self.assertIn('js/viewport_map.js', content)
+                self.assertNotIn('function drawCluster', content)
+
+
+class WorksiteClusterTests(OperationFixtureMixin, TestCase):
+
+    BBOX = (28.0, 37.0, 36.0, 41.0)
+
+    def setUp(self):
+        self.team = Team.objects.create(name='Alpha')
+        self.near = [self.make_worksite(f"Near {i}", None, point(29.0 + i / 100, 40.0)) for i in range(3)]
+        self.lonely = self.make_worksite('Lonely', None, point(35.0, 38.0))
+        self.index = WorksiteClusterIndex()
+
+    def test_points_grouped_with_counts(self):
+        clusters, singles = self.index.clusters(self.BBOX, 5)
+        self.assertEqual(singles, [self.lonely.pk])
+        self.assertEqual(len(clusters), 1)
+        props = clusters[0]['properties']
+        self.assertEqual(props['count'], 3)
+        self.assertEqual(props['damage'], {'#858796': 3})
+        self.assertEqual(props['status'], {'NOT_ASSIGNED': 3})
+
+        # En yüksek zoom'da her nokta ayrı hücrede
+        clusters, singles = self.index.clusters(self.BBOX, 15)
+        self.assertEqual(clusters, [])
+        self.assertEqual(len(singles), 4)
+
+    def test_incremental_update(self):
+        self.index.rebuild()
+        self.make_assignment(self.team, self.near[0])
+        self.index.apply_change(bump_data_version(), [self.near[0].pk])
+
+        with self.assertNumQueries(1):  # Sadece versiyon okunur, yeniden kurulum yok
+            clusters, _ = self.index.clusters(self.BBOX, 5)
+        self.assertEqual(clusters[0]['properties']['status'], {'NOT_ASSIGNED': 2, 'ONGOING': 1})
+        self.assertEqual(self.index.stats['rebuilds'], 1)
+        self.assertEqual(self.index.stats['incremental_updates'], 1)
+
+    def test_moved_records_refresh_old_and_new_worksite(self):
+        first, second = self.near[0], self.lonely
+        assignment = self.make_assignment(self.team, first)
+        damage = self.make_damage(assignment, self.make_building(assignment, 'A1'), 'COLLAPSED')
+        target = self.make_building(self.make_assignment(self.team, second, status='COMPLETED'), 'B1')
+        worksite_clusters.rebuild()
+        rebuilds = worksite_clusters.stats['rebuilds']
+        self.assertEqual(worksite_clusters.points[first.pk]['status'], 'ONGOING')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment.worksite = second
+            assignment.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            damage.worksite, damage.building = second, target
+            damage.save()
+
+        points = worksite_clusters.points
+        self.assertEqual((points[first.pk]['status'], points[second.pk]['status']), ('NOT_ASSIGNED', 'ONGOING'))
+        self.assertEqual(points[first.pk]['damage_color'], damage_display(None)[0])
+        self.assertEqual(points[second.pk]['damage_color'], damage_display('COLLAPSED')[0])
+        self.assertEqual(worksite_clusters.stats['rebuilds'], rebuilds)
+        fresh = WorksiteClusterIndex()
+        fresh.rebuild()
+        self.assertEqual(points, fresh.points)
+
+    def test_missed_change_triggers_rebuild(self):
+        self.index.rebuild()
+        bump_data_version()  # Başka bir süreçteki yazma
+        self.index.clusters(self.BBOX, 5)
+        self.assertEqual(self.index.stats['rebuilds'], 2)
+
+    def test_api_returns_clusters_at_low_zoom(self):
+        features = self.client.get(reverse('map_features_api'), {
+            'bbox': ','.join(map(str, self.BBOX)), 'zoom': 5, 'layers': 'worksites'
+        }).json()['features']
+        layers = sorted(f['properties']['layer'] for f in features)
+        self.assertEqual(layers, ['cluster', 'worksite'])
+
+
+class SectorSimplificationTests(TestCase):
+
+    def circle(self, vertices, radius=0.05):
+        import math
+        ring = [[round(29.0 + radius * math.cos(2 * math.pi * i / vertices), 7),
+                 round(40.0 + radius * math.sin(2 * math.pi * i / vertices), 7)] for i in range(vertices)]
+        return {"type": "Polygon", "coordinates": [ring + [ring[0]]]}
+
+    def test_douglas_peucker_keeps_corners(self):
+        line = [[0, 0], [1, 0.001], [2, 0], [3, 5], [4, 0]]
+        self.assertEqual(douglas_peucker(line, 0.01), [[0, 0], [2, 0], [3, 5], [4, 0]])
+
+    def test_levels_precomputed_on_save(self):
+        sector = Sector.objects.create(name='Round', location_data=json.dumps(self.circle(2000)))
+        counts = {key: len(list(iter_positions(g))) for key, g in sector.geometry_levels.items()}
+        self.assertEqual(sorted(counts), ['z12', 'z15', 'z6', 'z9'])
+        self.assertLess(counts['z6'], counts['z9'])
+        self.assertLess(counts['z9'], counts['z12'])
+        self.assertLess(counts['z15'], 2001)
+        ring = sector.geometry_levels['z6']['coordinates'][0]
+        self.assertEqual(ring[0], ring[-1])
+        self.assertTrue(all(len(str(v).split('.')[-1]) <= 3 for p in ring for v in p))
+
+    def test_zoom_level_served(self):
+        sector = Sector.objects.create(name='Round', location_data=json.dumps(self.circle(2000)))
+        low = sector_shapes(zoom=6)[0]['geometry']
+        self.assertEqual(low, sector.geometry_levels['z6'])
+        self.assertEqual(sector_shapes(zoom=18)[0]['geometry'], sector.geometry)
+
+        feature = self.client.get(reverse('map_features_api'), {
+            'bbox': '28,39,30,41', 'zoom': 8, 'layers': 'sectors'
+        }).json()['features'][0]
+        self.assertEqual(feature['geometry'], sector.geometry_levels['z9'])
+
+
+class SectorIndexTests(OperationFixtureMixin, TestCase):
+
+    def square(self, x0, y0, size, hole=None):
+        ring = [[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]]
+        return json.dumps({"type": "Polygon", "coordinates": [ring] + ([hole] if hole else [])})
+
+    def setUp(self):
+        hole = [[29.4, 40.4], [29.6, 40.4], [29.6, 40.6], [29.4, 40.6], [29.4, 40.4]]
+        self.big = Sector.objects.create(name='Big', location_data=self.square(29.0, 40.0, 1.0, hole))
+        self.small = Sector.objects.create(name='Small', location_data=self.square(29.1, 40.1, 0.1))
+        self.other = Sector.objects.create(name='Other', location_data=self.square(31.0, 40.0, 1.0))
+        sector_index.rebuild()
+
+    def test_point_in_polygon(self):
+        self.assertEqual(sector_index.sectors_at(29.15, 40.15), [self.small.pk, self.big.pk])
+        self.assertEqual(sector_index.sector_at(29.8, 40.8), self.big.pk)
+        self.assertIsNone(sector_index.sector_at(29.5, 40.5))  # delik
+        self.assertIsNone(sector_index.sector_at(30.5, 40.5))  # sektörler arası boşluk
+        self.assertEqual(sector_index.sector_at(31.5, 40.5), self.other.pk)
+
+    def test_assign_and_verify(self):
+        empty = self.make_worksite('Empty', location_data=point(29.8, 40.8))
+        wrong = self.make_worksite('Wrong', sector=self.other, location_data=point(29.15, 40.15))
+        outside = self.make_worksite('Outside', location_data=point(35.0, 35.0))
+
+        report = assign_sectors(dry_run=True)
+        self.assertEqual((report['checked'], report['assigned'], report['mismatched'], report['outside']), (3, 1, 1, 1))
+        empty.refresh_from_db()
+        self.assertIsNone(empty.sector_id)
+
+        # Sektör versiyonu + okuma + bulk_update + taşınan worksite'ların özet satırları
+        # (hepsi boş: sektör güncellemesi yok) + harita versiyonunun artırılması (savepoint, update, okuma)
+        get_data_version()
+        with self.assertNumQueries(8):
+            assign_sectors(overwrite=True)
+        empty.refresh_from_db()
+        wrong.refresh_from_db()
+        outside.refresh_from_db()
+        self.assertEqual((empty.sector_id, wrong.sector_id, outside.sector_id), (self.big.pk, self.small.pk, None))
+
+    def test_rebuilt_only_when_sectors_change(self):
+        rebuilds = sector_index.stats['rebuilds']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_worksite('W', location_data=point(29.8, 40.8))
+        sector_index.sector_at(29.8, 40.8)
+        self.assertEqual(sector_index.stats['rebuilds'], rebuilds)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            moved = Sector.objects.create(name='New', location_data=self.square(33.0, 40.0, 1.0))
+        self.assertEqual(sector_index.sector_at(33.5, 40.5), moved.pk)
+        self.assertEqual(sector_index.stats['rebuilds'], rebuilds + 1)
+
+    def test_large_sector_does_not_flood_grid(self):
+        # Çok sayıda küçük sektör arasında tüm bölgeyi kapsayan bir "il" poligonu
+        for i in range(30):
+            Sector.objects.create(name=f'Tiny {i}', location_data=self.square(29.0 + i * 0.01, 40.0, 0.005))
+        province = Sector.objects.create(name='Province', location_data=self.square(20.0, 30.0, 20.0))
+        sector_index.rebuild()
+
+        # Hücre ~ küçük sektör boyu: il (ve 1° / 0.1° sektörler) ızgara yerine ayrı listede
+        self.assertEqual(set(sector_index.oversized), {self.big.pk, self.small.pk, self.other.pk, province.pk})
+        self.assertLessEqual(sum(map(len, sector_index.grid.values())), 4 * 30)
+        tiny = Sector.objects.get(name='Tiny 3')
+        self.assertEqual(sector_index.sectors_at(29.032, 40.002), [tiny.pk, self.big.pk, province.pk])
+        self.assertEqual(sector_index.sector_at(25.0, 35.0), province.pk)
+
+    def test_form_assigns_sector_from_location(self):
+        form = WorksiteForm(data={'name': 'F', 'location_data': point(29.8, 40.8), 'status': 'OPEN'})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save().sector, self.big)
+
+
+class ImportPersonnelTests(TestCase):
+
+    HEADER = "NAME;E-MAIL;MALE/FEMALE;SQ;COUNTRY;INSTITUTION;EXPERTISE;JOB TITLE;MOBILE"
+
+    def write_csv(self, lines):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+        handle.write("\n".join([self.HEADER] + lines) + "\n")
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+    def rows(self, count, start=0):
+        return [f"Person Number{i};p{i}@example.org;F;BUILDING;TURKEY;Inst {i % 3};CH;Architect;555"
+                for i in range(start, start + count)]
+
+    def test_bulk_import_creates_and_updates(self):
+        Personnel.objects.create(first_name='Old', last_name='Name', gender='M', email='p0@example.org')
+        path = self.write_csv(self.rows(5) + ["No Mail;;M;;;;;;", ";x@example.org;M;;;;;;"])
+        out = StringIO()
+        call_command('import_personnel', path, stdout=out)
+
+        self.assertEqual(Personnel.objects.count(), 5)
+        person = Personnel.objects.get(email='p0@example.org')
+        self.assertEqual((person.first_name, person.last_name, person.country.name), ('Person', 'Number0', 'Türkiye'))
+        self.assertEqual(list(person.job_titles.values_list('title', flat=True)), ['Architect'])
+        self.assertEqual(Institution.objects.count(), 3)
+        self.assertIn('4 yeni personel', out.getvalue())
+        self.assertIn('1 mevcut personel', out.getvalue())
+        self.assertIn('Satır 7 atlandı', out.getvalue())
+
+        # Tekrar çalıştırmak bağlantıları çoğaltmaz
+        call_command('import_personnel', path, stdout=StringIO())
+        self.assertEqual(Personnel.job_titles.through.objects.count(), 5)
+
+    def test_query_count_does_not_grow_per_row(self):
+        def import_queries(count, start):
+            path = self.write_csv(self.rows(count, start))
+            with CaptureQueriesContext(connection) as ctx:
+                call_command('import_personnel', path, stdout=StringIO())
+            return len(ctx.captured_queries)
+
+        import_queries(3, 0)  # sözlük kayıtları oluşsun
+        small = import_queries(10, 100)
+        self.assertEqual(small, import_queries(20, 200))
+        # Satır başına sorgu yok: 400 satır sadece SQLite parametre sınırı kadar parçaya bölünür
+        self.assertLess(import_queries(400, 1000), small + 15)
+
+    def test_dry_run_writes_nothing(self):
+        path = self.write_csv(self.rows(3))
+        out = StringIO()
+        call_command('import_personnel', path, '--dry-run', stdout=out)
+        self.assertEqual(Personnel.objects.count(), 0)
+        self.assertEqual(JobTitle.objects.count(), 0)
+        self.assertIn('3 yeni personel', out.getvalue())
+
+    def test_resume_after_failed_chunk(self):
+        path = self.write_csv(self.rows(6))
+        original = PersonnelImporter._write
+        calls = []
+
+        def failing_write(importer, parsed):
+            calls.append(len(parsed))
+            if len(calls) == 3:
+                raise DatabaseError("disk full")
+            return original(importer, parsed)
+
+        with mock.patch.object(PersonnelImporter, '_write', failing_write):
+            with self.assertRaises(CommandError):
+                call_command('import_personnel', path, '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(Personnel.objects.count(), 4)
+        self.assertEqual(ImportCheckpoint.objects.get().rows_done, 4)
+
+        out = StringIO()
+        call_command('import_personnel', path, '--batch-size', '2', '--resume', stdout=out)
+        self.assertIn('ilk 4 satır atlanıyor', out.getvalue())
+        self.assertIn('2 yeni personel', out.getvalue())
+        self.assertEqual(Personnel.objects.count(), 6)
+        self.assertTrue(ImportCheckpoint.objects.get().completed)
+
+        out = StringIO()
+        call_command('import_personnel', path, '--resume', stdout=out)
+        self.assertIn('Yapılacak iş yok', out.getvalue())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisionUsersTests(TestCase):
+
+    def setUp(self):
+        for i in range(5):
+            Personnel.objects.create(first_name=f'P{i}', last_name='Expert', gender='F', email=f'p{i}@example.org')
+        User.objects.create_user(username='p4@example.org', password='x')
+
+    def test_bulk_provisioning_writes_credentials(self):
+        out = StringIO()
+        # Oku (2) + parça başına savepoint, insert, id'ler, update (5)
+        with self.assertNumQueries(7):
+            report = provision_users(out, workers=2, batch_size=10)
+        self.assertEqual((report['created'], report['skipped_existing']), (4, 1))
+
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 4)
+        for row in rows:
+            person = Personnel.objects.select_related('user').get(pk=row['personnel_id'])
+            self.assertEqual(person.user.username, row['username'])
+            self.assertTrue(person.user.check_password(row['password']))
+        self.assertIsNone(Personnel.objects.get(email='p4@example.org').user)
+
+    def test_command_refuses_to_overwrite_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'creds.csv')
+            call_command('provision_users', '--output', path, '--workers', '1', stdout=StringIO())
+            self.assertEqual(oct(os.stat(path).st_mode & 0o777), '0o600')
+            self.assertEqual(Personnel.objects.filter(user__isnull=False).count(), 4)
+            Personnel.objects.create(first_name='New', last_name='One', gender='M', email='new@example.org')
+            with self.assertRaises(CommandError):
+                call_command('provision_users', '--output', path, stdout=StringIO())
+
+
+class MissionReportJobTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(REPORT_CACHE_DIR=self.tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(username='chief', password='x', first_name='Mission', last_name='Chief')
+        self.client.force_login(self.user)
+        team = Team.objects.create(name='Alpha')
+        self.assignment = self.make_assignment(team, self.make_worksite('W1'))
+        self.make_damage(self.assignment, self.make_building(self.assignment), 'SEVERE')
+
+    def test_job_lifecycle_and_cached_download(self):
+        response = self.client.get(reverse('download_mission_report'))
+        job = ReportJob.objects.get()
+        self.assertRedirects(response, reverse('report_job_status', args=[job.pk]))
+        self.assertEqual(job.generated_by, 'Mission Chief')
+
+        # İkinci istek yeni iş açmaz
+        self.client.get(reverse('download_mission_report'))
+        self.assertEqual(ReportJob.objects.count(), 1)
+        status = self.client.get(reverse('report_job_api', args=[job.pk])).json()
+        self.assertEqual((status['status'], status['download_url']), ('PENDING', None))
+
+        call_command('report_worker', '--once', stdout=StringIO())
+        status = self.client.get(reverse('report_job_api', args=[job.pk])).json()
+        self.assertEqual((status['status'], status['progress']), ('DONE', 100))
+
+        response = self.client.get(status['download_url'])
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+        # Veri değişmedi: PDF doğrudan diskten
+        response = self.client.get(reverse('download_mission_report'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+    def test_data_change_invalidates_cached_pdf(self):
+        before = report_data_hash()
+        self.assertEqual(report_data_hash(), before)
+        damage = DamageAssessment.objects.get()
+        damage.overall_damage = 'COLLAPSED'
+        damage.save()
+        self.assertNotEqual(report_data_hash(), before)
+        after_edit = report_data_hash()
+        damage.delete()
+        self.assertNotEqual(report_data_hash(), after_edit)
+
+    def test_failed_render_is_reported(self):
+        job = enqueue_report(report_data_hash())
+        with mock.patch('core.reports.render_report', side_effect=RuntimeError("Error Rendering PDF")):
+            job = process_next_job()
+        self.assertEqual((job.status, job.message), ('FAILED', 'Error Rendering PDF'))
+        self.assertIsNone(process_next_job())
+
+    def test_stale_running_job_is_failed(self):
+        job = enqueue_report(report_data_hash())
+        ReportJob.objects.filter(pk=job.pk).update(status='RUNNING', started_at=timezone.now() - STALE_JOB_AFTER * 2)
+
+        # Çöken worker'ın işi durum sayfasında FAILED görünür
+        status = self.client.get(reverse('report_job_api', args=[job.pk])).json()
+        self.assertEqual((status['status'], status['message']), ('FAILED', STALE_JOB_MESSAGE))
+
+        # Yeni istek yeni iş açar ve worker onu işler
+        fresh = enqueue_report(report_data_hash())
+        self.assertNotEqual(fresh.pk, job.pk)
+        self.assertEqual(process_next_job().pk, fresh.pk)
+        self.assertEqual(ReportJob.objects.get(pk=fresh.pk).status, 'DONE')
+
+    def test_running_job_within_limit_is_kept(self):
+        job = enqueue_report(report_data_hash())
+        ReportJob.objects.filter(pk=job.pk).update(status='RUNNING', started_at=timezone.now())
+        self.assertEqual(enqueue_report(report_data_hash()).pk, job.pk)
+        self.assertIsNone(process_next_job())
+        self.assertEqual(ReportJob.objects.get(pk=job.pk).status, 'RUNNING')
+
+    def test_unchanged_sections_are_reused(self):
+        other = self.make_assignment(Team.objects.create(name='Bravo'), self.make_worksite('W2'))
+        self.make_building(other, code='B2')
+        self.assertEqual([s.name for s in build_sections()], ['cover', 'red-list', 'sites-0', 'assets'])
+
+        pdfs, reused = render_sections(build_sections(), workers=2)
+        self.assertEqual(reused, 0)
+        self.assertTrue(all(p.startswith(b'%PDF') for p in pdfs))
+
+        # Veri değişmedi: kapak dahil hepsi önbellekten (kapakta kişi / tarih yok)
+        self.assertEqual(render_sections(build_sections(), workers=1)[1], 4)
+
+        # Bir binanın adı değişti: sadece o saha grubu ve kırmızı liste yeniden çizilir (kapak ve eserler önbellekten)
+        BuildingInventory.objects.filter(building_code='B1').update(building_name='Renamed')
+        self.assertEqual(render_sections(build_sections(), workers=1)[1], 2)
+
+    def test_merged_report_has_page_footer(self):
+        content = render_report(workers=1)
+        reader = PdfReader(BytesIO(content))
+        total = len(reader.pages)
+        self.assertGreaterEqual(total, 4)
+        self.assertNotIn('Page 1 of', reader.pages[0].extract_text())
+        self.assertIn(f'Page {total} of {total} | Mission Report', reader.pages[-1].extract_text())
+
+    def test_cached_report_is_stamped_for_each_downloader(self):
+        write_cached_report(report_data_hash(), render_report(workers=1))
+        other = User.objects.create_user(username='deputy', password='x')
+        covers = []
+        for user in (self.user, other):
+            self.client.force_login(user)
+            response = self.client.get(reverse('download_mission_report'))
+            reader = PdfReader(BytesIO(b''.join(response.streaming_content)))
+            covers.append(reader.pages[0].extract_text())
+        self.assertIn('Generated by Mission Chief', covers[0])
+        self.assertIn('Generated by deputy', covers[1])
+        self.assertNotIn('Mission Chief', covers[1])
+        self.assertIn(f"Date: {dateformat.format(timezone.localtime(), 'd F Y')}", covers[1])
+
+    def test_lookup_edits_invalidate_cached_pdf(self):
+        title, engineer = JobTitle.objects.create(title='Architect'), JobTitle.objects.create(title='Engineer')
+        person = Personnel.objects.create(first_name='Ada', last_name='Lovelace', gender='F', email='ada@example.org')
+        country = Country.objects.create(name='Italy')
+        with self.captureOnCommitCallbacks(execute=True):
+            person.job_titles.add(title)
+        before = report_data_hash()
+
+        # Ad değişiklikleri ve unvan değişimi sayıyı / en büyük id'yi değiştirmez
+        for change in (lambda: setattr(country, 'name', 'Italia') or country.save(),
+                       lambda: setattr(title, 'title', 'Restorer') or title.save(),
+                       lambda: person.job_titles.set([engineer])):
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            after = report_data_hash()
+            self.assertNotEqual(after, before)
+            before = after
+
+
+class ConstantQueryCountTests(OperationFixtureMixin, TestCase):
+    """Sayfa / rapor sorgu sayısı sahadaki kayıt sayısıyla büyümemeli."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='field', password='x')
+        self.client.force_login(self.user)
+        self.assignment = self.make_assignment(Team.objects.create(name='Alpha'), self.make_worksite('W1'))
+
+    def add_site(self, n):
+        building = self.make_building(self.assignment, code=f'B{n}')
+        self.make_damage(self.assignment, building, 'SEVERE')
+        self.make_damage(self.assignment, building, 'LIGHT', hazard='FIRE')
+        asset = MovableHeritage.objects.create(
+            assignment=self.assignment, worksite=self.assignment.worksite, building=building,
+            editor_name='tester', object_name=f'Icon {n}', category='Painting'
+        )
+        for _ in range(2):
+            MovableTracking.objects.create(
+                asset=asset, transfer_date=timezone.now(), team_id='T1', responsible_person='R',
+                from_location='Nave', to_location='Depot'
+            )
+        IntangibleHeritage.objects.create(
+            assignment=self.assignment, worksite=self.assignment.worksite, editor_name='tester', element_name=f'Rite {n}'
+        )
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        return len(ctx.captured_queries)
+
+    def test_field_dashboard(self):
+        url = reverse('field_dashboard', args=[self.assignment.pk])
+        self.add_site(0)
+        small = self.count_queries(lambda: self.client.get(url))
+        for n in range(1, 6):
+            self.add_site(n)
+        response = self.client.get(url)
+        self.assertContains(response, 'Icon 5')
+        self.assertContains(response, 'Rite 5')
+        self.assertEqual(self.count_queries(lambda: self.client.get(url)), small)
+
+    def test_mission_report_sections(self):
+        self.add_site(0)
+        small = self.count_queries(lambda: build_sections())
+        for n in range(1, 6):
+            self.add_site(n)
+        sections = build_sections()
+        self.assertEqual(sum(len(site['buildings']) for s in sections if s.name.startswith('sites') for site in s.context['sites']), 6)
+        self.assertEqual(self.count_queries(lambda: build_sections()), small)
+
+
+class OperationStatisticsTests(OperationFixtureMixin, TestCase):
+    """Sinyallerle artımlı güncellenen KPI satırı, sıfırdan sayımla her an aynı olmalı."""
+
+    def snapshot(self):
+        return model_to_dict(OperationStatistics.objects.get(pk=1))
+
+    def assertConsistent(self):
+        incremental = self.snapshot()
+        rebuild_statistics()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_field_records(self):
+        sector = Sector.objects.create(name='S1')
+        ws = self.make_worksite('W1', sector)
+        assignment = self.make_assignment(Team.objects.create(name='Alpha'), ws)
+        building = self.make_building(assignment)
+        damage = self.make_damage(assignment, building, 'LIGHT')
+        self.make_damage(assignment, building, 'SEVERE', hazard='FIRE')
+        self.assertConsistent()
+
+        damage.overall_damage = 'COLLAPSED'
+        damage.save()
+        ws.status = 'COMPLETED'
+        ws.save()
+        assignment.status = 'COMPLETED'
+        assignment.save()
+        stats = get_statistics()
+        self.assertEqual(stats.critical_damages, 2)
+        self.assertEqual((stats.completed_worksites, stats.active_assignments), (1, 0))
+        self.assertConsistent()
+
+        # Cascade: saha -> binalar -> hasar tespitleri
+        building.site_assessment.delete()
+        self.assertEqual(get_statistics().damage_grades, {})
+        self.assertConsistent()
+        ws.delete()
+        self.assertConsistent()
+
+    def test_personnel_and_lookups(self):
+        turkey = Country.objects.create(name='Turkey')
+        drm = ExpertiseType.objects.create(code='DRM')
+        architect, engineer = JobTitle.objects.create(title='Architect'), JobTitle.objects.create(title='Engineer')
+        ali = Personnel.objects.create(first_name='Ali', last_name='Kaya', gender='M', email='ali@example.com',
+                                       country=turkey, primary_expertise=drm, sq_number='BUILDING')
+        ali.job_titles.set([architect, engineer])
+        Personnel.objects.create(first_name='Ayşe', last_name='Demir', gender='F', email='ayse@example.com')
+        self.assertEqual(get_statistics().job_titles, {'Architect': 1, 'Engineer': 1})
+        self.assertConsistent()
+
+        ali.sq_number = 'MOVABLE'
+        ali.save()
+        engineer.personnel_set.remove(ali)
+        turkey.name = 'Türkiye'
+        turkey.save()
+        self.assertEqual(get_statistics().countries, {'Türkiye': 1, '': 1})
+        self.assertConsistent()
+
+        ali.job_titles.clear()
+        ali.job_titles.add(engineer)
+        drm.delete()
+        architect.delete()
+        self.assertConsistent()
+        ali.delete()
+        self.assertEqual(get_statistics().job_titles, {})
+        self.assertConsistent()
+
+    def test_rolled_back_change_is_not_counted(self):
+        Sector.objects.create(name='S1')
+        before = self.snapshot()
+        with self.assertRaises(ValueError), transaction.atomic():
+            Sector.objects.create(name='S2')
+            raise ValueError
+        self.assertEqual(self.snapshot(), before)
+
+    def test_dashboards_read_one_row(self):
+        assignment = self.make_assignment(Team.objects.create(name='Alpha'), self.make_worksite('W1'))
+        self.make_damage(assignment, self.make_building(assignment), 'SEVERE')
+        Personnel.objects.create(first_name='Ali', last_name='Kaya', gender='M', email='ali@example.com')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['critical_buildings'], 1)
+        self.assertEqual(response.context['total_personnel'], 1)
+        # Tek sayım: güncel kritik binalar (kısmi indeksli CurrentDamageState)
+        counts = [q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql']]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('core_currentdamagestate', counts[0])
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('reporting_dashboard'))
+        self.assertEqual(response.context['total_buildings'], 1)
+        self.assertFalse([q for q in ctx.captured_queries if 'core_personnel' in q['sql']])
+
+    def test_recount_uses_consolidated_queries(self):
+        # Önceden: sıfırdan sayım 14, rapor özeti 13 ayrı sorguydu
+        assignment = self.make_assignment(Team.objects.create(name='Alpha'), self.make_worksite('W1'))
+        self.make_damage(assignment, self.make_building(assignment), 'SEVERE')
+        ali = Personnel.objects.create(first_name='Ali', last_name='Kaya', gender='M', email='ali@example.com',
+                                       country=Country.objects.create(name='Turkey'), sq_number='BUILDING')
+        ali.job_titles.add(JobTitle.objects.create(title='Architect'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            counts = count_tables()
+            total, sq_types, expertise, countries = count_personnel()
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual((counts['worksites'], counts['assignments']), ({'OPEN': 1}, {'ACTIVE': 1}))
+        self.assertEqual((total, sq_types, expertise, countries), (1, {'BUILDING': 1}, {'': 1}, {'Turkey': 1}))
+
+        with CaptureQueriesContext(connection) as ctx:
+            report_data_hash()
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_rebuild_command(self):
+        Sector.objects.create(name='S1')
+        OperationStatistics.objects.update(total_sectors=99)
+        out = StringIO()
+        call_command('rebuild_statistics', stdout=out)
+        self.assertEqual(get_statistics().total_sectors, 1)
+
+
+class CsvExportTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.assignment = self.make_assignment(Team.objects.create(name='Alpha'), self.make_worksite('W1'))
+        self.building = self.make_building(self.assignment)
+
+    def export(self, dataset):
+        response = self.client.get(reverse('export_csv', args=[dataset]))
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.DictReader(StringIO(content), delimiter=';'))
+
+    def test_json_fields_are_flattened(self):
+        damage = self.make_damage(self.assignment, self.building, 'SEVERE')
+        damage.structural_damage = {'walls': {'cracks': 'D3', 'level': 2}, 'roof': ['tiles', 'beams']}
+        damage.save()
+        self.make_damage(self.assignment, self.building, 'LIGHT', hazard='FIRE')
+
+        rows = self.export('damages')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['structural_damage.walls.cracks'], 'D3')
+        self.assertEqual(rows[0]['structural_damage.roof'], '["tiles", "beams"]')
+        self.assertEqual(rows[1]['structural_damage.walls.cracks'], '')
+        self.assertEqual((rows[0]['building__building_code'], rows[0]['assignment__team__name']), ('B1', 'Alpha'))
+
+    def test_all_datasets_and_constant_queries(self):
+        for dataset in ('sites', 'buildings', 'damages', 'assets', 'asset-movements', 'intangible'):
+            self.export(dataset)
+        with CaptureQueriesContext(connection) as ctx:
+            self.export('buildings')
+        small = len(ctx.captured_queries)
+        for n in range(2, 30):
+            self.make_building(self.assignment, code=f'B{n}')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(len(self.export('buildings')), 29)
+        self.assertEqual(len(ctx.captured_queries), small)
+        self.assertEqual(self.client.get('/reporting/export/users.csv').status_code, 404)
+
+    def test_rows_added_between_passes_are_left_out(self):
+        self.make_damage(self.assignment, self.building, 'SEVERE')
+        scan = exports.json_paths
+
+        def scan_then_insert(queryset, json_fields):
+            paths = scan(queryset, json_fields)
+            late = self.make_damage(self.assignment, self.building, 'LIGHT', hazard='FIRE')
+            late.structural_damage = {'late': {'key': 'x'}}
+            late.save()
+            return paths
+
+        with mock.patch.object(exports, 'json_paths', scan_then_insert):
+            rows = self.export('damages')
+        self.assertEqual(len(rows), 1)
+        self.assertNotIn('structural_damage.late.key', rows[0])
+        self.assertEqual(len(self.export('damages')), 2)
+
+
+class ColumnarExportTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        sector = Sector.objects.create(name='S1')
+        self.assignment = self.make_assignment(Team.objects.create(name='Alpha'), self.make_worksite('W1', sector))
+        building = self.make_building(self.assignment)
+        building.structural_elements = {'walls': {'material': 'stone'}}
+        building.save()
+        first = self.make_damage(self.assignment, building, 'SEVERE')
+        first.structural_damage = {'walls': {'level': 3, 'ratio': 1}, 'roof': {'collapsed': True}}
+        first.save()
+        second = self.make_damage(self.assignment, building, 'LIGHT', hazard='FIRE')
+        second.structural_damage = {'walls': {'level': 1, 'ratio': 0.5}, 'roof': {'collapsed': False}}
+        second.intervention_needs = {'shoring': 'urgent'}
+        second.save()
+
+    @skipUnless(pq, 'pyarrow kurulu değil')
+    def test_one_typed_column_per_cell(self):
+        path = os.path.join(tempfile.mkdtemp(), 'matrices.parquet')
+        out = StringIO()
+        call_command('export_damage_matrices', path, stdout=out)
+        table = pq.read_table(path)
+        types = {field.name: str(field.type) for field in table.schema}
+        self.assertEqual(types['structural_damage.walls.level'], 'int64')
+        self.assertEqual(types['structural_damage.walls.ratio'], 'double')
+        self.assertEqual(types['structural_damage.roof.collapsed'], 'bool')
+        self.assertEqual(types['building_structural_elements.walls.material'], 'string')
+        data = table.to_pydict()
+        self.assertEqual(data['sector_name'], ['S1', 'S1'])
+        self.assertEqual(data['hazard_type'], ['SEISMIC', 'FIRE'])
+        self.assertEqual(data['intervention_needs.shoring'], [None, 'urgent'])
+        self.assertIn('2 hasar tespiti', out.getvalue())
+
+        response = self.client.get(reverse('export_damage_matrices', args=['arrow']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Disposition'].endswith('.arrow"'))
+
+    @skipUnless(pq, 'pyarrow kurulu değil')
+    def test_rows_changed_between_passes(self):
+        infer = columnar.infer_matrix_columns
+
+        def infer_then_edit(queryset):
+            found = infer(queryset)
+            first = DamageAssessment.objects.order_by('pk').first()
+            first.structural_damage = {'walls': {'level': 'heavy', 'ratio': 'n/a'}, 'roof': {'collapsed': 1}}
+            first.save()
+            late = self.make_damage(self.assignment, first.building, 'NONE', hazard='HYDRO')
+            late.structural_damage = {'late': {'key': 1}}
+            late.save()
+            return found
+
+        path = os.path.join(tempfile.mkdtemp(), 'matrices.parquet')
+        with mock.patch.object(columnar, 'infer_matrix_columns', infer_then_edit):
+            report = columnar.write_damage_matrices(path)
+        self.assertEqual(report['rows'], 2)
+        table = pq.read_table(path)
+        self.assertNotIn('structural_damage.late.key', table.schema.names)
+        data = table.to_pydict()
+        self.assertEqual(data['structural_damage.walls.level'], [None, 1])
+        self.assertEqual(data['structural_damage.walls.ratio'], [None, 0.5])
+        self.assertEqual(data['structural_damage.roof.collapsed'], [None, False])
+
+    @skipUnless(pq, 'pyarrow kurulu değil')
+    def test_sector_follows_site_assessment(self):
+        other = self.make_worksite('W2', Sector.objects.create(name='S2'))
+        DamageAssessment.objects.update(worksite=other)
+        path = os.path.join(tempfile.mkdtemp(), 'matrices.parquet')
+        columnar.write_damage_matrices(path)
+        data = pq.read_table(path).to_pydict()
+        self.assertEqual(data['worksite_name'], ['W1', 'W1'])
+        self.assertEqual(data['sector_name'], ['S1', 'S1'])
+
+    def test_missing_pyarrow(self):
+        with mock.patch.dict('sys.modules', {'pyarrow': None}):
+            with self.assertRaises(CommandError):
+                call_command('export_damage_matrices', os.path.join(tempfile.mkdtemp(), 'x.parquet'))
+            response = self.client.get(reverse('export_damage_matrices', args=['parquet']))
+        self.assertEqual(response.status_code, 501)
+
+
+@skipUnless(numpy, 'numpy kurulu değil')
+class DamageMatrixAnalyticsTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        reset_cache_stats()
+        bump_data_version()
+        north = self.make_assignment(Team.objects.create(name='Alpha'), self.make_worksite('W1', Sector.objects.create(name='North')))
+        south = self.make_assignment(Team.objects.create(name='Bravo'), self.make_worksite('W2', Sector.objects.create(name='South')))
+        matrices = [
+            (north, 'SEISMIC', {'walls': 'SEVERE', 'roof': 1}, {'plaster': {'LIGHT': 40, 'MODERATE': 60}}),
+            (north, 'SEISMIC', {'walls': 'COLLAPSED', 'roof': 'none'}, {}),
+            (south, 'SEISMIC', {'walls': 'LIGHT', 'roof': {'MODERATE': True}}, {'plaster': 'bad value'}),
+            (south, 'FIRE', {'walls': 'MODERATE'}, {}),
+        ]
+        for n, (assignment, hazard, structural, non_structural) in enumerate(matrices):
+            damage = self.make_damage(assignment, self.make_building(assignment, code=f'B{n}'), 'NONE', hazard=hazard)
+            damage.structural_damage = structural
+            damage.non_structural_damage = non_structural
+            damage.save()
+
+    def test_frequencies_heatmaps_and_percentiles(self):
+        result = build_matrix_analytics()
+        self.assertEqual((result['assessments'], result['buildings']), (4, 4))
+        elements = {e['name']: e for e in result['elements']}
+        walls = elements['walls']
+        self.assertEqual(walls['counts'], [0, 1, 1, 1, 1])
+        self.assertEqual(walls['critical_share'], 50)
+        self.assertEqual(walls['percentiles'][0], 'MODERATE')
+        # Seviye -> oran biçiminde en kötü işaretli seviye sayılır
+        self.assertEqual(elements['plaster']['assessed'], 1)
+        self.assertEqual(elements['plaster']['percentiles'], ['MODERATE'] * 3)
+
+        seismic = next(h for h in result['heatmaps'] if h['hazard'] == 'Seismic')
+        north = next(r for r in seismic['rows'] if r['sector'] == 'North')
+        walls_cell = north['cells'][seismic['elements'].index('walls')]
+        self.assertEqual(walls_cell['value'], 3.5)
+        fire = next(h for h in result['heatmaps'] if h['hazard'] == 'Fire')
+        self.assertEqual([r['sector'] for r in fire['rows']], ['South'])
+
+    def test_sector_follows_site_assessment(self):
+        # Tespitin kendi worksite'ı değil, binasının saha tespitindeki worksite sayılır
+        DamageAssessment.objects.filter(hazard_type='FIRE').update(worksite=Worksite.objects.get(name='W1'))
+        fire = next(h for h in build_matrix_analytics()['heatmaps'] if h['hazard'] == 'Fire')
+        self.assertEqual([r['sector'] for r in fire['rows']], ['South'])
+
+    def test_dashboard_uses_cached_result(self):
+        self.assertContains(self.client.get(reverse('reporting_dashboard')), 'Severity Heatmap: Seismic')
+        with mock.patch('core.analytics.DamageMatrix') as matrix:
+            self.client.get(reverse('reporting_dashboard'))
+        matrix.assert_not_called()
+        with mock.patch.dict('sys.modules', {'numpy': None}):
+            self.assertIsNone(get_matrix_analytics())
+
+    def test_malformed_cells_do_not_break_dashboard(self):
+        damage = DamageAssessment.objects.first()
+        damage.structural_damage = {'walls': [3], 'roof': 'NaN', 'floor': 10 ** 30, 'beam': {'SEVERE': [1]}}
+        damage.non_structural_damage = {'plaster': {'LIGHT': 'NaN', 'MODERATE': 'inf', 'SEVERE': {'x': 1}}}
+        damage.save()
+        self.assertEqual(self.client.get(reverse('reporting_dashboard')).status_code, 200)
+
+
+class PriorityIndexTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.north = self.make_assignment(Team.objects.create(name='Alpha'), self.make_worksite('W1', Sector.objects.create(name='North')))
+        self.south = self.make_assignment(Team.objects.create(name='Bravo'), self.make_worksite('W2', Sector.objects.create(name='South')))
+
+    def index(self, building):
+        building.refresh_from_db(fields=['priority_index'])
+        return building.priority_index
+
+    def test_score_components(self):
+        self.assertEqual(priority_score([], {}), 0)
+        self.assertEqual(priority_score([('COLLAPSED', {}, {})], {}), PRIORITY_WEIGHTS['overall'])
+        # En kötü eleman ve ortalama yarı yarıya: (4/4 + 2/4) / 2
+        self.assertEqual(priority_score([('NONE', {'walls': 'COLLAPSED', 'roof': 'NONE'}, {})], {}),
+                         round(PRIORITY_WEIGHTS['structural'] * 0.75, 2))
+        full = priority_score([('COLLAPSED', {'walls': 4}, {'a': 'urgent', 'b': 'urgent', 'c': {'d': 'immediate'}})],
+                              {str(n): True for n in range(6)})
+        self.assertEqual(full, 100)
+        # Boş / 'no' işaretleri sayılmaz
+        self.assertEqual(priority_score([], {'frescoes': 'no', 'altar': ''}), 0)
+
+    def test_malformed_matrix_cells_are_skipped(self):
+        for cell in ([3], {'SEVERE': [1]}, {'SEVERE': {'a': 1}}, {'SEVERE': 'NaN'}, {'SEVERE': float('nan')},
+                     {'SEVERE': float('inf')}, {'SEVERE': -1}, float('nan'), float('inf'), 2.5, 10 ** 400, False, None):
+            with self.subTest(cell=cell):
+                self.assertEqual(cell_levels(cell), [])
+        self.assertEqual(cell_levels(3.0), [(3, 1.0)])
+        self.assertEqual(cell_levels({'light': 40, 'SEVERE': True, 'MODERATE': False}), [(1, 40.0), (3, 1.0)])
+
+        # Bozuk hücreli tespit kaydedilebilir (öncelik sinyali hata vermez)
+        building = self.make_building(self.north)
+        damage = self.make_damage(self.north, building, 'SEVERE')
+        damage.structural_damage = {'walls': [4], 'roof': {'COLLAPSED': 'NaN'}, 'floor': {'COLLAPSED': {}}, 'beam': 'MODERATE'}
+        damage.save()
+        self.assertEqual(self.index(building), priority_score([('SEVERE', {'beam': 'MODERATE'}, {})], {}))
+        # NaN / inf JSON'a yazılamaz ama bellekteki matriste de hata vermez
+        self.assertEqual(priority_score([('SEVERE', {'roof': float('nan'), 'floor': {'COLLAPSED': float('inf')}}, {})], {}),
+                         priority_score([('SEVERE', {}, {})], {}))
+
+    def test_index_follows_damage_save_edit_delete(self):
+        building = self.make_building(self.north)
+        damage = self.make_damage(self.north, building, 'MODERATE')
+        self.assertEqual(self.index(building), 25)
+        damage.overall_damage = 'SEVERE'
+        damage.intervention_needs = {'shoring': 'urgent'}
+        damage.save()
+        self.assertEqual(self.index(building), round(37.5 + 15 * 2 / 6, 2))
+        damage.delete()
+        self.assertEqual(self.index(building), 0)
+
+        building.cultural_elements = {'frescoes': True}
+        building.save()
+        self.assertEqual(building.priority_index, 2)
+        self.assertEqual(self.index(building), 2)
+
+    def test_top_buildings_per_sector_and_recompute(self):
+        grades = [(self.north, 'COLLAPSED'), (self.north, 'LIGHT'), (self.north, 'SEVERE'), (self.south, 'MODERATE')]
+        buildings = []
+        for n, (assignment, grade) in enumerate(grades):
+            buildings.append(self.make_building(assignment, code=f'B{n}'))
+            self.make_damage(assignment, buildings[-1], grade)
+
+        with self.assertNumQueries(1):
+            ranking = list(top_priority_buildings(2, sector=self.north.worksite.sector))
+        self.assertEqual([b.building_code for b in ranking], ['B0', 'B2'])
+        with self.assertNumQueries(1):
+            per_sector = [(b.site_assessment.worksite.sector.name, b.building_code)
+                          for b in top_priority_buildings(1, per_sector=True)]
+        self.assertEqual(per_sector, [('North', 'B0'), ('South', 'B3')])
+
+        # Toplu işlemler sinyal göndermez; komut indeksleri düzeltir
+        BuildingInventory.objects.update(priority_index=0)
+        self.assertEqual(recompute_priorities(batch_size=3), (4, 4))
+        self.assertEqual([self.index(b) for b in buildings], [50, 12.5, 37.5, 25])
+        out = StringIO()
+        call_command('recompute_priority', top=1, stdout=out)
+        self.assertIn('4 bina, 0 bina', out.getvalue())
+        self.assertIn('B0', out.getvalue())
+        self.assertContains(self.client.get(reverse('reporting_dashboard')), 'Intervention Priority Ranking')
+
+    def test_building_ranked_in_its_site_assessment_sector(self):
+        # Formdaki worksite South, saha tespiti North: özetler gibi North'ta sayılır
+        building = self.make_building(self.north, code='MOVED')
+        BuildingInventory.objects.filter(pk=building.pk).update(worksite=self.south.worksite)
+        self.make_damage(self.north, building, 'COLLAPSED')
+
+        self.assertEqual([b.pk for b in top_priority_buildings(5, sector=self.north.worksite.sector)], [building.pk])
+        self.assertFalse(top_priority_buildings(5, sector=self.south.worksite.sector))
+        per_sector = [(b.site_assessment.worksite.sector.name, b.pk) for b in top_priority_buildings(1, per_sector=True)]
+        self.assertEqual(per_sector, [('North', building.pk)])
+        self.assertEqual(SectorDamageRollup.objects.get(sector=self.north.worksite.sector).buildings_assessed, 1)
+
+
+class CurrentDamageStateTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('editor', password='x')
+        self.client.force_login(self.user)
+        self.assignment = self.make_assignment(Team.objects.create(name='Alpha'), self.make_worksite('W1'))
+        self.building = self.make_building(self.assignment)
+
+    def states(self):
+        return {
+            hazard: (grade, assessment_id)
+            for hazard, grade, assessment_id in self.building.current_damage.values_list(
+                'hazard_type', 'overall_damage', 'assessment_id'
+            )
+        }
+
+    def index(self):
+        self.building.refresh_from_db(fields=['priority_index'])
+        return self.building.priority_index
+
+    def test_latest_assessment_per_hazard_through_views(self):
+        url = reverse('add_damage_assessment', args=[self.assignment.pk, self.building.pk])
+        for hazard, grade in [('SEISMIC', 'SEVERE'), ('SEISMIC', 'LIGHT'), ('FIRE', 'COLLAPSED')]:
+            self.client.post(url, {'hazard_type': hazard, 'overall_damage': grade})
+        first, second, fire = DamageAssessment.objects.order_by('pk')
+        self.assertEqual(self.states(), {'SEISMIC': ('LIGHT', second.pk), 'FIRE': ('COLLAPSED', fire.pk)})
+        self.assertEqual([s.hazard_type for s in current_critical_states()], ['FIRE'])
+
+        # Düzenleme: tehlike türü değişirse eski anahtar bir önceki tespite döner
+        self.client.post(reverse('edit_damage', args=[second.pk]), {'hazard_type': 'HYDRO', 'overall_damage': 'SEVERE'})
+        self.assertEqual(self.states(), {
+            'SEISMIC': ('SEVERE', first.pk), 'HYDRO': ('SEVERE', second.pk), 'FIRE': ('COLLAPSED', fire.pk),
+        })
+
+        self.client.post(reverse('delete_damage', args=[fire.pk]))
+        self.client.post(reverse('delete_damage', args=[first.pk]))
+        self.assertEqual(self.states(), {'HYDRO': ('SEVERE', second.pk)})
+        self.assertEqual(self.index(), PRIORITY_WEIGHTS['overall'] * 0.75)
+
+    def test_rebuild_and_reports_use_current_state(self):
+        self.make_damage(self.assignment, self.building, 'COLLAPSED')
+        self.make_damage(self.assignment, self.building, 'MODERATE')
+        # Güncel durum MODERATE: bina kırmızı listede yok, öncelik de eski çöküşü saymaz
+        self.assertFalse(current_critical_states().exists())
+        self.assertEqual(self.index(), 25)
+        sections = {s.name: s for s in build_sections()}
+        self.assertEqual(sections['red-list'].context['red_list'], [])
+        # Ana sayfa kartı ve PDF kapağı da güncel durumdan
+        self.assertEqual(sections['cover'].context['critical_total'], 0)
+        self.client.force_login(User.objects.create_user(username='viewer', password='x'))
+        self.assertEqual(self.client.get(reverse('home')).context['critical_buildings'], 0)
+
+        expected = self.states()
+        CurrentDamageState.objects.all().delete()
+        self.assertEqual(rebuild_damage_states(), 1)
+        self.assertEqual(self.states(), expected)
+        call_command('rebuild_damage_state', stdout=StringIO())
+        self.assertEqual(self.states(), expected)
+
+        self.make_damage(self.assignment, self.building, 'SEVERE', hazard='FIRE')
+        self.make_damage(self.assignment, self.building, 'COLLAPSED', hazard='HYDRO')
+        self.assertEqual(critical_building_count(), 1)  # İki tehlikede kritik: tek bina
+
+
+class DamageRollupTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        square = {"type": "Polygon", "coordinates": [[[29.0, 40.1], [29.2, 40.1], [29.2, 40.3], [29.0, 40.1]]]}
+        self.north = Sector.objects.create(name='North', location_data=json.dumps(square))
+        self.south = Sector.objects.create(name='South')
+        self.assignment = self.make_assignment(Team.objects.create(name='Alpha'), self.make_worksite('W1', self.north))
+        self.worksite = self.assignment.worksite
+
+    def snapshot(self):
+        return {
+            model.__name__: sorted(model.objects.values_list('pk', *ROLLUP_FIELDS))
+            for model in (WorksiteDamageRollup, SectorDamageRollup)
+        }
+
+    def assertConsistent(self):
+        incremental = self.snapshot()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_deltas_follow_the_chain(self):
+        building = self.make_building(self.assignment)
+        self.make_damage(self.assignment, building, 'SEVERE')
+        self.make_damage(self.assignment, building, 'LIGHT', hazard='FIRE')
+        MovableHeritage.objects.create(
+            assignment=self.assignment, worksite=self.worksite, building=building, editor_name='tester', object_name='Icon'
+        )
+        IntangibleHeritage.objects.create(assignment=self.assignment, worksite=self.worksite, editor_name='tester', element_name='Rite')
+        rollup = SectorDamageRollup.objects.get(sector=self.north)
+        self.assertEqual((rollup.buildings_assessed, rollup.assets_recorded, rollup.intangible_elements), (1, 1, 1))
+        self.assertEqual((rollup.critical_damages, rollup.assessed_damages, rollup.critical_share), (1, 2, 50))
+        self.assertConsistent()
+
+        # Yeniden değerlendirme: eski derece düşer, yenisi sayılır
+        self.make_damage(self.assignment, building, 'MODERATE')
+        self.assertEqual(SectorDamageRollup.objects.get(sector=self.north).damage_grades,
+                         {'NONE': 0, 'LIGHT': 1, 'MODERATE': 1, 'SEVERE': 0, 'COLLAPSED': 0})
+        self.assertConsistent()
+
+        # Worksite başka sektöre geçer: sayaçlar onunla taşınır
+        self.worksite.sector = self.south
+        self.worksite.save()
+        self.assertEqual(SectorDamageRollup.objects.get(sector=self.north).buildings_assessed, 0)
+        self.assertEqual(SectorDamageRollup.objects.get(sector=self.south).buildings_assessed, 1)
+        self.assertConsistent()
+
+        building.delete()
+        self.assertEqual(WorksiteDamageRollup.objects.get(worksite=self.worksite).assessed_damages, 0)
+        self.assertConsistent()
+        # Worksite silinince alt kayıtların farkları sektörü sıfırlar
+        self.make_damage(self.assignment, self.make_building(self.assignment, 'B2'), 'COLLAPSED')
+        self.worksite.delete()
+        rollup = SectorDamageRollup.objects.get(sector=self.south)
+        self.assertEqual((rollup.buildings_assessed, rollup.assessed_damages, rollup.assets_recorded), (0, 0, 0))
+        self.assertConsistent()
+
+    def test_parent_changes_move_counts(self):
+        other = self.make_assignment(Team.objects.create(name='Bravo'), self.make_worksite('W2', self.south))
+        building, target = self.make_building(self.assignment), self.make_building(other, 'B2')
+        self.make_damage(self.assignment, building, 'SEVERE')
+        asset = MovableHeritage.objects.create(
+            assignment=self.assignment, worksite=self.worksite, building=building, editor_name='tester', object_name='Icon'
+        )
+
+        def sector_counts(sector):
+            rollup = SectorDamageRollup.objects.get(sector=sector)
+            return rollup.buildings_assessed, rollup.assets_recorded, rollup.critical_damages
+
+        # Eser başka binaya geçer: binanın worksite'ında sayılır
+        asset.building = target
+        asset.save()
+        self.assertEqual((sector_counts(self.north), sector_counts(self.south)), ((1, 0, 1), (1, 1, 0)))
+        self.assertConsistent()
+        asset.building = building
+        asset.save()
+
+        # Bina başka saha tespitine geçer: eserleri ve güncel hasar durumu onunla gider
+        worksite_clusters.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            building.site_assessment = target.site_assessment
+            building.save()
+        self.assertEqual(worksite_clusters.points[other.worksite_id]['damage_color'], damage_display('SEVERE')[0])
+        self.assertEqual(worksite_clusters.points[self.worksite.pk]['damage_color'], damage_display(None)[0])
+        self.assertEqual((sector_counts(self.north), sector_counts(self.south)), ((0, 0, 0), (2, 1, 1)))
+        self.assertEqual(CurrentDamageState.objects.get(building=building).worksite_id, other.worksite_id)
+        self.assertConsistent()
+
+        # Bina silinince binasız kalan eser kendi worksite'ında sayılır
+        building.delete()
+        self.assertEqual((sector_counts(self.north), sector_counts(self.south)), ((0, 1, 0), (1, 0, 0)))
+        self.assertConsistent()
+
+        # Worksite silmesi: bina eserlerinden önce silinir; kalan da aynı silmede giden de tek sayılır
+        doomed = self.make_building(self.assignment, 'B3')
+        for assignment in (self.assignment, other):
+            MovableHeritage.objects.create(
+                assignment=assignment, worksite=other.worksite, building=doomed, editor_name='tester', object_name='Vase'
+            )
+        self.worksite.delete()
+        self.assertEqual(sector_counts(self.south), (1, 1, 0))
+        self.assertConsistent()
+
+    def test_sector_map_and_tables_read_rollups(self):
+        self.make_damage(self.assignment, self.make_building(self.assignment), 'COLLAPSED')
+        feature = self.client.get(reverse('map_features_api'), {
+            'bbox': '28,39,30,41', 'zoom': 12, 'layers': 'sectors'
+        }).json()['features'][0]
+        rollup = feature['properties']['rollup']
+        self.assertEqual((rollup['buildings'], rollup['critical'], rollup['critical_share']), (1, 1, 100))
+        self.assertEqual(rollup['color'], '#e74a3b')
+
+        response = self.client.get(reverse('sector_list'))
+        self.assertContains(response, 'Critical / Assessed')
+        self.assertEqual(response.context['sectors'][0].damage_rollup.critical_damages, 1)
+        self.assertContains(self.client.get(reverse('worksite_list')), '1 / 1 critical')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Plan kontrolü SQLite EXPLAIN QUERY PLAN çıktısına göre yazıldı')
+class QueryPlanTests(OperationFixtureMixin, TestCase):
+
+    def setUp(self):
+        team = Team.objects.create(name='Alpha')
+        for i in range(3):
+            assignment = self.make_assignment(team, self.make_worksite(f"W{i}"), status='ACTIVE' if i else 'COMPLETED')
+            building = self.make_building(assignment, f"B{i}")
+            self.make_damage(assignment, building, 'SEVERE')
+            self.make_damage(assignment, building, 'LIGHT', hazard='FIRE')
+            MovableHeritage.objects.create(
+                assignment=assignment, worksite=assignment.worksite, building=building, editor_name='tester', object_name='Icon'
+            )
+        Personnel.objects.create(first_name='Ada', last_name='Y', gender='F', email='ada@example.com')
+
+    def test_full_scan_detection(self):
+        self.assertEqual(full_scans(['3 0 0 SCAN core_assignment', '19 0 0 USE TEMP B-TREE FOR ORDER BY']), ['core_assignment'])
+        self.assertEqual(full_scans(['5 0 0 SCAN core_damageassessment USING INDEX damage_recent_idx']), [])
+        self.assertEqual(full_scans(['4 0 0 SEARCH core_worksite USING INDEX worksite_status_idx (status=?)']), [])
+
+    def test_hot_queries_use_indexes(self):
+        results = check_query_plans()
+        self.assertEqual(len(results), len(HOT_QUERIES))
+        for name, plan, scans in results:
+            with self.subTest(query=name):
+                self.assertEqual(scans, [], '\n'.join(plan))
+        plans = {name: ' '.join(plan) for name, plan, _ in results}
+        self.assertIn('assignment_active_idx', plans['worksite_has_active_assignment'])
+        self.assertIn('damage_latest_idx', plans['latest_damage'])
+
+    def test_command_reports_plans(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('active_assignments', out.getvalue())
+        with mock.patch('core.query_plans.explain_plan', return_value=['3 0 0 SCAN core_worksite']):
+            with self.assertRaises(CommandError):
+                call_command('check_query_plans', stdout=StringIO())
+
+
+class SeedOperationTests(TestCase):
+
+    def snapshot(self):
+        return (
+            list(Worksite.objects.order_by('name').values_list('name', 'sector__name', 'location_data', 'status')),
+            list(DamageAssessment.objects.order_by('created_at').values_list(
+                'building__building_code', 'hazard_type', 'overall_damage', 'created_at', 'structural_damage'
+            )),
+            list(MovableTracking.objects.order_by('transfer_date').values_list('asset__object_name', 'to_location')),
+        )
+
+    def test_seed_builds_consistent_operation(self):
+        out = StringIO()
+        call_command('seed_operation', worksites=12, seed=3, stdout=out)
+        self.assertIn('Sentetik operasyon hazır', out.getvalue())
+        self.assertEqual(Worksite.objects.count(), 12)
+        for model in (Sector, Team, Personnel, Assignment, SiteAssessment, BuildingInventory, DamageAssessment,
+                      MovableHeritage, IntangibleHeritage):
+            with self.subTest(model=model.__name__):
+                self.assertTrue(model.objects.exists())
+        self.assertTrue(Personnel.objects.filter(team__isnull=True, job_titles__isnull=False).exists())
+        # Üretilen tarihler yazıldı, alan tanımları (auto_now) değişmedi
+        self.assertTrue(Worksite._meta.get_field('created_at').auto_now_add)
+        self.assertTrue(Worksite._meta.get_field('updated_at').auto_now)
+        self.assertFalse(Worksite.objects.filter(created_at__gt=OPERATION_START + timedelta(days=2 * OPERATION_DAYS)).exists())
+        self.assertFalse(DamageAssessment.objects.filter(updated_at__gt=OPERATION_START + timedelta(days=2 * OPERATION_DAYS)).exists())
+        # Noktalar kendi sektörlerinin poligonu içinde
+        for worksite in Worksite.objects.all():
+            self.assertEqual(sector_index.sector_at(worksite.centroid_lng, worksite.centroid_lat), worksite.sector_id)
+
+        # Türetilmiş tablolar toplu yazımdan sonra yeniden kuruldu
+        stats = get_statistics()
+        self.assertEqual(stats.total_buildings, BuildingInventory.objects.count())
+        self.assertEqual(stats.active_assignments, Assignment.objects.filter(status='ACTIVE').count())
+        self.assertEqual(CurrentDamageState.objects.count(),
+                         DamageAssessment.objects.values('building', 'hazard_type').distinct().count())
+        self.assertTrue(BuildingInventory.objects.filter(priority_index__gt=0).exists())
+        self.assertEqual(
+            sum(rollup.assessed_damages for rollup in SectorDamageRollup.objects.all()), CurrentDamageState.objects.count()
+        )
+
+        # Aynı tohum aynı veriyi üretir; dolu veritabanında komut çalışmaz
+        first = self.snapshot()
+        with self.assertRaises(CommandError):
+            call_command('seed_operation', worksites=12, seed=3, stdout=StringIO())
+        for model in (Worksite, Personnel, Team, Sector):
+            model.objects.all().delete()
+        OperationSeeder(12, seed=3).run()
+        self.assertEqual(first, self.snapshot())
+
+
+class ViewBenchmarkTests(TestCase):
+
+    def test_scaling_exponent(self):
+        self.assertEqual(scaling_exponent([(100, 0.01), (1000, 0.1)]), 1.0)
+        self.assertEqual(scaling_exponent([(100, 0.01), (1000, 1.0)]), 2.0)
+        self.assertIsNone(scaling_exponent([(100, 0.01)]))
+
+    def test_run_and_compare_with_baseline(self):
+        results = run_benchmarks(scales=(3, 6), repeat=1)
+        self.assertEqual([scale['worksites'] for scale in results['scales']], [3, 6])
+        for scale in results['scales']:
+            self.assertEqual(list(scale['views']), [name for name, _ in BENCHMARK_VIEWS])
+            for name, view in scale['views'].items():
+                with self.subTest(view=name, worksites=scale['worksites']):
+                    self.assertIn(view['status'], (200, 302))
+                    self.assertGreater(view['queries'], 0)
+                    self.assertGreater(view['peak_memory_kb'], 0)
+        self.assertEqual(results['scales'][0]['views']['download_mission_report']['status'], 302)
+        self.assertEqual(results['scales'][0]['views']['download_mission_report_cached']['status'], 200)
+        self.assertEqual(set(results['curves']), {name for name, _ in BENCHMARK_VIEWS})
+        json.dumps(results)
+
+        # Kendisiyle karşılaştırma temiz; yavaşlayan, sorgu ekleyen ve süper-lineer olan görünüm işaretlenir
+        self.assertEqual(compare(results, results)['regressions'], [])
+        # Küçük ölçekte ölçülen eğri gürültüyle süper-lineer çıkabilir; temel ölçüm lineer sabitlenir
+        results['curves']['worksite_list'].update(superlinear=False, exponent=1.0)
+        slower = json.loads(json.dumps(results))
+        view = slower['scales'][1]['views']['worksite_list']
+        view['wall'], view['queries'] = max(view['wall'], 0.01) * 3, view['queries'] + 1
+        slower['curves']['worksite_list'].update(superlinear=True, exponent=1.9)
+        regressions = compare(slower, results)['regressions']
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(all(message.startswith('worksite_list') for message in regressions))
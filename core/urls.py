@@ -9,7 +9,9 @@ from .views import (
     AssignmentListView, AssignmentCreateView, AssignmentUpdateView, reporting_dashboard,
     field_dashboard, add_site_assessment, add_building_inventory, add_damage_assessment, add_movable_heritage,
     edit_damage_assessment, delete_damage_assessment,
-    edit_movable_heritage, delete_movable_heritage, add_intangible_heritage, add_movable_tracking, team_members_list, toggle_team_leader
+    edit_movable_heritage, delete_movable_heritage, add_intangible_heritage, add_movable_tracking, team_members_list, toggle_team_leader,
+    map_features_api, report_job_status, report_job_api, report_job_download, export_csv,
+    export_damage_matrices
 )
 from django.contrib.auth import views as auth_views
 
@@ -60,6 +62,11 @@ urlpatterns = [
          name='add_movable_heritage'),
     path('reporting/', reporting_dashboard, name='reporting_dashboard'),
     path('reporting/pdf/', download_mission_report, name='download_mission_report'),
+    path('reporting/pdf/jobs/<int:pk>/', report_job_status, name='report_job_status'),
+    path('reporting/pdf/jobs/<int:pk>/status/', report_job_api, name='report_job_api'),
+    path('reporting/pdf/jobs/<int:pk>/download/', report_job_download, name='report_job_download'),
+    path('reporting/export/<slug:dataset>.csv', export_csv, name='export_csv'),
+    path('reporting/export/damage-matrices.<str:file_format>', export_damage_matrices, name='export_damage_matrices'),
     # Hasar İşlemleri
     path('damage/<int:pk>/edit/', edit_damage_assessment, name='edit_damage'),
     path('damage/<int:pk>/delete/', delete_damage_assessment, name='delete_damage'),
@@ -78,4 +85,6 @@ urlpatterns = [
          name='add_movable_tracking'),
     path('teams/<int:team_id>/members/', team_members_list, name='team_members_list'),
     path('teams/toggle-leader/<int:personnel_id>/', toggle_team_leader, name='toggle_team_leader'),
+    # HARİTA API (GeoJSON)
+    path('api/map/features/', map_features_api, name='map_features_api'),
 ]
\ No newline at end of file
@@ -1,52 +1,61 @@
-from django.urls import reverse_lazy
-from django.http import HttpResponse
+from django.urls import reverse, reverse_lazy
+from django.http import HttpResponse, JsonResponse, FileResponse, StreamingHttpResponse, Http404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from django.utils import timezone
-from django.db.models import Count, Q, Sum
+from django.db import transaction
+from django.db.models import Count, Q, Sum, Min, Max, Prefetch
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import CreateView, ListView, UpdateView, DeleteView
-from .models import Personnel, Team, Sector, Worksite, Assignment, SiteAssessment, BuildingInventory, DamageAssessment, MovableHeritage
+from .models import Personnel, Team, Sector, Worksite, Assignment, SiteAssessment, BuildingInventory, DamageAssessment, MovableHeritage, MovableTracking, ReportJob
 from .forms import IntangibleHeritageForm, MovableTrackingForm, PersonnelForm, TeamForm, SectorForm, WorksiteForm, AssignmentForm, SiteAssessmentForm, BuildingInventoryForm, DamageAssessmentForm, MovableHeritageForm
 import json
-from django.contrib.auth.models import User
-from django.template.loader import render_to_string
+import hashlib
+import os
+import tempfile
 from io import BytesIO
-from xhtml2pdf import pisa
+from django.contrib.auth.models import User
 from .utils import generate_random_password
+from .clustering import worksite_clusters, CLUSTER_MAX_ZOOM
+from .statistics import get_statistics
+from .analytics import get_matrix_analytics
+from .priority import top_priority_buildings
+from .damage_state import critical_building_count, current_critical_states
+from .rollups import ROLLUP_VALUES, pop_rollup
+from .exports import EXPORTS, iter_csv
+from .columnar import FORMATS as COLUMNAR_FORMATS, ColumnarExportUnavailable, write_damage_matrices
+from .reports import (
+    report_data_hash, cached_report_path, display_name, enqueue_report, fail_stale_jobs, job_file_path, stamp_cover,
+)
+from .map_data import (
+    get_operational_map_data, get_data_version, sector_shapes,
+    viewport_queryset, with_sector_shape, as_feature, WORKSITE_VIEWS,
+)
 
 
 def home(request):
     """
     Ana Dashboard: Canlı özet, son aktiviteler ve hızlı menü.
     """
-    # 1. KARTLAR İÇİN VERİLER
-    active_assignments = Assignment.objects.filter(status='ACTIVE').count()
-    
-    # Kritik Bina Sayısı (Severe + Collapsed)
-    critical_buildings = DamageAssessment.objects.filter(
-        overall_damage__in=['SEVERE', 'COLLAPSED']
-    ).count()
-    
-    # Toplam Kurtarılan/Kaydedilen Eser
-    total_assets = MovableHeritage.objects.count()
-    
-    # Sahadaki Toplam Personel (Aktif Takımlardaki üye sayısı tahmini veya direkt personel sayısı)
-    total_personnel = Personnel.objects.count()
+    # 1. KARTLAR İÇİN VERİLER (tek satır: core/statistics.py)
+    stats = get_statistics()
 
     # 2. SON AKTİVİTELER (Son 5 Hasar Raporu)
     recent_activities = DamageAssessment.objects.select_related(
         'building', 'assignment__team'
     ).order_by('-created_at')[:5]
 
-    # 3. HARİTA İÇİN VERİ (Mevcut fonksiyonu kullanıyoruz)
-    map_data = get_operational_map_data()
+    # 3. HARİTA: Veri görünür alana göre API'den (map_features_api) çekilir, burada sadece ilk kapsam
+    map_bounds = map_extent()
 
     context = {
-        'active_assignments': active_assignments,
-        'critical_buildings': critical_buildings,
-        'total_assets': total_assets,
-        'total_personnel': total_personnel,
+        'active_assignments': stats.active_assignments,
+        # Kritik Bina Sayısı (güncel durumu Severe / Collapsed olanlar)
+        'critical_buildings': critical_building_count(),
+        'total_assets': stats.total_assets,
+        'total_personnel': stats.total_personnel,
         'recent_activities': recent_activities,
-        'map_data': map_data,
+        'map_bounds': map_bounds,
     }
     return render(request, 'core/index.html', context)
 # 1. Liste Görünümü
@@ -195,21 +204,8 @@ class WorksiteCreateView(CreateView):
             context = super().get_context_data(**kwargs)
             context['title'] = 'Create New Worksite'
             
-            sectors_data = []
-            for s in Sector.objects.exclude(location_data__isnull=True).exclude(location_data=''):
-                try:
-                    geom = json.loads(s.location_data)
-                    sectors_data.append({
-                        'id': s.id,
-                        'name': s.name,
-                        'color': s.color,
-                        'geometry': geom
-                    })
-                except:
-                    pass
-            
-            # DÜZELTME: json.dumps() kaldırıldı
-            context['sectors_json'] = sectors_data 
+            # Sektör geometrileri kayıt anında ayrıştırıldı (json.loads yok)
+            context['sectors_json'] = sector_shapes()
             return context
 
 class WorksiteUpdateView(UpdateView):
@@ -222,177 +218,104 @@ class WorksiteUpdateView(UpdateView):
             context = super().get_context_data(**kwargs)
             context['title'] = 'Edit Worksite'
             
-            sectors_data = []
-            for s in Sector.objects.exclude(location_data__isnull=True).exclude(location_data=''):
-                try:
-                    geom = json.loads(s.location_data)
-                    sectors_data.append({
-                        'id': s.id,
-                        'name': s.name,
-                        'color': s.color,
-                        'geometry': geom
-                    })
-                except:
-                    pass
-            
-            # DÜZELTME: json.dumps() kaldırıldı
-            context['sectors_json'] = sectors_data
+            # Sektör geometrileri kayıt anında ayrıştırıldı (json.loads yok)
+            context['sectors_json'] = sector_shapes()
             return context
-# core/views.py
+# --- HARİTA API (GeoJSON, Görünüm Alanı Bazlı) ---
+MAP_API_PAGE_SIZE = 500
+MAP_API_MAX_PAGE_SIZE = 2000
 
-# core/views.py dosyasında get_operational_map_data fonksiyonunu değiştirin:
 
-def get_operational_map_data():
-    """
-    Operations Haritası için veri hazırlar.
-    Renk Mantığı:
-    - Completed (Worksite Kapalı) = Green (#1cc88a)
-    - Assigned / Ongoing (Aktif Ekip Var) = Orange (#fd7e14)
-    - Not Assigned (Aktif Ekip Yok ve Açık) = Gray (#858796)
-    """
-    sectors_data = []
-    worksites_data = []
-
-    # 1. Sektörleri Hazırla (Değişiklik yok)
-    for s in Sector.objects.exclude(location_data__isnull=True).exclude(location_data=''):
-        try:
-            geom = json.loads(s.location_data)
-            sectors_data.append({
-                'id': s.id, 'name': s.name, 'color': s.color, 'geometry': geom
-            })
-        except: pass
-
-    # 2. Worksite'ları Hazırla ve Renklendir
-    for w in Worksite.objects.exclude(location_data__isnull=True).exclude(location_data=''):
-        try:
-            geom = json.loads(w.location_data)
-            
-            # Aktif görevleri kontrol et
-            active_assignments = w.assignments.filter(status='ACTIVE')
-            has_active_team = active_assignments.exists()
-            
-            # --- RENK MANTIĞI ---
-            if w.status == 'COMPLETED':
-                # İş Tamamlandı -> YEŞİL
-                map_color = '#1cc88a' 
-                status_text = f"COMPLETED ({w.completion_date or 'No Date'})"
-            elif has_active_team:
-                # Aktif Ekip Var -> TURUNCU
-                map_color = '#fd7e14'
-                status_text = "ONGOING (Team Assigned)"
-            else:
-                # Ekip Yok ve Açık -> GRİ
-                map_color = '#858796'
-                status_text = "NOT ASSIGNED"
-
-            # Pop-up verileri (Eski mantıkla aynı, sadece renk ekledik)
-            active_teams_list = []
-            for a in active_assignments:
-                active_teams_list.append({
-                    'team': a.team.name,
-                    'start': a.start_time.strftime('%d/%m %H:%M'),
-                    'assignment_id': a.id
-                })
-            
-            # Geçmiş verileri
-            history_teams = []
-            for a in w.assignments.exclude(status='ACTIVE').order_by('-end_time'):
-                history_teams.append({
-                    'team': a.team.name,
-                    'period': f"{a.start_time.strftime('%d/%m')} - {a.end_time.strftime('%d/%m') if a.end_time else '?'}"
-                })
-
-            worksites_data.append({
-                'id': w.id,
-                'name': w.name,
-                'sector_name': w.sector.name if w.sector else "Unassigned",
-                'geometry': geom,
-                'map_color': map_color,       # <--- Harita rengi
-                'status_text': status_text,   # <--- Durum metni
-                'active_teams': active_teams_list,
-                'history_teams': history_teams
-            })
-        except: pass
-            
-    return {'sectors': sectors_data, 'worksites': worksites_data}
+def _map_features_etag(request):
+    # Veri versiyonu + sorgu parametreleri: veri değişmediyse tarayıcı 304 alır
+    raw = f"{get_data_version()}:{request.GET.urlencode()}"
+    return hashlib.md5(raw.encode()).hexdigest()
 
-# core/views.py dosyasında get_all_map_data fonksiyonunu bu şekilde güncelleyin:
 
-def get_all_map_data():
+@condition(etag_func=_map_features_etag)
+def map_features_api(request):
     """
-    Tüm Sektör ve Worksite verilerini Harita için hazırlar.
-    Worksite renkleri ve 'Raporlayan Takım' bilgisi hasar durumuna göre belirlenir.
+    Görünür alan (bbox) ile kesişen sektör ve worksite'ları GeoJSON FeatureCollection olarak döndürür.
+
+    Parametreler:
+    - bbox=west,south,east,north (zorunlu)
+    - zoom=0..22 (ekranda piksel altı kalacak poligonlar elenir)
+    - layers=sectors,worksites
+    - view=damage | operations (worksite pop-up/renk verisi)
+    - page, page_size (her katman için ayrı sayfalanır, next_page boş olana kadar istenir)
+    - cluster=0 (zoom <= CLUSTER_MAX_ZOOM iken kümelemeyi kapatır)
     """
-    sectors_data = []
-    worksites_data = []
-
-    # 1. Sektörleri Hazırla
-    for s in Sector.objects.exclude(location_data__isnull=True).exclude(location_data=''):
-        try:
-            geom = json.loads(s.location_data)
-            sectors_data.append({
-                'id': s.id, 'name': s.name, 'color': s.color, 
-                'geometry': geom, 'description': s.description
-            })
-        except: pass
-
-    # 2. Worksite'ları Hazırla (Hasar ve Takım Analizi İle)
-    for w in Worksite.objects.exclude(location_data__isnull=True).exclude(location_data=''):
-        try:
-            geom = json.loads(w.location_data)
-            
-            # Bu worksite'a bağlı tüm raporları (Takım bilgisiyle beraber) çek
-            reports = DamageAssessment.objects.filter(worksite=w).select_related('assignment__team')
-            
-            # Varsayılan Değerler (Rapor Yoksa)
-            damage_color = '#858796' # Gri
-            damage_status = "Not Assessed"
-            reporting_team = "-" # Takım Yok
-
-            if reports.exists():
-                # Tüm hasar seviyelerini listeye al
-                damage_levels = [r.overall_damage for r in reports]
-                target_severity = 'NONE' # Varsayılan
-                
-                # En kötü durumu (Worst-Case) tespit et
-                if 'COLLAPSED' in damage_levels:
-                    target_severity = 'COLLAPSED'
-                    damage_color = '#e74a3b' 
-                    damage_status = "Critical (Collapsed)"
-                elif 'SEVERE' in damage_levels:
-                    target_severity = 'SEVERE'
-                    damage_color = '#e74a3b'
-                    damage_status = "Critical (Severe)"
-                elif 'MODERATE' in damage_levels:
-                    target_severity = 'MODERATE'
-                    damage_color = '#fd7e14'
-                    damage_status = "Moderate Damage"
-                elif 'LIGHT' in damage_levels:
-                    target_severity = 'LIGHT'
-                    damage_color = '#f6c23e'
-                    damage_status = "Light Damage"
-                else:
-                    target_severity = 'NONE'
-                    damage_color = '#1cc88a'
-                    damage_status = "No Damage"
-                
-                # Bu 'hedef hasarı' (örneğin SEVERE) raporlayan en son kaydı bul
-                worst_report = reports.filter(overall_damage=target_severity).order_by('-created_at').first()
-                if worst_report:
-                    reporting_team = worst_report.assignment.team.name
-
-            worksites_data.append({
-                'id': w.id,
-                'name': w.name,
-                'sector_name': w.sector.name if w.sector else "Unassigned",
-                'geometry': geom,
-                'damage_color': damage_color,
-                'damage_status': damage_status,
-                'reporting_team': reporting_team  # <--- YENİ EKLENEN VERİ
-            })
-        except: pass
-            
-    return {'sectors': sectors_data, 'worksites': worksites_data}
+    try:
+        bbox = [float(v) for v in request.GET['bbox'].split(',')]
+        if len(bbox) != 4:
+            raise ValueError
+        zoom = int(request.GET['zoom']) if request.GET.get('zoom') else None
+        page = max(int(request.GET.get('page', 1)), 1)
+        page_size = min(max(int(request.GET.get('page_size', MAP_API_PAGE_SIZE)), 1), MAP_API_MAX_PAGE_SIZE)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': "bbox=west,south,east,north is required; zoom, page and page_size must be integers."}, status=400)
+
+    view = request.GET.get('view', 'damage')
+    if view not in WORKSITE_VIEWS:
+        return JsonResponse({'error': f"Unknown view: {view}"}, status=400)
+    layers = request.GET.get('layers', 'sectors,worksites').split(',')
+    cluster = request.GET.get('cluster', '1') != '0'
+
+    # Leaflet dünya dışına taşan sınır verebilir
+    west, south, east, north = bbox
+    bbox = (max(west, -180.0), max(south, -90.0), min(east, 180.0), min(north, 90.0))
+    offset = (page - 1) * page_size
+    features = []
+    has_more = False
+
+    if 'sectors' in layers:
+        # Poligonlar zoom'a uygun sadeleştirilmiş seviyeden gelir (core/geometry.py)
+        # Hasar özetleri (choropleth rengi, pop-up sayıları) hazır satırdan join ile gelir (core/rollups.py)
+        sectors = with_sector_shape(viewport_queryset(Sector, bbox, zoom), zoom).values(
+            'id', 'name', 'color', 'description', 'shape', *ROLLUP_VALUES
+        )
+        rows = list(sectors[offset:offset + page_size + 1])
+        has_more |= len(rows) > page_size
+        features += [as_feature('sector', pop_rollup(r), geometry_field='shape') for r in rows[:page_size]]
+
+    if 'worksites' in layers and cluster and zoom is not None and zoom <= CLUSTER_MAX_ZOOM:
+        # Uzak zoom: worksite'lar sunucuda kümelenir, ekran hücre sayısıyla sınırlı olduğundan tek sayfa
+        if page == 1:
+            clusters, singles = worksite_clusters.clusters(bbox, zoom)
+            rows = WORKSITE_VIEWS[view](Worksite.objects.filter(pk__in=singles).order_by('pk'))
+            features += clusters + [as_feature('worksite', r) for r in rows]
+    elif 'worksites' in layers:
+        worksite_ids = list(viewport_queryset(Worksite, bbox, zoom).values_list('pk', flat=True)[offset:offset + page_size + 1])
+        has_more |= len(worksite_ids) > page_size
+        rows = WORKSITE_VIEWS[view](Worksite.objects.filter(pk__in=worksite_ids[:page_size]).order_by('pk'))
+        features += [as_feature('worksite', r) for r in rows]
+
+    response = JsonResponse({
+        'type': 'FeatureCollection',
+        'features': features,
+        'page': page,
+        'next_page': page + 1 if has_more else None,
+    })
+    # Tarayıcı her seferinde ETag ile doğrulasın (değişmediyse 304)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def map_extent():
+    """Tüm geometrileri kapsayan [[south, west], [north, east]] (Haritanın ilk açılışı için)."""
+    extent = Worksite.objects.filter(geometry__isnull=False).aggregate(
+        west=Min('min_lng'), south=Min('min_lat'), east=Max('max_lng'), north=Max('max_lat')
+    )
+    sector_extent = Sector.objects.filter(geometry__isnull=False).aggregate(
+        west=Min('min_lng'), south=Min('min_lat'), east=Max('max_lng'), north=Max('max_lat')
+    )
+    values = [v for v in (extent, sector_extent) if v['west'] is not None]
+    if not values:
+        return None
+    return [
+        [min(v['south'] for v in values), min(v['west'] for v in values)],
+        [max(v['north'] for v in values), max(v['east'] for v in values)],
+    ]
 
 # --- SECTOR VIEWS ---
 class SectorListView(ListView):
@@ -400,10 +323,14 @@ class SectorListView(ListView):
     template_name = 'core/sector_list.html'
     context_object_name = 'sectors'
 
+    def get_queryset(self):
+        # Tablodaki özet sayılar hazır satırdan (core/rollups.py)
+        return super().get_queryset().select_related('damage_rollup')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Harita için tüm veriyi gönderiyoruz
-        context['map_data'] = get_all_map_data()
+        # Harita verisi görünür alana göre API'den gelir, burada sadece ilk kapsam
+        context['map_bounds'] = map_extent()
         return context
 
 
@@ -413,10 +340,13 @@ class WorksiteListView(ListView):
     template_name = 'core/worksite_list.html'
     context_object_name = 'worksites'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('sector', 'damage_rollup')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Harita için tüm veriyi gönderiyoruz
-        context['map_data'] = get_all_map_data()
+        # Harita verisi görünür alana göre API'den gelir, burada sadece ilk kapsam
+        context['map_bounds'] = map_extent()
         return context
     
 # --- ASSIGNMENT VIEWS ---
@@ -460,23 +390,28 @@ class AssignmentUpdateView(UpdateView):
     
 # --- FIELD DASHBOARD (ANA KOMUTA MERKEZİ) ---
 def field_dashboard(request, assignment_id):
-    assignment = get_object_or_404(Assignment, id=assignment_id)
+    assignment = get_object_or_404(Assignment.objects.select_related('team', 'worksite'), id=assignment_id)
     worksite = assignment.worksite
-    
+
+    # Tüm ağaç tek seferde: saha -> bina -> (hasarlar, eserler -> transferler)
+    # Sorgu sayısı veri miktarından bağımsızdır (bkz. tests.FieldDashboardQueryTests)
     site_reports = SiteAssessment.objects.filter(assignment=assignment).prefetch_related(
-        'buildings',
-        'buildings__damages', # Binalara bağlı hasarlar
-        'buildings__assets'   # Binalara bağlı eserler
+        Prefetch('buildings', queryset=BuildingInventory.objects.order_by('pk').prefetch_related(
+            Prefetch('damages', queryset=DamageAssessment.objects.order_by('pk')),  # Binalara bağlı hasarlar
+            Prefetch('assets', queryset=MovableHeritage.objects.order_by('pk').prefetch_related(
+                Prefetch('movements', queryset=MovableTracking.objects.order_by('transfer_date'))
+            )),  # Binalara bağlı eserler ve transfer geçmişi
+        ))
     )
-    
-    # (Opsiyonel) Eğer binaları bağımsız listeliyorsan burayı da prefetch yapabilirsin
-    buildings = BuildingInventory.objects.filter(assignment=assignment).prefetch_related('damages', 'assets')
-    
+
+    # Görev seviyesinde: şablonda her saha raporu için tekrar sorgulanmasın
+    intangible_reports = list(assignment.intangibleheritage_reports.order_by('created_at'))
+
     context = {
         'assignment': assignment,
         'worksite': worksite,
         'site_reports': site_reports,
-        'buildings': buildings,
+        'intangible_reports': intangible_reports,
     }
     return render(request, 'core/field_dashboard.html', context)
 
@@ -538,7 +473,9 @@ def add_damage_assessment(request, assignment_id, building_id):
             damage.worksite = assignment.worksite
             damage.building = building
             damage.editor_name = request.user.username
-            damage.save()
+            # Tespit ve güncel hasar durumu (core/damage_state.py) birlikte yazılır
+            with transaction.atomic():
+                damage.save()
             return redirect('field_dashboard', assignment_id=assignment.id)
     else:
         form = DamageAssessmentForm()
@@ -578,18 +515,10 @@ def reporting_dashboard(request):
     PDF Raporu ile senkronize, zenginleştirilmiş veri seti.
     """
     # --- 1. KPI KARTLARI (EN ÜST SATIR) ---
-    total_sites = SiteAssessment.objects.count()
-    total_buildings = BuildingInventory.objects.count()
-    total_assets = MovableHeritage.objects.count()
-    
-    # Operasyonel Tamamlanma (Worksite Bazlı)
-    total_worksites = Worksite.objects.count()
-    completed_worksites = Worksite.objects.filter(status='COMPLETED').count()
-    completion_rate = int((completed_worksites / total_worksites) * 100) if total_worksites > 0 else 0
+    # Tüm sayaçlar tek satırdan okunur (sinyallerle güncellenir, core/statistics.py)
+    stats = get_statistics()
 
     # --- 2. GRAFİK 1: HASAR DAĞILIMI (PASTA GRAFİK) ---
-    damage_stats = DamageAssessment.objects.values('overall_damage').annotate(total=Count('id'))
-    
     damage_labels = []
     damage_data = []
     damage_colors = []
@@ -602,70 +531,62 @@ def reporting_dashboard(request):
         'COLLAPSED': '#5a5c69'  # Koyu Gri/Siyah
     }
 
-    for stat in damage_stats:
-        damage_labels.append(stat['overall_damage'])
-        damage_data.append(stat['total'])
-        damage_colors.append(damage_color_map.get(stat['overall_damage'], '#858796'))
+    # Dereceler hafiften ağıra sırayla
+    for grade, _label in DamageAssessment.OVERALL_GRADES:
+        if stats.damage_grades.get(grade):
+            damage_labels.append(grade)
+            damage_data.append(stats.damage_grades[grade])
+            damage_colors.append(damage_color_map.get(grade, '#858796'))
 
     # --- 3. GRAFİK 2: UZMANLIK DAĞILIMI (BAR GRAFİK) ---
-    # Personnel tablosundan uzmanlık alanlarına göre sayıları alıyoruz
-    expertise_stats = Personnel.objects.values('primary_expertise__code').annotate(total=Count('id')).order_by('-total')
-    
     exp_labels = []
     exp_data = []
     # Bootstrap renklerini sırayla kullanalım
     exp_colors = ['#4e73df', '#36b9cc', '#858796', '#f6c23e'] 
 
-    for stat in expertise_stats:
-        code = stat['primary_expertise__code'] or "Unspecified"
-        exp_labels.append(code)
-        exp_data.append(stat['total'])
+    for code, total in stats.ranked('expertise'):
+        exp_labels.append(code or "Unspecified")
+        exp_data.append(total)
     
     # --- 4. İNSAN KAYNAKLARI VE DETAYLAR ---
-    total_personnel = Personnel.objects.count()
-    
     # SQ Type İstatistikleri
-    sq_stats = Personnel.objects.values('sq_number').annotate(total=Count('id')).order_by('-total')
+    sq_stats = [{'sq_number': sq, 'total': total} for sq, total in stats.ranked('sq_types')]
     
-    # Ülke İstatistikleri (İlk 5 ülkeyi göster, gerisi 'Others')
-    country_stats_raw = Personnel.objects.values('country__name').annotate(total=Count('id')).order_by('-total')
-    total_countries = country_stats_raw.count()
-    country_stats = country_stats_raw[:8] # Listede göstermek için ilk 8
+    # Ülke İstatistikleri (Listede göstermek için ilk 8)
+    country_stats = [{'country__name': name, 'total': total} for name, total in stats.ranked('countries', 8)]
 
     # Professional Profile Metni (En çok tekrar eden unvanlar)
-    top_jobs = Personnel.objects.values('job_titles__title').annotate(total=Count('id')).order_by('-total')[:6]
-    job_profile_text = ", ".join([f"{j['job_titles__title']} ({j['total']})" for j in top_jobs if j['job_titles__title']])
-
-    # --- 5. OPERASYONEL DURUM ---
-    total_sectors = Sector.objects.count()
-    total_teams = Team.objects.count()
-    ongoing_worksites = total_worksites - completed_worksites
+    job_profile_text = stats.job_profile_text(6)
 
     # --- 6. RİSK VE PERFORMANS ---
-    # Kırmızı Liste (Severe/Collapsed)
-    red_list = DamageAssessment.objects.filter(
-        overall_damage__in=['SEVERE', 'COLLAPSED']
-    ).select_related('building', 'building__site_assessment__worksite').order_by('-created_at')[:10]
+    # Kırmızı Liste (Severe/Collapsed): bina / tehlike başına güncel tespit (core/damage_state.py)
+    red_list = current_critical_states().select_related('building', 'building__site_assessment__worksite')[:10]
+
+    # Öncelik sıralaması (indeksli priority_index sütunundan, core/priority.py)
+    priority_ranking = top_priority_buildings(10)
 
     # Takım Performansı
     team_performance = SiteAssessment.objects.values('editor_name').annotate(
         total_reports=Count('id')
     ).order_by('-total_reports')[:5]
 
+    # Hasar matrisi analitiği (NumPy, veri versiyonuyla önbellekte; numpy yoksa None)
+    matrix_analytics = get_matrix_analytics()
+
     # --- 7. OTOMATİK RAPOR METNİ ---
     narrative_text = (
-        f"Operation is currently active across {total_sectors} sectors with {total_worksites} worksites. "
-        f"{completed_worksites} worksites are completed ({completion_rate}%). "
-        f"Supported by {total_personnel} experts from {total_countries} countries. "
-        f"Primary focus is on {ongoing_worksites} ongoing sites and emergency salvage of {total_assets} assets."
+        f"Operation is currently active across {stats.total_sectors} sectors with {stats.total_worksites} worksites. "
+        f"{stats.completed_worksites} worksites are completed ({stats.completion_rate}%). "
+        f"Supported by {stats.total_personnel} experts from {stats.total_countries} countries. "
+        f"Primary focus is on {stats.ongoing_worksites} ongoing sites and emergency salvage of {stats.total_assets} assets."
     )
 
     context = {
         # KPI
-        'total_sites': total_sites,
-        'total_buildings': total_buildings,
-        'total_assets': total_assets,
-        'completion_rate': completion_rate,
+        'total_sites': stats.total_sites,
+        'total_buildings': stats.total_buildings,
+        'total_assets': stats.total_assets,
+        'completion_rate': stats.completion_rate,
         
         # Grafikler (JSON)
         'damage_labels': json.dumps(damage_labels),
@@ -676,133 +597,106 @@ def reporting_dashboard(request):
         'exp_colors': json.dumps(exp_colors),
         
         # Operasyon & İK
-        'total_personnel': total_personnel,
+        'total_personnel': stats.total_personnel,
         'sq_stats': sq_stats,
         'country_stats': country_stats,
-        'total_countries': total_countries,
+        'total_countries': stats.total_countries,
         'job_profile_text': job_profile_text,
-        'total_sectors': total_sectors,
-        'total_worksites': total_worksites,
-        'ongoing_worksites': ongoing_worksites,
-        'total_teams': total_teams,
+        'total_sectors': stats.total_sectors,
+        'total_worksites': stats.total_worksites,
+        'ongoing_worksites': stats.ongoing_worksites,
+        'total_teams': stats.total_teams,
         
         # Tablolar ve Metin
         'red_list': red_list,
+        'priority_ranking': priority_ranking,
         'team_stats': team_performance,
         'narrative_text': narrative_text,
+        'matrix_analytics': matrix_analytics,
     }
     
     return render(request, 'core/reporting_dashboard.html', context)
 
+def report_file_response(request, path):
+    # Önbellekteki PDF herkes için aynı: indiren kişi ve tarih kapağa şimdi basılır
+    now = timezone.now()
+    content = stamp_cover(path, display_name(request.user), now)
+    filename = f"Mission_Report_{timezone.localtime(now).strftime('%Y%m%d_%H%M')}.pdf"
+    return FileResponse(BytesIO(content), content_type='application/pdf', filename=filename, as_attachment=False)
+
+
 def download_mission_report(request):
     """
-    Sıfırıncı dakikadan bugüne tüm operasyonun detaylı PDF raporunu üretir.
-    Geliştirilmiş İstatistikler ve İK Verileri Eklenmiştir.
+    Sıfırıncı dakikadan bugüne tüm operasyonun detaylı PDF raporu.
+    Veri değişmediyse önbellekteki PDF hemen verilir; yoksa arka plan işi
+    açılır (report_worker) ve kullanıcı durum sayfasına yönlendirilir.
     """
-    # --- 1. MEVCUT SAHA VERİLERİ ---
-    total_sites = SiteAssessment.objects.count()
-    total_buildings = BuildingInventory.objects.count()
-    
-    # Hasar İstatistikleri
-    damage_counts = DamageAssessment.objects.values('overall_damage').annotate(count=Count('id'))
-    severe_count = 0
-    collapsed_count = 0
-    for d in damage_counts:
-        if d['overall_damage'] == 'SEVERE': severe_count = d['count']
-        if d['overall_damage'] == 'COLLAPSED': collapsed_count = d['count']
-    critical_total = severe_count + collapsed_count
-
-    # Detaylı Saha Verileri
-    all_sites = SiteAssessment.objects.prefetch_related(
-        'buildings', 'buildings__damages', 'buildings__assets', 'assignment__team'
-    ).order_by('created_at')
-
-    # Kırmızı Liste
-    red_list = DamageAssessment.objects.filter(
-        overall_damage__in=['SEVERE', 'COLLAPSED']
-    ).select_related('building', 'building__site_assessment').order_by('overall_damage')
-
-    # Eser Envanteri
-    total_assets = MovableHeritage.objects.count()
-    assets_list = MovableHeritage.objects.select_related('building').all()
-
-    # --- 2. YENİ EKLENEN VERİLER (İNSAN KAYNAKLARI & OPERASYON) ---
-    
-    # A. Personel İstatistikleri
-    total_personnel = Personnel.objects.count()
-    
-    # SQ Type Listesi (Building, Movable, Observer)
-    sq_stats = Personnel.objects.values('sq_number').annotate(total=Count('id')).order_by('-total')
-    
-    # Main Expertise (DRM, CH, BOTH)
-    expertise_stats = Personnel.objects.values('primary_expertise__code').annotate(total=Count('id')).order_by('-total')
-    
-    # Ülkelere Göre Dağılım
-    country_stats = Personnel.objects.values('country__name').annotate(total=Count('id')).order_by('-total')
-    total_countries = country_stats.count()
-
-    # Professional Profile (Job Titles üzerinden metin analizi)
-    # En çok tekrar eden ilk 10 unvanı alıp metin haline getireceğiz
-    top_jobs = Personnel.objects.values('job_titles__title').annotate(total=Count('id')).order_by('-total')[:8]
-    job_profile_text = ", ".join([f"{j['job_titles__title']} ({j['total']})" for j in top_jobs if j['job_titles__title']])
-
-    # B. Operasyonel İstatistikler
-    total_sectors = Sector.objects.count()
-    total_worksites = Worksite.objects.count()
-    completed_worksites = Worksite.objects.filter(status='COMPLETED').count()
-    ongoing_worksites = total_worksites - completed_worksites
-    
-    total_teams = Team.objects.count()
-    active_assignments = Assignment.objects.filter(status='ACTIVE').count()
+    data_hash = report_data_hash()
+    path = cached_report_path(data_hash)
+    if os.path.exists(path):
+        return report_file_response(request, path)
+    job = enqueue_report(data_hash, request.user)
+    return redirect('report_job_status', pk=job.pk)
+
+
+def report_job_status(request, pk):
+    job = get_object_or_404(ReportJob, pk=pk)
+    return render(request, 'core/report_job.html', {'job': job})
+
+
+def report_job_api(request, pk):
+    """Durum sayfasının yokladığı JSON: status, progress, message, download_url."""
+    job = get_object_or_404(ReportJob, pk=pk)
+    if job.status == 'RUNNING' and fail_stale_jobs():
+        job.refresh_from_db()
+    ready = job_file_path(job) is not None
+    response = JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'download_url': reverse('report_job_download', args=[job.pk]) if ready else None,
+    })
+    patch_cache_control(response, no_store=True)
+    return response
 
-    # --- 3. OTOMATİK RAPOR METNİ (NARRATIVE) ---
-    narrative_text = (
-        f"The Cultural Heritage Response Operation is currently active across {total_sectors} designated sectors, "
-        f"covering a total of {total_worksites} worksites. To date, {completed_worksites} worksites have been successfully closed/completed. "
-        f"The operation is supported by a multinational force of {total_personnel} experts from {total_countries} different countries. "
-        f"The field teams are structured into {total_teams} operational units, currently managing {active_assignments} active assignments. "
-        f"The primary focus remains on damage assessment and emergency salvage of movable heritage."
-    )
 
-    context = {
-        'report_date': timezone.now(),
-        'generated_by': request.user.get_full_name() or request.user.username,
-        
-        # Mevcut Veriler
-        'total_sites': total_sites,
-        'total_buildings': total_buildings,
-        'critical_total': critical_total,
-        'all_sites': all_sites,
-        'red_list': red_list,
-        'total_assets': total_assets,
-        'assets_list': assets_list,
+def report_job_download(request, pk):
+    job = get_object_or_404(ReportJob, pk=pk)
+    path = job_file_path(job)
+    if path is None:
+        return redirect('report_job_status', pk=job.pk)
+    return report_file_response(request, path)
 
-        # Yeni Veriler
-        'total_personnel': total_personnel,
-        'sq_stats': sq_stats,
-        'expertise_stats': expertise_stats,
-        'country_stats': country_stats,
-        'job_profile_text': job_profile_text,
-        'total_sectors': total_sectors,
-        'total_worksites': total_worksites,
-        'completed_worksites': completed_worksites,
-        'ongoing_worksites': ongoing_worksites,
-        'total_teams': total_teams,
-        'narrative_text': narrative_text,
-    }
 
-    # --- 4. PDF OLUŞTURMA ---
-    html_string = render_to_string('core/report_pdf_template.html', context)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html_string.encode("UTF-8")), result)
-    
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        filename = f"Mission_Report_{timezone.now().strftime('%Y%m%d_%H%M')}.pdf"
-        response['Content-Disposition'] = f'inline; filename="{filename}"'
-        return response
-    else:
-        return HttpResponse("Error Rendering PDF", status=400)
+def export_csv(request, dataset):
+    """
+    Değerlendirme tablosunun ham verisi (CSV). Satırlar veritabanından parça parça
+    okunup akıtılır; yüz binlerce satırda da bellek kullanımı sabit kalır.
+    """
+    if dataset not in EXPORTS:
+        raise Http404("Unknown export")
+    filename = f"{dataset}_{timezone.localtime(timezone.now()).strftime('%Y%m%d_%H%M')}.csv"
+    response = StreamingHttpResponse(iter_csv(dataset), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def export_damage_matrices(request, file_format):
+    """Hasar matrisleri, hücre başına bir sütun (Parquet / Arrow). pyarrow yoksa 501 döner."""
+    if file_format not in COLUMNAR_FORMATS:
+        raise Http404("Unknown format")
+    output = tempfile.TemporaryFile()
+    try:
+        write_damage_matrices(output, file_format)
+    except ColumnarExportUnavailable as e:
+        output.close()
+        return HttpResponse(str(e), status=501, content_type='text/plain; charset=utf-8')
+    output.seek(0)
+    filename = f"damage_matrices_{timezone.localtime(timezone.now()).strftime('%Y%m%d_%H%M')}.{file_format}"
+    return FileResponse(output, as_attachment=True, filename=filename,
+                        content_type=f'application/vnd.apache.{file_format}')
+
 def edit_damage_assessment(request, pk):
     damage = get_object_or_404(DamageAssessment, pk=pk)
     assignment = damage.assignment # Dashboard'a dönmek için lazım
@@ -810,7 +704,8 @@ def edit_damage_assessment(request, pk):
     if request.method == 'POST':
         form = DamageAssessmentForm(request.POST, instance=damage)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
             return redirect('field_dashboard', assignment_id=assignment.id)
     else:
         form = DamageAssessmentForm(instance=damage)
@@ -824,7 +719,9 @@ def edit_damage_assessment(request, pk):
 def delete_damage_assessment(request, pk):
     damage = get_object_or_404(DamageAssessment, pk=pk)
     assignment_id = damage.assignment.id
-    damage.delete()
+    # Güncel durum bir önceki tespite döner; silme ile aynı transaction'da
+    with transaction.atomic():
+        damage.delete()
     return redirect('field_dashboard', assignment_id=assignment_id)
 
 def edit_movable_heritage(request, pk):
@@ -0,0 +1,54 @@
+// static/js/viewport_map.js
+// Görünür alan (viewport) haritalarının ortak kodu: index, worksite_list ve sector_list.
+// Özellikler map_features_api'den sayfa sayfa alınır; düşük zoom'da gelen kümeler burada çizilir.
+(function (window) {
+    // Küme (Cluster) Çiz: Sayı etiketi + hasar/durum dağılımı
+    function drawCluster(feature, layerGroup) {
+        var c = feature.properties;
+        var size = Math.min(24 + Math.round(Math.log(c.count) * 6), 60);
+        var latlng = [feature.geometry.coordinates[1], feature.geometry.coordinates[0]];
+        var icon = L.divIcon({
+            className: '',
+            iconSize: [size, size],
+            html: '<div style="width:' + size + 'px;height:' + size + 'px;line-height:' + size + 'px;border-radius:50%;' +
+                  'background:' + c.map_color + ';color:#fff;text-align:center;font-weight:bold;border:2px solid #fff;' +
+                  'box-shadow:0 0 4px rgba(0,0,0,.5);">' + c.count + '</div>'
+        });
+        var lines = [];
+        Object.keys(c.damage).forEach(function(color) {
+            lines.push('<span style="background:' + color + ';width:10px;height:10px;display:inline-block;margin-right:4px;"></span>' + c.damage[color]);
+        });
+        Object.keys(c.status).forEach(function(s) { lines.push(s.replace('_', ' ') + ': ' + c.status[s]); });
+        L.marker(latlng, { icon: icon })
+            .bindPopup('<b>' + c.count + ' Worksites</b><hr style="margin:5px 0">' + lines.join('<br>'))
+            .addTo(layerGroup);
+    }
+
+    // Görünür alanı yükleyen fonksiyonu döndürür (Sayfa sayfa; veri değişmediyse tarayıcı 304 alır).
+    // params(): her istekte eklenecek parametreler (layers, view)
+    // onFeatures(features): sadece en son isteğin tüm sayfaları geldiğinde çağrılır
+    function viewportLoader(map, apiUrl, params, onFeatures) {
+        var loadSeq = 0;
+        return function loadViewport() {
+            var seq = ++loadSeq;
+            var b = map.getBounds();
+            var bbox = [b.getWest(), b.getSouth(), b.getEast(), b.getNorth()].map(function(v) { return v.toFixed(5); }).join(',');
+            var features = [];
+
+            function fetchPage(page) {
+                var query = new URLSearchParams(Object.assign({ bbox: bbox, zoom: map.getZoom(), page: page }, params()));
+                return fetch(apiUrl + '?' + query.toString()).then(function(r) { return r.json(); }).then(function(data) {
+                    features = features.concat(data.features);
+                    return data.next_page ? fetchPage(data.next_page) : features;
+                });
+            }
+
+            fetchPage(1).then(function(all) {
+                if (seq !== loadSeq) { return; } // Daha yeni bir istek var
+                onFeatures(all);
+            });
+        };
+    }
+
+    window.ViewportMap = { drawCluster: drawCluster, viewportLoader: viewportLoader };
+})(window);